@@ -182,6 +182,53 @@ def execute():
                         default="clinica.log",
                         metavar=('file.log'),
                         help='Define the log file name (default: clinica.log)')
+    parser.add_argument("-hm", "--hash_method",
+                        dest='hash_method',
+                        default='content', choices=['content', 'cached', 'sampled'],
+                        help='Method used to detect changes in the input files of the pipeline steps: '
+                             '"content" (MD5 of the whole files, default), '
+                             '"cached" (fast hash of the whole files, reused while the files are unchanged) or '
+                             '"sampled" (same as "cached" but only a sample of blocks of large files is hashed)')
+    parser.add_argument("-pr", "--profiling",
+                        dest='profiling',
+                        action='store_true', default=False,
+                        help='Write a report with the runtime, CPU and memory usage of each step of the pipeline')
+    parser.add_argument("-b", "--batch",
+                        dest='batch',
+                        action='store_true', default=False,
+                        help='Batch mode: never ask questions before running the pipeline and cache the results '
+                             'of the checks of the dataset (e.g. for job arrays on a cluster)')
+    parser.add_argument("-rd", "--refresh_dependencies",
+                        dest='refresh_dependencies',
+                        action='store_true', default=False,
+                        help='Check again the versions of the third-party software instead of using the versions '
+                             'cached by the previous runs')
+    parser.add_argument("-mp", "--matlab_pool",
+                        dest='matlab_pool',
+                        type=int, default=0, metavar='N',
+                        help='Run the SPM steps of the pipeline in at most N MATLAB (or SPM standalone) processes '
+                             'reused from one image to the next (default: one new process per step)')
+    parser.add_argument("-wdp", "--working_directory_policy",
+                        dest='working_directory_policy',
+                        default='keep', choices=['keep', 'clean'],
+                        help='Lifecycle of the intermediate files in the working directory: "keep" them all '
+                             '(default) or "clean" the files of each image as soon as its outputs are written in CAPS '
+                             '(images which failed are kept to be resumed)')
+    parser.add_argument("-nc", "--nifti_cache",
+                        dest='nifti_cache',
+                        action='store_true', default=False,
+                        help='Decompress each compressed NIfTI input of the SPM steps once, in a cache of the working '
+                             'directory shared by all the steps, instead of once per step (the cache is removed at '
+                             'the end of the run with the "clean" policy or without working directory)')
+    parser.add_argument("-gl", "--gzip_level",
+                        dest='gzip_level',
+                        type=int, default=9, choices=range(1, 10), metavar='{1..9}',
+                        help='Level of gzip of the NIfTI images compressed by the SPM steps, from 1 (fastest) to 9 '
+                             '(smallest, default)')
+    parser.add_argument("-gt", "--gzip_threads",
+                        dest='gzip_threads',
+                        type=int, default=1, metavar='N',
+                        help='Number of threads compressing each NIfTI image written by the SPM steps (default: 1)')
 
     """
     run category: run one of the available pipelines
@@ -532,6 +579,38 @@ def execute():
         python_logging.basicConfig(
             format=logging.fmt, datefmt=logging.datefmt, stream=Stream())
 
+    if args.refresh_dependencies:
+        from clinica.utils.check_dependency import refresh_dependency_cache
+        refresh_dependency_cache()
+
+    if args.batch:
+        from clinica.utils.preflight import enable_batch_mode
+        enable_batch_mode()
+
+    if args.profiling:
+        from clinica.utils.profiling import enable_profiling
+        enable_profiling()
+
+    if args.matlab_pool > 0:
+        from clinica.utils.matlab_pool import enable_matlab_pool
+        enable_matlab_pool(args.matlab_pool)
+
+    if args.working_directory_policy != 'keep':
+        from clinica.utils.working_directory import set_working_directory_policy
+        set_working_directory_policy(args.working_directory_policy)
+
+    if args.nifti_cache:
+        from clinica.utils.nifti_staging import enable_nifti_cache
+        enable_nifti_cache()
+
+    if args.gzip_level != 9 or args.gzip_threads != 1:
+        from clinica.utils.nifti_staging import set_gzip_options
+        set_gzip_options(args.gzip_level, args.gzip_threads)
+
+    if args.hash_method != 'content':
+        from clinica.utils.hashing import enable_cached_hashing
+        enable_cached_hashing(args.hash_method)
+
     # Finally, run the command
     args.func(args)
 
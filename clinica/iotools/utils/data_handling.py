@@ -240,6 +240,77 @@ def create_merge_file(bids_dir, out_tsv, caps_dir=None, tsv_file=None, pipelines
     merged_df.to_csv(path.join(out_dir, out_file_name), sep='\t', index=False)
 
 
+def scan_bids_modalities(bids_dir, n_threads=None):
+    """
+    Scan once a BIDS dataset and list the modalities available for each subject and session
+
+    The subjects are scanned in parallel with os.scandir, each folder of the dataset being read only once.
+
+    Args:
+        bids_dir: path to the BIDS dataset
+        n_threads: number of threads used to scan the subjects (default: Python default for ThreadPoolExecutor)
+
+    Returns:
+        sessions_df: DataFrame with columns participant_id and session_id listing all the sessions found
+        presence_df: DataFrame with columns participant_id, session_id, modality_type (folder name), modality
+            and available (True if an image of the modality exists in the session)
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    import os
+    import pandas as pd
+
+    def scan_subject(subject_path):
+        subject = os.path.basename(subject_path)
+        sessions, presence = [], []
+        with os.scandir(subject_path) as ses_entries:
+            ses_entries = [e for e in ses_entries if 'ses-' in e.name and e.is_dir()]
+        for ses_entry in ses_entries:
+            session = ses_entry.name
+            sessions.append((subject, session))
+            with os.scandir(ses_entry.path) as mod_entries:
+                mod_entries = [e for e in mod_entries if e.is_dir()]
+            for mod_entry in mod_entries:
+                mod_type = mod_entry.name
+                if mod_type in ['dwi', 'fmap', 'pet']:
+                    presence.append((subject, session, mod_type, mod_type, True))
+                elif mod_type == 'func':
+                    with os.scandir(mod_entry.path) as func_entries:
+                        for func_entry in func_entries:
+                            if func_entry.name.endswith('bold.nii.gz'):
+                                func_task = func_entry.name.split('_')[2]
+                                presence.append((subject, session, mod_type, 'func_' + func_task, True))
+                elif mod_type == 'anat':
+                    with os.scandir(mod_entry.path) as anat_entries:
+                        for anat_entry in anat_entries:
+                            # Extract the name of the file without the extension
+                            if anat_entry.name.endswith('.nii.gz'):
+                                anat_name = anat_entry.name[:-len('.nii.gz')]
+                            else:
+                                anat_name, anat_ext = os.path.splitext(anat_entry.name)
+                                if anat_ext == '.json':
+                                    continue
+                            anat_type = anat_name.split('_')[-1].lower()
+                            presence.append((subject, session, mod_type, anat_type,
+                                             anat_entry.name.endswith('.nii.gz')))
+        return sessions, presence
+
+    with os.scandir(bids_dir) as sub_entries:
+        subjects_paths = sorted(e.path for e in sub_entries if 'sub-' in e.name and e.is_dir())
+
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        results = list(executor.map(scan_subject, subjects_paths))
+
+    sessions_df = pd.DataFrame([s for sessions, _ in results for s in sessions],
+                               columns=['participant_id', 'session_id'])
+    presence_df = pd.DataFrame([p for _, presence in results for p in presence],
+                               columns=['participant_id', 'session_id', 'modality_type', 'modality', 'available'])
+    # Typed column, also when no modality was found (boolean indexing of an empty frame)
+    presence_df['available'] = presence_df['available'].astype(bool)
+    presence_df.drop_duplicates(inplace=True)
+
+    return sessions_df, presence_df
+
+
 def find_mods_and_sess(bids_dir):
     """
     Find all the modalities and sessions available for a given BIDS dataset
@@ -259,90 +330,15 @@ def find_mods_and_sess(bids_dir):
     }
 
     """
-    from glob import glob
-    from os import path
-    import os
+    sessions_df, presence_df = scan_bids_modalities(bids_dir)
 
     mods_dict = {}
-    mods_list = []
-    subjects_paths_lists = glob(path.join(bids_dir, '*sub-*'))
-
-    for sub_path in subjects_paths_lists:
-        ses_paths = glob(path.join(sub_path, '*ses-*'))
-        for session in ses_paths:
-            ses_name = session.split(os.sep)[-1]
-            mods_avail = []
-            if 'sessions' in mods_dict:
-                if ses_name not in mods_dict['sessions']:
-                    mods_dict['sessions'].append(ses_name)
-            else:
-                mods_dict.update({'sessions': [ses_name]})
-            mods_paths_folders = glob(path.join(session, '*/'))
-
-            for p in mods_paths_folders:
-                p = p[:-1]
-                mods_avail.append(p.split('/').pop())
-
-            if 'func' in mods_avail:
-                list_funcs_paths = glob(path.join(session, 'func', '*bold.nii.gz'))
-                for func_path in list_funcs_paths:
-                    func_name = func_path.split(os.sep)[-1]
-                    func_name_tokens = func_name.split('_')
-                    func_task = func_name_tokens[2]
-                if 'func' in mods_dict:
-                    if 'func_' + func_task not in mods_dict['func']:
-                        mods_dict['func'].append('func_' + func_task)
-                else:
-                    mods_dict.update({'func': ['func_' + func_task]})
-
-                if 'func_' + func_task not in mods_list:
-                    mods_list.append('func_' + func_task)
-
-            if 'dwi' in mods_avail:
-                if 'dwi' not in mods_dict:
-                    mods_dict.update({'dwi': ['dwi']})
-                if 'dwi' not in mods_list:
-                    mods_list.append('dwi')
-
-            if 'fmap' in mods_avail:
-                if 'fmap' not in mods_dict:
-                    mods_dict.update({'fmap': ['fmap']})
-                if 'fmap' not in mods_list:
-                    mods_list.append('fmap')
-
-            if 'pet' in mods_avail:
-                if 'pet' not in mods_dict:
-                    mods_dict.update({'pet': ['pet']})
-                if 'pet' not in mods_list:
-                    mods_list.append('pet')
-
-            if 'anat' in mods_avail:
-                anat_files_paths = glob(path.join(session, 'anat', '*'))
-
-                for anat_file in anat_files_paths:
-                    anat_name = anat_file.split(os.sep)[-1]
-
-                    # Extract the name of the file without the extension
-                    if '.nii.gz' in anat_name:
-                        anat_name = anat_name.replace('.nii.gz', '')
-                        anat_ext = 'nii.gz'
-                    else:
-                        anat_name = os.path.splitext(anat_name.split(os.sep)[-1])[0]
-                        anat_ext = os.path.splitext(anat_name.split(os.sep)[-1])[1]
-
-                    if anat_ext != 'json':
-                        file_parts = anat_name.split("_")
-                        anat_type = str.lower(file_parts[len(file_parts) - 1])
-                        if 'anat' in mods_dict:
-                            if anat_type not in mods_dict['anat']:
-                                anat_aval = mods_dict['anat']
-                                anat_aval.append(anat_type)
-                                mods_dict.update({'anat': anat_aval})
-                        else:
-                            mods_dict.update({'anat': [anat_type]})
-
-                        if anat_type not in mods_list:
-                            mods_list.append(anat_type)
+    if len(sessions_df) > 0:
+        mods_dict['sessions'] = sorted(sessions_df.session_id.unique())
+    for mod_type in ['func', 'dwi', 'fmap', 'pet', 'anat']:
+        mods = presence_df.modality[presence_df.modality_type == mod_type]
+        if len(mods) > 0:
+            mods_dict[mod_type] = sorted(mods.unique())
 
     return mods_dict
 
@@ -351,6 +347,9 @@ def compute_missing_mods(bids_dir, out_dir, output_prefix=''):
     """
     Compute the list of missing modalities for each subject in a BIDS compliant dataset
 
+    The dataset is scanned once (see scan_bids_modalities) and the per-session TSV files and the summary are
+    derived from the resulting presence table.
+
     Args:
         bids_dir: path to the BIDS directory
         out_dir: path to the output folder
@@ -361,121 +360,49 @@ def compute_missing_mods(bids_dir, out_dir, output_prefix=''):
     import os
     from os import path
     import pandas as pd
-    from glob import glob
 
     if not os.path.exists(out_dir):
         os.makedirs(out_dir)
 
     # Find all the modalities and sessions available for the input dataset
-    mods_and_sess = find_mods_and_sess(bids_dir)
-    sessions_found = mods_and_sess['sessions']
-    mods_and_sess.pop('sessions')
-    mods_avail_dict = mods_and_sess
-    mods_avail = [j for i in mods_avail_dict.values() for j in i]
-    cols_dataframe = mods_avail[:]
-    cols_dataframe.insert(0, 'participant_id')
+    sessions_df, presence_df = scan_bids_modalities(bids_dir)
+    subjects = sorted(sessions_df.participant_id.unique())
+    if len(subjects) == 0:
+        raise IOError("No subjects found or dataset not BIDS complaint.")
+    sessions_found = sorted(sessions_df.session_id.unique())
+    mods_avail = [mod for mod_type in ['func', 'dwi', 'fmap', 'pet', 'anat']
+                  for mod in sorted(presence_df.modality[presence_df.modality_type == mod_type].unique())]
+
+    # Presence table: one row per (subject, session), one column per modality
+    available_df = presence_df[presence_df.available]
+    presence_table = pd.crosstab([available_df.participant_id, available_df.session_id], available_df.modality)
+    all_index = pd.MultiIndex.from_product([subjects, sessions_found], names=['participant_id', 'session_id'])
+    presence_table = (presence_table.reindex(index=all_index, columns=mods_avail, fill_value=0) > 0).astype(int)
+    session_exists = pd.Series(all_index.isin(pd.MultiIndex.from_frame(sessions_df)), index=all_index)
+
+    # Missing sessions and missing modalities (within existing sessions) per session
+    missing_sessions = (~session_exists).groupby(level='session_id').sum()
+    missing_mods = (presence_table[session_exists.values] == 0).groupby(level='session_id').sum()
+
     mmt = MissingModsTracker(sessions_found, mods_avail)
+    for ses in sessions_found:
+        mmt.increase_missing_ses(ses, int(missing_sessions[ses]))
+        if ses in missing_mods.index:
+            for mod in mods_avail:
+                mmt.add_missing_mod(ses, mod, int(missing_mods.loc[ses, mod]))
 
     if output_prefix == '':
         out_file_name = 'missing_mods_'
     else:
         out_file_name = output_prefix + '_'
 
-    summary_file = open(path.join(out_dir, out_file_name + 'summary.txt'), 'w')
-    missing_mods_df = pd.DataFrame(columns=cols_dataframe)
-    row_to_append_df = pd.DataFrame(columns=cols_dataframe)
-    subjects_paths_lists = glob(path.join(bids_dir, '*sub-*'))
-    subjects_paths_lists.sort()
-
-    if len(subjects_paths_lists) == 0:
-        raise IOError("No subjects found or dataset not BIDS complaint.")
-    # Check the modalities available for each session
     for ses in sessions_found:
-        mods_avail_bids = []
-        for sub_path in subjects_paths_lists:
-            mods_avail_bids = []
-            subj_id = sub_path.split(os.sep)[-1]
-            row_to_append_df['participant_id'] = pd.Series(subj_id)
-            ses_path_avail = glob(path.join(sub_path, ses))
-            if len(ses_path_avail) == 0:
-                mmt.increase_missing_ses(ses)
-                for mod in mods_avail:
-                    row_to_append_df[mod] = pd.Series('0')
-            else:
-
-                ses_path = ses_path_avail[0]
-                mods_paths_folders = glob(path.join(ses_path, '*/'))
-
-                for p in mods_paths_folders:
-                    p = p[:-1]
-                    mods_avail_bids.append(p.split('/').pop())
-
-                # Check if a modality folder is available and if is empty
-                if 'func' in mods_avail_bids:
-                    # Extract all the task available
-                    for m in mods_avail_dict['func']:
-                        tokens = m.split('_')
-                        task_name = tokens[1]
-                        task_avail_list = glob(path.join(
-                            ses_path, 'func', '*' + task_name + '*')
-                        )
-
-                        if len(task_avail_list) == 0:
-                            row_to_append_df[m] = pd.Series('0')
-                        else:
-                            row_to_append_df[m] = pd.Series('1')
-                # If the folder is not available but the modality is
-                # in the list of the available one mark it as missing
-                else:
-                    if 'func' in mods_avail_dict:
-                        for m in mods_avail_dict['func']:
-                            row_to_append_df[m] = pd.Series('0')
-                        mmt.add_missing_mod(ses, m)
-
-                if 'dwi' in mods_avail_bids:
-                    row_to_append_df['dwi'] = pd.Series('1')
-                else:
-                    if 'dwi' in mods_avail:
-                        row_to_append_df['dwi'] = pd.Series('0')
-                        mmt.add_missing_mod(ses, 'dwi')
-
-                if 'anat' in mods_avail_bids:
-                    for m in mods_avail_dict['anat']:
-                        anat_aval_list = glob(path.join(ses_path, 'anat', '*.nii.gz'))
-                        anat_aval_list = [elem for elem in anat_aval_list if m.lower() in elem.lower()]
-                        if len(anat_aval_list) > 0:
-                            row_to_append_df[m] = pd.Series('1')
-                        else:
-                            row_to_append_df[m] = pd.Series('0')
-                            mmt.add_missing_mod(ses, m)
-                else:
-                    if 'anat' in mods_avail_dict:
-                        for m in mods_avail_dict['anat']:
-                            row_to_append_df[m] = pd.Series('0')
-                            mmt.add_missing_mod(ses, m)
-
-                if 'fmap' in mods_avail_bids:
-                    row_to_append_df['fmap'] = pd.Series('1')
-                else:
-                    if 'fmap' in mods_avail:
-                        row_to_append_df['fmap'] = pd.Series('0')
-                        mmt.add_missing_mod(ses, 'fmap')
-                if 'pet' in mods_avail_bids:
-                    row_to_append_df['pet'] = pd.Series('1')
-                else:
-                    if 'pet' in mods_avail:
-                        row_to_append_df['pet'] = pd.Series('0')
-                        mmt.add_missing_mod(ses, 'pet')
-
-            missing_mods_df = missing_mods_df.append(row_to_append_df)
-            row_to_append_df = pd.DataFrame(columns=cols_dataframe)
-
-        missing_mods_df = missing_mods_df[cols_dataframe]
+        missing_mods_df = presence_table.xs(ses, level='session_id').reset_index()
         missing_mods_df.to_csv(path.join(out_dir, out_file_name + ses + '.tsv'), sep='\t', index=False,
                                encoding='utf-8')
-        missing_mods_df = pd.DataFrame(columns=cols_dataframe)
 
-    print_statistics(summary_file, len(subjects_paths_lists), sessions_found, mmt)
+    with open(path.join(out_dir, out_file_name + 'summary.txt'), 'w') as summary_file:
+        print_statistics(summary_file, len(subjects), sessions_found, mmt)
 
 
 def create_subs_sess_list(input_dir, output_dir,
@@ -732,6 +659,7 @@ def check_relative_volume_location_in_world_coordinate_system(label_1, nifti_lis
     from colorama import Fore
     from os.path import abspath, basename
     from clinica.utils.stream import cprint
+    from clinica.utils.preflight import is_batch_mode
     import sys
 
     center_coordinate_1 = [get_world_coordinate_of_center(file) for file in nifti_list1]
@@ -783,6 +711,9 @@ def check_relative_volume_location_in_world_coordinate_system(label_1, nifti_lis
                            + 'clinica iotools center-nifti' + Fore.YELLOW + ' in the console.\nDo you still want to ' \
                            + 'launch the pipeline now?' + Fore.RESET
         cprint(warning_message)
+        if is_batch_mode():
+            cprint(Fore.YELLOW + 'Batch mode: the pipeline is launched anyway.' + Fore.RESET)
+            return
         while True:
             cprint('Your answer [yes/no]:')
             answer = input()
@@ -815,13 +746,15 @@ def check_volume_location_in_world_coordinate_system(nifti_list, bids_dir, modal
     """
     from colorama import Fore
     from clinica.utils.stream import cprint
+    from clinica.utils.preflight import is_batch_mode
     from os.path import abspath, basename
     import numpy as np
     import sys
 
-    list_non_centered_files = [file for file in nifti_list if not is_centered(file)]
+    centering = get_centering_status(nifti_list)
+    list_non_centered_files = [file for file in nifti_list if not centering[file]['centered']]
     if len(list_non_centered_files) > 0:
-        centers = [get_world_coordinate_of_center(file) for file in list_non_centered_files]
+        centers = [np.array(centering[file]['center'], dtype=float) for file in list_non_centered_files]
         l2_norm = [np.linalg.norm(center, ord=2) for center in centers]
 
         # File column width : 3 spaces more than the longest string to display
@@ -867,6 +800,9 @@ def check_volume_location_in_world_coordinate_system(nifti_list, bids_dir, modal
                            + 'clinica iotools center-nifti' + Fore.YELLOW + ' in the console.\nDo you still want to '\
                            + 'launch the pipeline now?' + Fore.RESET
         cprint(warning_message)
+        if is_batch_mode():
+            cprint(Fore.YELLOW + 'Batch mode: the pipeline is launched anyway.' + Fore.RESET)
+            return
         while True:
             cprint('Your answer [yes/no]:')
             answer = input()
@@ -879,6 +815,61 @@ def check_volume_location_in_world_coordinate_system(nifti_list, bids_dir, modal
             sys.exit(0)
 
 
+def get_centering_status(nifti_list, threshold_l2=50, n_threads=None):
+    """
+    Compute the world coordinates of the center of NIfTI volumes, in parallel, and tell if they are centered
+    (see is_centered).
+
+    In batch mode, the status of each file is stored in the preflight result of the pipeline and reused while the
+    file is unchanged (same size and modification time).
+
+    Args:
+        nifti_list: (list of str) list of path to nifti files
+        threshold_l2: maximum distance between origin of the world coordinate system and the center of the volume to
+            be considered centered
+        n_threads: number of threads reading the headers (default: number of CPUs + 4, at most 32)
+
+    Returns:
+        Dictionary mapping each file to a dictionary with keys 'center' (list of coordinates, None if the file can
+        not be read) and 'centered' (bool)
+    """
+    import os
+    from concurrent.futures import ThreadPoolExecutor
+    import numpy as np
+    from clinica.utils.preflight import get_preflight_result
+
+    preflight = get_preflight_result()
+    cached_status = preflight.setdefault('centering', {}) if preflight is not None else {}
+
+    def file_key(nii_volume):
+        stat = os.stat(nii_volume)
+        return [stat.st_size, stat.st_mtime_ns, threshold_l2]
+
+    def compute_status(nii_volume):
+        center = get_world_coordinate_of_center(nii_volume)
+        if np.any(np.isnan(center)):
+            return {'key': file_key(nii_volume), 'center': None, 'centered': False}
+        return {'key': file_key(nii_volume),
+                'center': np.asarray(center, dtype=float).ravel().tolist(),
+                'centered': bool(np.linalg.norm(center, ord=2) < threshold_l2)}
+
+    status = {}
+    to_compute = []
+    for nii_volume in nifti_list:
+        cached = cached_status.get(os.path.abspath(nii_volume))
+        if cached is not None and cached['key'] == file_key(nii_volume):
+            status[nii_volume] = cached
+        else:
+            to_compute.append(nii_volume)
+
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        for nii_volume, file_status in zip(to_compute, executor.map(compute_status, to_compute)):
+            status[nii_volume] = file_status
+            cached_status[os.path.abspath(nii_volume)] = file_status
+
+    return status
+
+
 def is_centered(nii_volume, threshold_l2=50):
     """
     Tells if a NIfTI volume is centered on the origin of the world coordinate system.
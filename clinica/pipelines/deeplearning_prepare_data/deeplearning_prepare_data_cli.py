@@ -52,6 +52,20 @@ class DeepLearningPrepareDataCLI(ce.CmdParser):
                               valid fo t1-linear modality).''',
                               default=False, action="store_true"
                               )
+        optional.add_argument('-dt', '--dtype',
+                              help='''Type of the saved data: 'float32', 'float16'
+                              or 'uint8' (default: --dtype float32). With 'uint8',
+                              each image is linearly rescaled to [0, 255] (only valid
+                              with --group_label).''',
+                              choices=['float32', 'float16', 'uint8'], default='float32'
+                              )
+        optional.add_argument('-gl', '--group_label',
+                              help='''If provided, the images of all the subjects
+                              are also saved in a single memory-mapped NumPy array
+                              (with an index TSV file) in the groups/group-<group_label>
+                              folder of the CAPS directory.''',
+                              type=str, default=None
+                              )
 
         optional_patch = self._args.add_argument_group(
                 "%sPipeline options if you chose ‘patch’ extraction%s" % (Fore.BLUE, Fore.RESET)
@@ -120,6 +134,8 @@ class DeepLearningPrepareDataCLI(ce.CmdParser):
             'slice_mode': args.slice_mode,
             'use_uncropped_image': args.use_uncropped_image,
             'custom_suffix': args.custom_suffix,
+            'dtype': args.dtype,
+            'group_label': args.group_label,
         }
 
         pipeline = DeepLearningPrepareData(
@@ -29,6 +29,19 @@ class DeepLearningPrepareData(cpe.Pipeline):
         """Check dependencies that can not be listed in the `info.json` file."""
         pass
 
+    def check_pipeline_parameters(self):
+        """Check pipeline parameters."""
+        from clinica.utils.exceptions import ClinicaException
+        from clinica.utils.group import check_group_label
+
+        self.parameters.setdefault('dtype', 'float32')
+        self.parameters.setdefault('group_label', None)
+        if self.parameters['group_label'] is not None:
+            check_group_label(self.parameters['group_label'])
+        elif self.parameters['dtype'] == 'uint8':
+            raise ClinicaException('The uint8 type is only available for the group array '
+                                   '(the group_label parameter must be provided).')
+
     def get_input_fields(self):
         """Specify the list of possible inputs of this pipeline.
 
@@ -115,6 +128,7 @@ class DeepLearningPrepareData(cpe.Pipeline):
 
     def build_output_node(self):
         """Build and connect an output node to the pipeline."""
+        import os
         import nipype.interfaces.utility as nutil
         from nipype.interfaces.io import DataSink
         import nipype.pipeline.engine as npe
@@ -191,6 +205,24 @@ class DeepLearningPrepareData(cpe.Pipeline):
                 'container')]),
             ])
 
+        # Write node of the group array
+        # ----------------------
+        if self.parameters['group_label'] is not None:
+            write_group_node = npe.Node(
+                    name="WriteGroupCaps",
+                    interface=DataSink()
+                    )
+            write_group_node.inputs.base_directory = self.caps_directory
+            write_group_node.inputs.parameterization = False
+            write_group_node.inputs.container = os.path.join(
+                    'groups', 'group-' + self.parameters['group_label'],
+                    'deeplearning_prepare_data', 'image_based', mod_subfolder
+                    )
+            self.connect([
+                (self.get_node('save_as_group_array'), write_group_node, [('array_file', '@array_file'),
+                                                                          ('index_file', '@index_file')]),
+                ])
+
     def build_core_nodes(self):
         """Build and connect the core nodes of the pipeline."""
 
@@ -198,7 +230,8 @@ class DeepLearningPrepareData(cpe.Pipeline):
         import nipype.pipeline.engine as npe
         from .deeplearning_prepare_data_utils import (extract_slices,
                                                       extract_patches,
-                                                      save_as_pt)
+                                                      save_as_pt,
+                                                      save_as_group_array)
         # The processing nodes
 
         # Node to save MRI in nii.gz format into pytorch .pt format
@@ -208,10 +241,31 @@ class DeepLearningPrepareData(cpe.Pipeline):
                iterfield=['input_img'],
                interface=nutil.Function(
                    function=save_as_pt,
-                   input_names=['input_img'],
+                   input_names=['input_img', 'dtype'],
                    output_names=['output_file']
                    )
                )
+        # Tensors of each image are saved in float16 or float32
+        save_as_pt.inputs.dtype = 'float16' if self.parameters['dtype'] == 'float16' else 'float32'
+
+        # Node to save the MRI of all the images in a single array
+        # ----------------------
+        if self.parameters['group_label'] is not None:
+            save_as_group_array = npe.JoinNode(
+                    name='save_as_group_array',
+                    joinsource='ReadingFiles',
+                    joinfield=['input_imgs'],
+                    interface=nutil.Function(
+                        function=save_as_group_array,
+                        input_names=['input_imgs', 'group_label', 'dtype'],
+                        output_names=['array_file', 'index_file']
+                        )
+                    )
+            save_as_group_array.inputs.group_label = self.parameters['group_label']
+            save_as_group_array.inputs.dtype = self.parameters['dtype']
+            self.connect([
+                (self.input_node, save_as_group_array, [('input_nifti', 'input_imgs')]),
+                ])
 
         # Extract slices node (options: 3 directions, mode)
         # ----------------------
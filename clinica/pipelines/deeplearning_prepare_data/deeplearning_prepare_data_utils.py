@@ -213,14 +213,15 @@ def extract_patches(input_tensor, patch_size, stride_size):
     return output_patch
 
 
-def save_as_pt(input_img):
+def save_as_pt(input_img, dtype='float32'):
     """Saves PyTorch tensor version of the nifti image
 
     This function convert nifti image to tensor (.pt) version of the image.
     Tensor version is saved at the same location than input_img.
 
     Args:
-        input_tensor: tensor version of the nifti MRI.
+        input_img: nifti image.
+        dtype: 'float32' or 'float16', type of the saved tensor.
 
     Returns:
         filename (str): single tensor file  saved on the disk. Same location than input file.
@@ -230,13 +231,77 @@ def save_as_pt(input_img):
     import torch
     import os
     import nibabel as nib
+    import numpy as np
 
     basedir = os.getcwd()
-    image_array = nib.load(input_img).get_fdata()
-    image_tensor = torch.from_numpy(image_array).unsqueeze(0).float()
-    # make sure the tensor dtype is torch.float32
+    # Data are directly read in float32 (get_fdata defaults to float64)
+    image_array = nib.load(input_img).get_fdata(dtype=np.float32)
+    image_tensor = torch.from_numpy(image_array).unsqueeze(0)
+    if dtype == 'float16':
+        image_tensor = image_tensor.half()
     output_file = os.path.join(basedir, os.path.basename(input_img).split('.nii.gz')[0] + '.pt')
-    # save
-    torch.save(image_tensor.clone(), output_file)
+    # save (the tensor owns its memory, no need to clone it)
+    torch.save(image_tensor, output_file)
 
     return output_file
+
+
+def save_as_group_array(input_imgs, group_label, dtype='float32', n_threads=None):
+    """Saves the nifti images of a group in a single memory-mapped array
+
+    The images are decoded in parallel by a pool of threads and written in a
+    NumPy array (.npy) of shape (n_images, 1, X, Y, Z) which can be opened with
+    `numpy.load(filename, mmap_mode='r')`. A TSV file gives for each row of the
+    array the participant_id, session_id and the scale/offset needed to recover
+    the original intensities (intensity = value * scale + offset).
+
+    Args:
+        input_imgs: list of nifti images (with the same dimensions).
+        group_label: label of the group.
+        dtype: 'float32', 'float16' or 'uint8'. In 'uint8', each image is
+            linearly rescaled to [0, 255].
+        n_threads: number of threads used to decode the images.
+
+    Returns:
+        array_file (str): path to the .npy file.
+        index_file (str): path to the TSV file.
+    """
+    import os
+    from concurrent.futures import ThreadPoolExecutor
+    import nibabel as nib
+    import numpy as np
+    import pandas as pd
+    from clinica.utils.filemanip import get_subject_id
+
+    shape = nib.load(input_imgs[0]).shape
+    array_file = os.path.join(os.getcwd(), 'group-' + group_label + '_images.npy')
+    images = np.lib.format.open_memmap(array_file, mode='w+', dtype=dtype,
+                                       shape=(len(input_imgs), 1) + tuple(shape))
+    scale = np.ones(len(input_imgs))
+    offset = np.zeros(len(input_imgs))
+
+    def convert(index):
+        data = nib.load(input_imgs[index]).get_fdata(dtype=np.float32)
+        if data.shape != shape:
+            raise ValueError('Image %s has dimensions %s, but %s was expected.'
+                             % (input_imgs[index], data.shape, shape))
+        if dtype == 'uint8':
+            offset[index] = data.min()
+            scale[index] = (data.max() - offset[index]) / 255.0 or 1.0
+            data = np.rint((data - offset[index]) / scale[index])
+        images[index, 0] = data
+
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        list(executor.map(convert, range(len(input_imgs))))
+    images.flush()
+    del images
+
+    image_ids = [get_subject_id(input_img).split('_') for input_img in input_imgs]
+    index_file = os.path.join(os.getcwd(), 'group-' + group_label + '_images.tsv')
+    pd.DataFrame({'participant_id': [image_id[0] for image_id in image_ids],
+                  'session_id': [image_id[1] for image_id in image_ids],
+                  'index': range(len(input_imgs)),
+                  'scale': scale,
+                  'offset': offset}).to_csv(index_file, sep='\t', index=False)
+
+    return array_file, index_file
@@ -232,20 +232,15 @@ class DwiDti(cpe.Pipeline):
             working_directory=self.base_dir,
             name="3-Register_DTI_Maps_On_JHU")
 
+        merge_registered_maps = npe.Node(nutil.Merge(4), name='4-Merge_Registered_Maps')
+
         scalar_analysis = npe.Node(
             interface=nutil.Function(
-                input_names=['in_registered_map', 'name_map', 'prefix_file'],
-                output_names=['atlas_statistics_list'],
+                input_names=['in_registered_maps', 'name_maps', 'prefix_file'],
+                output_names=['statistics_fa', 'statistics_md', 'statistics_ad', 'statistics_rd'],
                 function=utils.statistics_on_atlases),
             name='4-Scalar_Analysis')
-        scalar_analysis_fa = scalar_analysis.clone('4-Scalar_Analysis_FA')
-        scalar_analysis_fa.inputs.name_map = 'FA'
-        scalar_analysis_md = scalar_analysis.clone('4-Scalar_Analysis_MD')
-        scalar_analysis_md.inputs.name_map = 'MD'
-        scalar_analysis_ad = scalar_analysis.clone('4-Scalar_Analysis_AD')
-        scalar_analysis_ad.inputs.name_map = 'AD'
-        scalar_analysis_rd = scalar_analysis.clone('4-Scalar_Analysis_RD')
-        scalar_analysis_rd.inputs.name_map = 'RD'
+        scalar_analysis.inputs.name_maps = ['FA', 'MD', 'AD', 'RD']
 
         thres_map = npe.Node(fsl.Threshold(thresh=0.0),
                              iterfield=['in_file'],
@@ -296,14 +291,12 @@ class DwiDti(cpe.Pipeline):
                                                         ('out_ad',  'inputnode.in_ad'),  # noqa
                                                         ('out_rd',  'inputnode.in_rd')]),  # noqa
             # Generate regional TSV files
-            (get_bids_identifier,   scalar_analysis_fa, [('bids_identifier',        'prefix_file')]),  # noqa
-            (register_on_jhu_atlas, scalar_analysis_fa, [('outputnode.out_norm_fa', 'in_registered_map')]),  # noqa
-            (get_bids_identifier,   scalar_analysis_md, [('bids_identifier',        'prefix_file')]),  # noqa
-            (register_on_jhu_atlas, scalar_analysis_md, [('outputnode.out_norm_md', 'in_registered_map')]),  # noqa
-            (get_bids_identifier,   scalar_analysis_ad, [('bids_identifier',        'prefix_file')]),  # noqa
-            (register_on_jhu_atlas, scalar_analysis_ad, [('outputnode.out_norm_ad', 'in_registered_map')]),  # noqa
-            (get_bids_identifier,   scalar_analysis_rd, [('bids_identifier',        'prefix_file')]),  # noqa
-            (register_on_jhu_atlas, scalar_analysis_rd, [('outputnode.out_norm_rd', 'in_registered_map')]),  # noqa
+            (register_on_jhu_atlas, merge_registered_maps, [('outputnode.out_norm_fa', 'in1'),  # noqa
+                                                            ('outputnode.out_norm_md', 'in2'),  # noqa
+                                                            ('outputnode.out_norm_ad', 'in3'),  # noqa
+                                                            ('outputnode.out_norm_rd', 'in4')]),  # noqa
+            (get_bids_identifier,   scalar_analysis, [('bids_identifier', 'prefix_file')]),  # noqa
+            (merge_registered_maps, scalar_analysis, [('out',             'in_registered_maps')]),  # noqa
             # Remove negative values from the DTI maps:
             (get_caps_filenames, thres_fa, [('out_fa',  'out_file')]),  # noqa
             (dti_to_metrics,     thres_fa, [('out_fa',  'in_file')]),  # noqa
@@ -329,12 +322,12 @@ class DwiDti(cpe.Pipeline):
                                                        ('outputnode.out_norm_rd',            'registered_rd'),  # noqa
                                                        ('outputnode.out_affine_matrix',      'affine_matrix'),  # noqa
                                                        ('outputnode.out_b_spline_transform', 'b_spline_transform')]),  # noqa
-            (scalar_analysis_fa,    self.output_node, [('atlas_statistics_list', 'statistics_fa')]),  # noqa
-            (scalar_analysis_md,    self.output_node, [('atlas_statistics_list', 'statistics_md')]),  # noqa
-            (scalar_analysis_ad,    self.output_node, [('atlas_statistics_list', 'statistics_ad')]),  # noqa
-            (scalar_analysis_rd,    self.output_node, [('atlas_statistics_list', 'statistics_rd')]),   # noqa
+            (scalar_analysis,       self.output_node, [('statistics_fa', 'statistics_fa'),  # noqa
+                                                       ('statistics_md', 'statistics_md'),  # noqa
+                                                       ('statistics_ad', 'statistics_ad'),  # noqa
+                                                       ('statistics_rd', 'statistics_rd')]),  # noqa
             # Print end message
             (self.input_node,    print_end_message, [('preproc_dwi',           'in_bids_or_caps_file')]),  # noqa
             (thres_rd,           print_end_message, [('out_file',              'final_file_1')]),  # noqa
-            (scalar_analysis_rd, print_end_message, [('atlas_statistics_list', 'final_file_2')]),  # noqa
+            (scalar_analysis,    print_end_message, [('statistics_rd',         'final_file_2')]),  # noqa
         ])
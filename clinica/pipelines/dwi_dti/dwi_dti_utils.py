@@ -32,50 +32,57 @@ def erode_mask(in_mask, npass=6, nthreads=2):
     return out_eroded_mask
 
 
-def statistics_on_atlases(in_registered_map, name_map, prefix_file=None):
+def statistics_on_atlases(in_registered_maps, name_maps, prefix_file=None):
     """
-    Computes a list of statistics files for each atlas.
+    Computes a list of statistics files for each map and each atlas.
+
+    The maps are loaded once and their statistics on the JHU atlases (mean,
+    standard deviation and number of voxels of each ROI) are computed
+    together (see `statistics_on_atlases_group`).
 
     Args:
-        in_registered_map (str): Map already registered on atlases.
-        name_map (str): Name of the registered map in CAPS format.
+        in_registered_maps (List[str]): Maps already registered on atlases.
+        name_maps (List[str]): Names of the registered maps in CAPS format.
         prefix_file (Opt[str]):
             <prefix_file>_space-<atlas_name>_map-<name_map>_statistics.tsv
 
     Returns:
-        List of paths leading to the statistics TSV files.
+        List (one element per map) of lists of paths leading to the
+        statistics TSV files (one per atlas).
     """
     from os import getcwd
     from os.path import abspath, join
+    import pandas
     from nipype.utils.filemanip import split_filename
-    from clinica.utils.atlas import (AtlasAbstract, JHUDTI811mm,
+    from clinica.utils.atlas import (JHUDTI811mm,
                                      JHUTracts01mm, JHUTracts251mm)
-    from clinica.utils.statistics import statistics_on_atlas
+    from clinica.utils.statistics import statistics_on_atlases_group
 
     in_atlas_list = [JHUDTI811mm(),
                      JHUTracts01mm(), JHUTracts251mm()]
 
-    atlas_statistics_list = []
-    for atlas in in_atlas_list:
-        if not isinstance(atlas, AtlasAbstract):
-            raise TypeError("Atlas element must be an AtlasAbstract type")
+    atlases_statistics = statistics_on_atlases_group(in_registered_maps, in_atlas_list)
 
-        if prefix_file is None:
-            _, base, _ = split_filename(in_registered_map)
+    atlas_statistics_lists = [[] for _ in in_registered_maps]
+    for atlas, (mean_signal_value, std_signal_value, n_voxels, label_name) in zip(in_atlas_list, atlases_statistics):
+        for i, (in_registered_map, name_map) in enumerate(zip(in_registered_maps, name_maps)):
+            if prefix_file is None:
+                _, base, _ = split_filename(in_registered_map)
+            else:
+                base = prefix_file
             filename = '%s_space-%s_res-%s_map-%s_statistics.tsv' % \
                        (base, atlas.get_name_atlas(),
                         atlas.get_spatial_resolution(), name_map)
-        else:
-            filename = '%s_space-%s_res-%s_map-%s_statistics.tsv' % \
-                       (prefix_file, atlas.get_name_atlas(),
-                        atlas.get_spatial_resolution(), name_map)
-
-        out_atlas_statistics = abspath(join(getcwd(), filename))
+            out_atlas_statistics = abspath(join(getcwd(), filename))
 
-        statistics_on_atlas(in_registered_map, atlas, out_atlas_statistics)
-        atlas_statistics_list.append(out_atlas_statistics)
+            pandas.DataFrame({'label_name': label_name,
+                              'mean_scalar': mean_signal_value[i],
+                              'std_scalar': std_signal_value[i],
+                              'n_voxels': n_voxels}).to_csv(out_atlas_statistics, sep='\t',
+                                                            index=True, encoding='utf-8')
+            atlas_statistics_lists[i].append(out_atlas_statistics)
 
-    return atlas_statistics_list
+    return atlas_statistics_lists
 
 
 def dwi_container_from_filename(dwi_filename):
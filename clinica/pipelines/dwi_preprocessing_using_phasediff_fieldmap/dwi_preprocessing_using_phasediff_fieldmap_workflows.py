@@ -58,13 +58,14 @@ def susceptibility_distortion_correction_using_phasediff_fmap(
     import nipype.interfaces.fsl as fsl
     import nipype.interfaces.ants as ants
 
+    from clinica.utils.dwi import concatenate_volumes
     from clinica.utils.epi import bids_dir_to_fsl_dir
-    from clinica.utils.fmap import resample_fmap_to_b0
+    from clinica.utils.fmap import (convert_siemens_phase_in_radians,
+                                    convert_radians_in_radsec, resample_fmap_to_b0,
+                                    demean_fmap_image, add_empty_volume)
 
-    from nipype.workflows.dmri.fsl.utils import (rads2radsec, siemens2rads,
-                                                 vsm2warp, add_empty_vol,
-                                                 cleanup_edge_pipeline,
-                                                 demean_image)
+    from nipype.workflows.dmri.fsl.utils import (vsm2warp,
+                                                 cleanup_edge_pipeline)
 
     inputnode = pe.Node(niu.IdentityInterface(
         fields=['in_dwi', 'in_mask', 'in_fmap_phasediff', 'in_fmap_magnitude',
@@ -97,14 +98,14 @@ def susceptibility_distortion_correction_using_phasediff_fmap(
     pha2rads = pe.Node(niu.Function(
         input_names=['in_file'],
         output_names=['out_file'],
-        function=siemens2rads), name='PreparePhase')
+        function=convert_siemens_phase_in_radians), name='PreparePhase')
 
     prelude = pe.Node(fsl.PRELUDE(process3d=True), name='PhaseUnwrap')
 
     rad2rsec = pe.Node(niu.Function(
         input_names=['in_file', 'delta_te'],
         output_names=['out_file'],
-        function=rads2radsec), name='ToRadSec')
+        function=convert_radians_in_radsec), name='ToRadSec')
 
     # Node when we register the fmap onto the b0
     fmm2b0 = pe.Node(ants.Registration(
@@ -144,7 +145,7 @@ def susceptibility_distortion_correction_using_phasediff_fmap(
             niu.Function(
                 input_names=['in_file', 'in_mask'],
                 output_names=['out_file'],
-                function=demean_image),
+                function=demean_fmap_image),
             name='DemeanFmap')
 
     cleanup = cleanup_edge_pipeline()
@@ -152,14 +153,16 @@ def susceptibility_distortion_correction_using_phasediff_fmap(
     add_vol = pe.Node(niu.Function(
         input_names=['in_file'],
         output_names=['out_file'],
-        function=add_empty_vol), name='AddEmptyVol')
+        function=add_empty_volume), name='AddEmptyVol')
 
     vsm = pe.Node(fsl.FUGUE(save_shift=True, **fugue_params),
                   name="ComputeVSM")
 
     split = pe.Node(fsl.Split(dimension='t'), name='SplitDWIs')
 
-    merge = pe.Node(fsl.Merge(dimension='t'), name='MergeDWIs')
+    merge = pe.Node(niu.Function(input_names=['in_files'],
+                                 output_names=['merged_file'],
+                                 function=concatenate_volumes), name='MergeDWIs')
 
     unwarp = pe.MapNode(fsl.FUGUE(icorr=True, forward_warping=False),
                         iterfield=['in_file'], name='UnwarpDWIs')
@@ -58,6 +58,7 @@ def susceptibility_distortion_correction_using_t1(
     import nipype.interfaces.fsl as fsl
     import \
         clinica.pipelines.dwi_preprocessing_using_t1.dwi_preprocessing_using_t1_utils as utils
+    from clinica.utils.dwi import concatenate_volumes
 
     def expend_matrix_list(in_matrix, in_bvec):
         import numpy as np
@@ -165,7 +166,9 @@ def susceptibility_distortion_correction_using_t1(
     thres = pe.MapNode(fsl.Threshold(thresh=0.0), iterfield=['in_file'],
                        name='RemoveNegative')
 
-    merge = pe.Node(fsl.Merge(dimension='t'), name='MergeDWIs')
+    merge = pe.Node(niu.Function(input_names=['in_files'],
+                                 output_names=['merged_file'],
+                                 function=concatenate_volumes), name='MergeDWIs')
 
     outputnode = pe.Node(niu.IdentityInterface(
         fields=['dwi_to_t1_coregistration_matrix',
@@ -245,6 +248,7 @@ def apply_all_corrections_using_ants(name='UnwarpArtifacts'):
     import nipype.interfaces.fsl as fsl
     import nipype.interfaces.utility as niu
     import nipype.pipeline.engine as pe
+    from clinica.utils.dwi import concatenate_volumes
 
     inputnode = pe.Node(niu.IdentityInterface(
         fields=['in_sdc_syb', 'in_hmc', 'in_ecc', 'in_dwi', 'in_t1']),
@@ -278,7 +282,9 @@ def apply_all_corrections_using_ants(name='UnwarpArtifacts'):
 
     thres = pe.MapNode(fsl.Threshold(thresh=0.0), iterfield=['in_file'],
                        name='RemoveNegative')
-    merge = pe.Node(fsl.Merge(dimension='t'), name='MergeDWIs')
+    merge = pe.Node(niu.Function(input_names=['in_files'],
+                                 output_names=['merged_file'],
+                                 function=concatenate_volumes), name='MergeDWIs')
 
     wf = pe.Workflow(name=name)
     wf.connect([
@@ -30,6 +30,96 @@ def postset(attribute, value):
     return postset_decorator
 
 
+def run_pipelines(workflow, pipelines, plugin=None, plugin_args=None, update_hash=False, bypass_check=False):
+    """Runs the Nipype graph of one or several Clinica pipelines.
+
+    Shared by Pipeline.run and PipelineChain.run: the checks (cross-sectional
+    dataset, disk space, number of threads, resources of the nodes) are done
+    for each pipeline, then the graph is run with the MATLAB pool and the
+    NIfTI cache (if enabled) and the images which failed are reported.
+
+    Args:
+        workflow: Pipeline or PipelineChain to run.
+        pipelines: List of the pipelines of the workflow.
+        Other arguments: Similar to those of Workflow.run.
+
+    Returns:
+        An execution graph (see Workflow.run).
+    """
+    import os
+    import shutil
+    import time
+    from networkx import Graph, NetworkXError
+    from colorama import Fore
+    from clinica.utils.ux import print_failed_images
+    from clinica.utils.stream import cprint
+    from clinica.utils.preflight import is_batch_mode
+    from clinica.utils.profiling import timer, is_profiling_enabled, get_io_counters, write_profiling_report
+    from clinica.utils.hashing import check_hash_method_context
+    from clinica.utils.matlab_pool import matlab_pool
+    from clinica.utils.nifti_staging import nifti_cache
+    from clinica.utils.working_directory import get_working_directory_policy, CleaningMultiProcPlugin
+
+    start_time = time.time()
+    io_start = get_io_counters()
+    if not workflow.is_built:
+        workflow.build()
+    pipelines[0].check_not_cross_sectional()
+    if not bypass_check:
+        for pipeline in pipelines:
+            with timer('check_size'):
+                if is_batch_mode():
+                    plugin_args = pipeline.run_preflight(plugin_args)
+                else:
+                    pipeline.check_size()
+        if not is_batch_mode():
+            plugin_args = pipelines[0].update_parallelize_info(plugin_args)
+        for pipeline in pipelines:
+            plugin_args = pipeline.set_node_resources(plugin_args)
+        plugin = 'MultiProc'
+    if plugin == 'MultiProc' and get_working_directory_policy() == 'clean':
+        plugin = CleaningMultiProcPlugin(plugin_args=plugin_args)
+    check_hash_method_context(plugin, plugin_args)
+    exec_graph = []
+    try:
+        remove_nifti_cache = get_working_directory_policy() == 'clean' or not workflow.base_dir_was_specified
+        with matlab_pool(), nifti_cache(workflow.base_dir, remove=remove_nifti_cache):
+            exec_graph = Workflow.run(workflow, plugin, plugin_args, update_hash)
+        for pipeline in pipelines:
+            pipeline.update_resource_profiles(exec_graph)
+        if is_profiling_enabled():
+            if workflow.base_dir_was_specified:
+                output_dir = os.path.join(workflow.base_dir, workflow.name)
+            else:
+                output_dir = os.path.join(pipelines[-1].caps_directory, 'profiling')
+            report_json, _ = write_profiling_report(workflow.name, exec_graph, time.time() - start_time,
+                                                    io_start, output_dir)
+            cprint('%sProfiling report written in %s%s' % (Fore.GREEN, report_json, Fore.RESET))
+        if not workflow.base_dir_was_specified:
+            shutil.rmtree(workflow.base_dir)
+
+    except RuntimeError as e:
+        # Check that it is a Nipype error
+        if 'Workflow did not execute cleanly. Check log for details' in str(e):
+            for pipeline in pipelines:
+                input_ids = [p_id + '_' + s_id
+                             for p_id, s_id in zip(pipeline.subjects, pipeline.sessions)]
+                output_ids = pipeline.get_processed_images(
+                    caps_directory=pipeline.caps_directory,
+                    subjects=pipeline.subjects,
+                    sessions=pipeline.sessions
+                )
+                missing_ids = list(set(input_ids) - set(output_ids))
+                print_failed_images(pipeline.name, missing_ids)
+        else:
+            raise e
+    except NetworkXError:
+        cprint('%sEither all the images were already run by the pipeline or no image was found '
+               'to run the pipeline.\n%s' % (Fore.BLUE, Fore.RESET))
+        exec_graph = Graph()
+    return exec_graph
+
+
 class Pipeline(Workflow):
     """Clinica Pipeline class.
 
@@ -94,6 +184,7 @@ class Pipeline(Workflow):
         from clinica.utils.participant import get_subject_session_list
 
         self._is_built = False
+        self._is_chained = False
         self._overwrite_caps = overwrite_caps
         self._bids_directory = bids_directory
         self._caps_directory = caps_directory
@@ -186,9 +277,14 @@ class Pipeline(Workflow):
     def has_input_connections(self):
         """Checks if the Pipeline's input node has been connected.
 
+        The input node of a Pipeline fed by other pipelines of a PipelineChain
+        is considered as connected.
+
         Returns:
             True if the input node is connected, False otherwise.
         """
+        if self.is_chained:
+            return True
         if self.input_node:
             return self._graph.in_degree(self.input_node) > 0
         else:
@@ -219,11 +315,17 @@ class Pipeline(Workflow):
         Returns:
             self: A Pipeline object.
         """
+        from clinica.utils.profiling import timer
+        from clinica.utils.preflight import is_batch_mode, start_preflight
+
         if not self.is_built:
+            if is_batch_mode():
+                start_preflight(self.name, self.bids_directory, self.caps_directory)
             self.check_dependencies()
             self.check_pipeline_parameters()
             if not self.has_input_connections():
-                self.build_input_node()
+                with timer('build_input_node'):
+                    self.build_input_node()
             self.build_core_nodes()
             if not self.has_output_connections():
                 self.build_output_node()
@@ -237,7 +339,15 @@ class Pipeline(Workflow):
         run it.
         It also checks whether there is enough space left on the disks, and if
         the number of threads to run in parallel is consistent with what is
-        possible on the CPU.
+        possible on the CPU. The memory and number of threads needed by each
+        node are given to the MultiProc scheduler (see `set_node_resources`).
+
+        In batch mode (see clinica.utils.preflight), these checks do not wait
+        for an answer of the user (see `run_preflight`).
+
+        When profiling is enabled (see clinica.utils.profiling), a report of
+        the run is written. The run itself is shared with PipelineChain (see
+        `run_pipelines`).
 
         Args:
             Similar to those of Workflow.run.
@@ -245,44 +355,7 @@ class Pipeline(Workflow):
         Returns:
             An execution graph (see Workflow.run).
         """
-        import shutil
-        from networkx import Graph, NetworkXError
-        from colorama import Fore
-        from clinica.utils.ux import print_failed_images
-        from clinica.utils.stream import cprint
-
-        if not self.is_built:
-            self.build()
-        self.check_not_cross_sectional()
-        if not bypass_check:
-            self.check_size()
-            plugin_args = self.update_parallelize_info(plugin_args)
-            plugin = 'MultiProc'
-        exec_graph = []
-        try:
-            exec_graph = Workflow.run(self, plugin, plugin_args, update_hash)
-            if not self.base_dir_was_specified:
-                shutil.rmtree(self.base_dir)
-
-        except RuntimeError as e:
-            # Check that it is a Nipype error
-            if 'Workflow did not execute cleanly. Check log for details' in str(e):
-                input_ids = [p_id + '_' + s_id
-                             for p_id, s_id in zip(self.subjects, self.sessions)]
-                output_ids = self.get_processed_images(
-                    caps_directory=self.caps_directory,
-                    subjects=self.subjects,
-                    sessions=self.sessions
-                )
-                missing_ids = list(set(input_ids) - set(output_ids))
-                print_failed_images(self.name, missing_ids)
-            else:
-                raise e
-        except NetworkXError:
-            cprint('%sEither all the images were already run by the pipeline or no image was found '
-                   'to run the pipeline.\n%s' % (Fore.BLUE, Fore.RESET))
-            exec_graph = Graph()
-        return exec_graph
+        return run_pipelines(self, [self], plugin, plugin_args, update_hash, bypass_check)
 
     def load_info(self):
         """Loads the associated info.json file.
@@ -307,7 +380,9 @@ class Pipeline(Workflow):
         Loads the pipelines related `info.json` file and check each one of the
         dependencies listed in the JSON "dependencies" field. Its raises
         exception if a program in the list does not exist or if environment
-        variables are not properly defined.
+        variables are not properly defined. In batch mode, the result is stored
+        in the preflight result and the checks are skipped by the next runs
+        while the environment variables locating the software are unchanged.
 
         Todo:
             - [ ] MATLAB toolbox dependency checking
@@ -322,7 +397,9 @@ class Pipeline(Workflow):
         Returns:
             self: A Pipeline object.
         """
+        from concurrent.futures import ThreadPoolExecutor
         import clinica.utils.check_dependency as chk
+        from clinica.utils.preflight import get_preflight_result, get_environment_fingerprint
 
         # Checking functions preparation
         check_software = {
@@ -343,21 +420,36 @@ class Pipeline(Workflow):
         if not self.info:
             self.load_info()
 
-        # Dependencies checking
-        for d in self.info['dependencies']:
+        # In batch mode, dependencies already found in the same environment are not checked again
+        preflight = get_preflight_result()
+        environment = get_environment_fingerprint()
+        if (preflight is not None and not chk.is_dependency_cache_refreshed()
+                and preflight.get('dependencies', {}).get('environment') == environment):
+            return self
+
+        def check_dependency(d):
             if d['type'] == 'software':
                 check_software[d['name']](d['version'])
             elif d['type'] == 'binary':
                 check_binary(d['name'])
-            elif d['type'] == 'toolbox':
-                pass
-            elif d['type'] == 'pipeline':
-                pass
-            else:
+
+        for d in self.info['dependencies']:
+            if d['type'] not in ['software', 'binary', 'toolbox', 'pipeline']:
                 raise Exception("Pipeline.check_dependencies() Unknown dependency type: '%s'." % d['type'])
 
+        # Dependencies checking (some checks launch the software, they are run in parallel)
+        with ThreadPoolExecutor() as executor:
+            list(executor.map(check_dependency, self.info['dependencies']))
+
         self.check_custom_dependencies()
 
+        if preflight is not None:
+            preflight['dependencies'] = {
+                'environment': environment,
+                'checked': [{k: d.get(k) for k in ['type', 'name', 'version']}
+                            for d in self.info['dependencies']]
+            }
+
         return self
 
     def check_size(self):
@@ -365,14 +457,57 @@ class Pipeline(Workflow):
         working directory and caps directory
 
         Author: Arnaud Marcoux"""
-        from os import statvfs
-        from os.path import dirname, abspath, join
-        from pandas import read_csv
         from clinica.utils.stream import cprint
         from colorama import Fore
         import sys
         import select
 
+        timeout = 15
+
+        disk_space = self.get_disk_space()
+        if disk_space is None:
+            cprint(Fore.RED + 'No info on how much size the pipeline takes. '
+                   + 'Running anyway...' + Fore.RESET)
+            return
+        error = disk_space['error']
+        if error != '':
+            cprint(Fore.RED + '[SpaceError] ' + error + Fore.RESET)
+            while True:
+                cprint('Do you still want to run the pipeline? (yes/no): '
+                       + ' In ' + str(timeout) + ' sec the pipeline will start if you do not answer.')
+                stdin_answer, __, ___ = select.select([sys.stdin], [], [], timeout)
+                if stdin_answer:
+                    answer = str(sys.stdin.readline().strip())
+                # Else: is taken when no answer is given (timeout)
+                else:
+                    answer = 'yes'
+
+                if answer.lower() in ['yes', 'no']:
+                    break
+                else:
+                    cprint('Possible answers are yes or no.\n')
+            if answer.lower() == 'yes':
+                cprint('Running the pipeline anyway.')
+            if answer.lower() == 'no':
+                cprint('Exiting clinica...')
+                sys.exit()
+
+    def get_disk_space(self):
+        """Estimates the space needed by the pipeline in the CAPS and working
+        directories and the space left on their disks.
+
+        Returns:
+            Dictionary with keys 'caps' and 'working_directory' (each a
+            dictionary with the 'needed' and 'free' bytes) and 'error' (message,
+            empty if there is enough space), None if the `info.json` file of
+            the pipeline does not give the space needed.
+        """
+        from os import statvfs
+        from os.path import dirname
+        from clinica.utils.preflight import get_available_cpus
+        from clinica.utils.working_directory import get_working_directory_policy
+        from clinica.utils.nifti_staging import is_nifti_cache_enabled, estimate_nifti_cache_size
+
         SYMBOLS = {
             'customary': ('B', 'K', 'M', 'G', 'T', 'P', 'E', 'Z', 'Y'),
             'customary_ext': (
@@ -446,8 +581,6 @@ class Pipeline(Workflow):
                 prefix[s] = 1 << (i + 1) * 10
             return int(num * prefix[letter])
 
-        timeout = 15
-
         # Get the number of sessions
         n_sessions = len(self.subjects)
         try:
@@ -464,51 +597,64 @@ class Pipeline(Workflow):
         try:
             space_needed_caps_1_session = self.info['space_caps']
             space_needed_wd_1_session = self.info['space_wd']
-            space_needed_caps = n_sessions * human2bytes(space_needed_caps_1_session)
+        except KeyError:
+            return None
+        space_needed_caps = n_sessions * human2bytes(space_needed_caps_1_session)
+        if get_working_directory_policy() == 'clean':
+            # Intermediate files are removed once each session is finished
+            space_needed_wd = min(n_sessions, get_available_cpus()) * human2bytes(space_needed_wd_1_session)
+        else:
             space_needed_wd = n_sessions * human2bytes(space_needed_wd_1_session)
-            error = ''
-            if free_space_caps == free_space_wd:
-                if space_needed_caps + space_needed_wd > free_space_wd:
-                    # We assume this is the same disk
-                    error = error \
-                            + 'Space needed for CAPS and working directory (' \
-                            + bytes2human(space_needed_caps + space_needed_wd) \
-                            + ') is greater than what is left on your hard drive (' \
-                            + bytes2human(free_space_wd) + ')'
-            else:
-                if space_needed_caps > free_space_caps:
-                    error = error + ('Space needed for CAPS (' + bytes2human(space_needed_caps)
-                                     + ') is greater than what is left on your hard '
-                                     + 'drive (' + bytes2human(free_space_caps) + ')\n')
-                if space_needed_wd > free_space_wd:
-                    error = error + ('Space needed for working_directory ('
-                                     + bytes2human(space_needed_wd) + ') is greater than what is left on your hard '
-                                     + 'drive (' + bytes2human(free_space_wd) + ')\n')
-            if error != '':
-                cprint(Fore.RED + '[SpaceError] ' + error + Fore.RESET)
-                while True:
-                    cprint('Do you still want to run the pipeline? (yes/no): '
-                           + ' In ' + str(timeout) + ' sec the pipeline will start if you do not answer.')
-                    stdin_answer, __, ___ = select.select([sys.stdin], [], [], timeout)
-                    if stdin_answer:
-                        answer = str(sys.stdin.readline().strip())
-                    # Else: is taken when no answer is given (timeout)
-                    else:
-                        answer = 'yes'
+        if is_nifti_cache_enabled():
+            # The NIfTI cache keeps the decompressed inputs of all the sessions until the end of the run
+            space_needed_wd += estimate_nifti_cache_size(self.get_input_files())
+        error = ''
+        if free_space_caps == free_space_wd:
+            if space_needed_caps + space_needed_wd > free_space_wd:
+                # We assume this is the same disk
+                error = error \
+                        + 'Space needed for CAPS and working directory (' \
+                        + bytes2human(space_needed_caps + space_needed_wd) \
+                        + ') is greater than what is left on your hard drive (' \
+                        + bytes2human(free_space_wd) + ')'
+        else:
+            if space_needed_caps > free_space_caps:
+                error = error + ('Space needed for CAPS (' + bytes2human(space_needed_caps)
+                                 + ') is greater than what is left on your hard '
+                                 + 'drive (' + bytes2human(free_space_caps) + ')\n')
+            if space_needed_wd > free_space_wd:
+                error = error + ('Space needed for working_directory ('
+                                 + bytes2human(space_needed_wd) + ') is greater than what is left on your hard '
+                                 + 'drive (' + bytes2human(free_space_wd) + ')\n')
+
+        return {
+            'caps': {'needed': space_needed_caps, 'free': free_space_caps},
+            'working_directory': {'needed': space_needed_wd, 'free': free_space_wd},
+            'error': error,
+        }
 
-                    if answer.lower() in ['yes', 'no']:
-                        break
-                    else:
-                        cprint('Possible answers are yes or no.\n')
-                if answer.lower() == 'yes':
-                    cprint('Running the pipeline anyway.')
-                if answer.lower() == 'no':
-                    cprint('Exiting clinica...')
-                    sys.exit()
+    def get_input_files(self):
+        """Files given to the nodes of the built pipeline (inputs and iterables of the nodes, e.g. the images of
+        each session read from BIDS or CAPS)."""
+        import os
 
-        except KeyError:
-            cprint(Fore.RED + 'No info on how much size the pipeline takes. '
-                   + 'Running anyway...' + Fore.RESET)
+        def get_files(value):
+            if isinstance(value, str):
+                return [value] if os.path.isfile(value) else []
+            if isinstance(value, (list, tuple)):
+                return [f for element in value for f in get_files(element)]
+            return []
+
+        input_files = []
+        for node in self._get_all_nodes():
+            iterables = getattr(node, 'iterables', None)
+            if isinstance(iterables, tuple):
+                iterables = [iterables]
+            if isinstance(iterables, list):
+                for _, values in iterables:
+                    input_files += get_files(values)
+            input_files += get_files(list(node.inputs.get().values()))
+        return input_files
 
     def update_parallelize_info(self, plugin_args):
         """ Performs some checks of the number of threads given in parameters,
@@ -580,6 +726,165 @@ class Pipeline(Workflow):
 
         return plugin_args
 
+    def run_preflight(self, plugin_args):
+        """Non-interactive version of `check_size` and `update_parallelize_info`.
+
+        Problems are reported without waiting for an answer of the user and
+        the pipeline runs anyway. If the number of threads is not given, all
+        the CPUs available to the process (e.g. allocated by SLURM) are used.
+        The disk space and CPUs are added to the preflight result of the
+        pipeline, which is then saved in the Clinica cache directory.
+
+        Returns:
+            plugin_args updated with the number of threads.
+        """
+        from colorama import Fore
+        from clinica.utils.stream import cprint
+        from clinica.utils.preflight import (get_available_cpus, get_preflight_result,
+                                             start_preflight, save_preflight)
+
+        preflight = get_preflight_result()
+        if preflight is None:
+            preflight = start_preflight(self.name, self.bids_directory, self.caps_directory)
+
+        disk_space = self.get_disk_space()
+        if disk_space is None:
+            cprint(Fore.YELLOW + '[Warning] No info on how much size the pipeline takes.' + Fore.RESET)
+        elif disk_space['error'] != '':
+            cprint(Fore.RED + '[SpaceError] ' + disk_space['error'] + Fore.RESET)
+            cprint('Batch mode: running the pipeline anyway.')
+
+        n_cpu = get_available_cpus()
+        if plugin_args is None:
+            plugin_args = {}
+        if not plugin_args.get('n_procs'):
+            plugin_args['n_procs'] = n_cpu
+        elif plugin_args['n_procs'] > n_cpu:
+            cprint(Fore.YELLOW + '[Warning] You are trying to run clinica with a number of threads ('
+                   + str(plugin_args['n_procs']) + ') superior to the number of available CPUs ('
+                   + str(n_cpu) + ').' + Fore.RESET)
+
+        preflight['disk'] = disk_space
+        preflight['cpu'] = {'n_cpu': n_cpu, 'n_procs': plugin_args['n_procs']}
+        preflight_file = save_preflight()
+        cprint('Preflight checks of %s written in %s' % (self.name, preflight_file))
+
+        return plugin_args
+
+    def get_resource_profiles_file(self):
+        """Returns the path of the runtime profiles recorded for this pipeline (in the Clinica cache directory)."""
+        from os.path import join
+        from clinica.utils.filemanip import get_cache_directory
+
+        return join(get_cache_directory(), 'resource_profiles', self.__class__.__name__ + '.json')
+
+    def load_resource_profiles(self):
+        """Loads the runtime profiles recorded by previous runs of the pipeline.
+
+        Returns:
+            Dictionary {node name: {'memory_gb': peak memory, 'n_procs': number of threads}}.
+        """
+        import json
+        from os.path import isfile
+
+        profiles_file = self.get_resource_profiles_file()
+        if not isfile(profiles_file):
+            return {}
+        try:
+            with open(profiles_file) as f:
+                return json.load(f)
+        except ValueError:
+            return {}
+
+    def set_node_resources(self, plugin_args):
+        """Sets the estimated memory and number of threads of the nodes of the Pipeline.
+
+        Estimates are read from the optional "resources" field of the
+        `info.json` file, e.g.:
+            "resources": {"1-SegmentationReconAll": {"memory_gb": 3, "n_procs": 1}}
+        and replaced by the runtime profiles recorded by previous runs when
+        they exist (see `update_resource_profiles`). They are bounded by the
+        resources given to the MultiProc plugin so that no node is rejected.
+
+        Args:
+            plugin_args: Arguments of the MultiProc plugin.
+
+        Returns:
+            plugin_args with the memory (memory_gb) available to the scheduler.
+        """
+        from multiprocessing import cpu_count
+        from nipype.utils.profiler import get_system_total_memory_gb
+
+        if not self.info:
+            self.load_info()
+
+        plugin_args = dict(plugin_args or {})
+        plugin_args.setdefault('n_procs', cpu_count())
+        plugin_args.setdefault('memory_gb', round(0.9 * get_system_total_memory_gb(), 2))
+
+        resources = dict(self.info.get('resources', {}))
+        for node_name, profile in self.load_resource_profiles().items():
+            resources[node_name] = dict(resources.get(node_name, {}), **profile)
+
+        for node_name, resource in resources.items():
+            node = self.get_node(node_name)
+            if node is None:
+                continue
+            if 'memory_gb' in resource:
+                node._mem_gb = min(float(resource['memory_gb']), plugin_args['memory_gb'])
+            if 'n_procs' in resource:
+                node.n_procs = max(1, min(int(resource['n_procs']), plugin_args['n_procs']))
+
+        return plugin_args
+
+    def update_resource_profiles(self, exec_graph):
+        """Records the peak memory and number of threads used by each node.
+
+        Values are only available when the resource monitor of Nipype is
+        enabled. For each node, the maximum over all runs is kept.
+
+        Args:
+            exec_graph: Execution graph returned by Workflow.run.
+        """
+        import json
+        import math
+        import os
+        from os.path import dirname
+
+        profiles = self.load_resource_profiles()
+        updated = False
+        for node in exec_graph.nodes():
+            try:
+                runtime = node.result.runtime
+            except Exception:
+                continue
+            runtimes = runtime if isinstance(runtime, list) else [runtime]
+            memory = [getattr(r, 'mem_peak_gb', None) for r in runtimes]
+            memory = [m for m in memory if m is not None]
+            cpu = [getattr(r, 'cpu_percent', None) for r in runtimes]
+            cpu = [c for c in cpu if c is not None]
+            if not memory:
+                continue
+
+            # Nodes are prefixed by the name of the Pipeline (and of the PipelineChain running it)
+            prefix = '.' + self.name + '.'
+            if prefix not in '.' + node.fullname:
+                continue
+            node_name = ('.' + node.fullname).split(prefix, 1)[-1]
+            profile = profiles.get(node_name, {'memory_gb': 0, 'n_procs': 1})
+            profile['memory_gb'] = round(max(profile['memory_gb'], max(memory)), 3)
+            if cpu:
+                profile['n_procs'] = max(profile['n_procs'], int(math.ceil(max(cpu) / 100.)))
+            profiles[node_name] = profile
+            updated = True
+
+        if updated:
+            profiles_file = self.get_resource_profiles_file()
+            os.makedirs(dirname(profiles_file), exist_ok=True)
+            with open(profiles_file + '.tmp', 'w') as f:
+                json.dump(profiles, f, indent=4, sort_keys=True)
+            os.replace(profiles_file + '.tmp', profiles_file)
+
     def check_not_cross_sectional(self):
         """
         This function checks if the dataset is longitudinal. If it is cross
@@ -591,6 +896,8 @@ class Pipeline(Workflow):
         from os.path import join, isdir, dirname, abspath, basename
         from colorama import Fore
         from clinica.utils.stream import cprint
+        from clinica.utils.exceptions import ClinicaBIDSError
+        from clinica.utils.preflight import is_batch_mode
         import sys
 
         def convert_cross_sectional(bids_in,
@@ -757,6 +1064,10 @@ class Pipeline(Workflow):
                 proposed_bids = join(dirname(bids_dir),
                                      basename(bids_dir) + '_clinica_compliant')
 
+                if is_batch_mode():
+                    raise ClinicaBIDSError('The BIDS folder %s contains cross-sectional subjects: convert it '
+                                           'into %s by running Clinica without the --batch option.'
+                                           % (bids_dir, proposed_bids))
                 while True:
                     cprint('Do you want to proceed to the conversion in an other '
                            + 'folder? (your original BIDS folder will not be'
@@ -791,6 +1102,12 @@ class Pipeline(Workflow):
     @is_built.setter
     def is_built(self, value): self._is_built = value
 
+    @property
+    def is_chained(self): return self._is_chained
+
+    @is_chained.setter
+    def is_chained(self, value): self._is_chained = value
+
     @property
     def overwrite_caps(self): return self._overwrite_caps
 
@@ -904,3 +1221,143 @@ class Pipeline(Workflow):
     def check_pipeline_parameters(self):
         """Check pipeline parameters."""
         pass
+
+
+class PipelineChain(Workflow):
+    """Runs several Clinica pipelines in a single Nipype graph.
+
+    The input nodes of the chained pipelines are fed by the nodes of the
+    pipelines run before them instead of reading files in the BIDS/CAPS
+    directories. The dataset is thus scanned once, each image goes through
+    the next stage as soon as the inputs of this stage are ready, and the
+    MultiProc scheduler keeps all the cores busy across pipeline boundaries.
+
+    Example:
+        chain = PipelineChain([segmentation, create_dartel], name='T1Volume')
+        chain.connect_pipelines(segmentation, 'WriteCAPS.out_file',
+                                create_dartel, 'dartel_input_images',
+                                join_source='ReadingFiles')
+        chain.run(plugin_args={'n_procs': 8})
+    """
+
+    def __init__(self, pipelines, name=None, base_dir=None):
+        """Init a PipelineChain object.
+
+        Args:
+            pipelines: List of Pipeline objects, in execution order.
+            name (optional): Name of the chain (default: name of the first pipeline followed by 'Chain').
+            base_dir (optional): Working directory (attribute of Nipype::Workflow class).
+        """
+        import shutil
+        from tempfile import mkdtemp
+
+        super(PipelineChain, self).__init__(name=name or pipelines[0].name + 'Chain')
+        self._pipelines = pipelines
+        self._pipeline_connections = []
+        self._is_built = False
+        if base_dir is None:
+            self.base_dir = mkdtemp()
+            self._base_dir_was_specified = False
+        else:
+            self.base_dir = base_dir
+            self._base_dir_was_specified = True
+        # The pipelines are run in the working directory of the chain: their own temporary one is not used
+        for pipeline in pipelines:
+            if not pipeline.base_dir_was_specified:
+                shutil.rmtree(pipeline.base_dir, ignore_errors=True)
+                pipeline.base_dir = self.base_dir
+
+    @property
+    def pipelines(self): return self._pipelines
+
+    @property
+    def base_dir_was_specified(self): return self._base_dir_was_specified
+
+    @property
+    def is_built(self): return self._is_built
+
+    @is_built.setter
+    def is_built(self, value): self._is_built = value
+
+    def connect_pipelines(self, source, output, target, input_field,
+                          join_source=None, function=None, function_args=None):
+        """Feeds an input field of a pipeline with the output of a previous one.
+
+        Args:
+            source: Pipeline giving the value.
+            output: Output field of the source ('field' for a field of its
+                output node, 'node.field' for any other node, e.g. a DataSink).
+            target: Pipeline receiving the value in its input node.
+            input_field: Input field of the target.
+            join_source (optional): Name of the node of the source iterating over
+                the images: the values of all the images are then gathered in a
+                list (in the order of the iterables) before being given to the target.
+            function (optional): Function (with self-contained imports) applied
+                to the value. Its first argument receives the value.
+            function_args (optional): Dictionary with the other arguments of the function.
+
+        Returns:
+            self: A PipelineChain object.
+        """
+        target.is_chained = True
+        self._pipeline_connections.append({
+            'source': source, 'output': output if '.' in output else source.output_node.name + '.' + output,
+            'target': target, 'input': input_field,
+            'join_source': join_source, 'function': function, 'function_args': function_args or {},
+        })
+        return self
+
+    @postset('is_built', True)
+    def build(self):
+        """Builds the pipelines and connects them.
+
+        Returns:
+            self: A PipelineChain object.
+        """
+        import inspect
+        import nipype.pipeline.engine as npe
+        import nipype.interfaces.utility as nutil
+
+        if self.is_built:
+            return self
+
+        for pipeline in self.pipelines:
+            pipeline.build()
+        self.add_nodes(self.pipelines)
+
+        for connection in self._pipeline_connections:
+            prefix = '%s_%s' % (connection['target'].name, connection['input'])
+            node, field = connection['source'], connection['output']
+            if connection['join_source']:
+                join_node = npe.JoinNode(nutil.IdentityInterface(fields=['values']),
+                                         joinsource=connection['join_source'],
+                                         joinfield=['values'],
+                                         name=prefix + '_join')
+                self.connect(node, field, join_node, 'values')
+                node, field = join_node, 'values'
+            if connection['function']:
+                function_node = npe.Node(nutil.Function(output_names=['out_value'],
+                                                        function=connection['function']),
+                                         name=prefix + '_function')
+                for arg_name, arg_value in connection['function_args'].items():
+                    setattr(function_node.inputs, arg_name, arg_value)
+                self.connect(node, field, function_node, inspect.getfullargspec(connection['function']).args[0])
+                node, field = function_node, 'out_value'
+            target = connection['target']
+            self.connect(node, field, target, target.input_node.name + '.' + connection['input'])
+        return self
+
+    def run(self, plugin=None, plugin_args=None, update_hash=False, bypass_check=False):
+        """Executes the pipelines.
+
+        The checks of Pipeline.run (cross-sectional dataset, disk space,
+        number of threads, resources of the nodes) are done for each pipeline
+        before running the whole graph.
+
+        Args:
+            Similar to those of Workflow.run.
+
+        Returns:
+            An execution graph (see Workflow.run).
+        """
+        return run_pipelines(self, self.pipelines, plugin, plugin_args, update_hash, bypass_check)
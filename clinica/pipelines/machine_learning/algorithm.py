@@ -46,7 +46,11 @@ class DualSVMAlgorithm(base.MLAlgorithm):
 
         return res['balanced_accuracy']
 
-    def _select_best_parameter(self, async_result):
+    def _select_best_parameter(self, async_result, reference_c=None):
+        """Select the C of best balanced accuracy of each inner fold.
+
+        Ties are broken towards reference_c (nearest C in log scale) if given, otherwise towards the first C.
+        """
 
         c_values = []
         accuracies = []
@@ -60,6 +64,9 @@ class DualSVMAlgorithm(base.MLAlgorithm):
                 if acc > best_acc:
                     best_c = c
                     best_acc = acc
+                elif acc == best_acc and reference_c is not None and \
+                        abs(np.log10(c / reference_c)) < abs(np.log10(best_c / reference_c)):
+                    best_c = c
             c_values.append(best_c)
             accuracies.append(best_acc)
 
@@ -115,6 +122,95 @@ class DualSVMAlgorithm(base.MLAlgorithm):
 
         return result
 
+    def evaluate_learning_curve(self, train_index, test_index, learning_folds):
+        """Evaluate the learning points of a learning curve incrementally.
+
+        The training sets of the learning points are nested: the subjects are ordered by learning fold so that the
+        kernel of each point is a leading sub-block of the kernel of the iteration, sliced once. The inner folds of
+        the grid search are assigned once per subject (balanced per class for every learning point), and after the
+        first point, only the learning_curve_c_window values of c_range on each side of the previous best C are
+        evaluated. Ties between values of C are broken towards the previous best C (the centre of c_range for the
+        first point), and the whole c_range is evaluated again when the best C is at an edge of the window.
+        """
+
+        c_range = list(self._algorithm_params['c_range'])
+        n_inner_folds = self._algorithm_params['grid_search_folds']
+        c_window = self._algorithm_params['learning_curve_c_window']
+
+        # Subjects ordered by learning fold (shuffled within each fold)
+        order = np.concatenate([np.random.permutation(fold) for fold in learning_folds]).ravel()
+        ordered_train_index = train_index[order]
+        train_kernel = self._kernel[ordered_train_index, :][:, ordered_train_index]
+        test_kernel = self._kernel[test_index, :][:, ordered_train_index]
+        y_train_all = self._y[ordered_train_index]
+        y_test = self._y[test_index]
+
+        # Inner folds assigned in turn within each class
+        inner_folds = np.zeros(len(order), dtype=int)
+        class_counts = {}
+        for k, label in enumerate(y_train_all):
+            inner_folds[k] = class_counts.get(label, 0) % n_inner_folds
+            class_counts[label] = class_counts.get(label, 0) + 1
+
+        results = []
+        c_indexes = list(range(len(c_range)))
+        reference_c = c_range[len(c_range) // 2]
+        n_train = 0
+        for fold in learning_folds:
+            n_train += len(fold)
+            outer_kernel = train_kernel[:n_train, :n_train]
+            y_train = y_train_all[:n_train]
+
+            inner_pool = ThreadPool(self._algorithm_params['n_threads'])
+            async_result = {}
+            for i in range(n_inner_folds):
+                inner_train_index = np.flatnonzero(inner_folds[:n_train] != i)
+                inner_test_index = np.flatnonzero(inner_folds[:n_train] == i)
+                if len(inner_test_index) == 0 or len(np.unique(y_train[inner_train_index])) < 2:
+                    continue
+                async_result[i] = {}
+
+                inner_kernel = outer_kernel[inner_train_index, :][:, inner_train_index]
+                x_test_inner = outer_kernel[inner_test_index, :][:, inner_train_index]
+                y_train_inner, y_test_inner = y_train[inner_train_index], y_train[inner_test_index]
+
+                for c_index in c_indexes:
+                    async_result[i][c_range[c_index]] = inner_pool.apply_async(self._grid_search,
+                                                                               (inner_kernel, x_test_inner,
+                                                                                y_train_inner, y_test_inner,
+                                                                                c_range[c_index]))
+            inner_pool.close()
+            inner_pool.join()
+
+            best_parameter = self._select_best_parameter(async_result, reference_c)
+            _, y_hat, auc, y_hat_train = self._launch_svc(outer_kernel, test_kernel[:, :n_train],
+                                                          y_train, y_test, best_parameter['c'])
+
+            result = dict()
+            result['best_parameter'] = best_parameter
+            result['evaluation'] = utils.evaluate_prediction(y_test, y_hat)
+            result['evaluation_train'] = utils.evaluate_prediction(y_train, y_hat_train)
+            result['y_hat'] = y_hat
+            result['y_hat_train'] = y_hat_train
+            result['y'] = y_test
+            result['y_train'] = y_train
+            result['y_index'] = test_index
+            result['x_index'] = ordered_train_index[:n_train]
+            result['auc'] = auc
+            results.append(result)
+
+            # The next learning point only explores the neighbourhood of the best C of this one, unless the best C
+            # is at an edge of the window (the optimum may be outside of it)
+            reference_c = best_parameter['c']
+            best_index = int(np.argmin(np.abs(np.log10(c_range) - np.log10(reference_c))))
+            if (best_index == c_indexes[0] and best_index > 0) or \
+                    (best_index == c_indexes[-1] and best_index < len(c_range) - 1):
+                c_indexes = list(range(len(c_range)))
+            else:
+                c_indexes = list(range(max(0, best_index - c_window), min(len(c_range), best_index + c_window + 1)))
+
+        return results
+
     def apply_best_parameters(self, results_list):
 
         best_c_list = []
@@ -170,6 +266,7 @@ class DualSVMAlgorithm(base.MLAlgorithm):
         parameters_dict = {'balanced': True,
                            'grid_search_folds': 10,
                            'c_range': np.logspace(-6, 2, 17),
+                           'learning_curve_c_window': 2,
                            'n_threads': 15}
 
         return parameters_dict
@@ -414,8 +511,56 @@ class RandomForest(base.MLAlgorithm):
                 'max_features': best_max_features,
                 'balanced_accuracy': best_acc}
 
+    def _oob_search(self, x_train, y_train, max_depth, min_samples_split, max_features):
+        """Grow a single forest over n_estimators_range and score each size with its out-of-bag predictions.
+
+        Returns:
+            List of (n_estimators, balanced accuracy) pairs.
+        """
+        classifier = RandomForestClassifier(max_depth=max_depth, min_samples_split=min_samples_split,
+                                            max_features=max_features, warm_start=True, oob_score=True,
+                                            class_weight='balanced' if self._algorithm_params['balanced'] else None,
+                                            n_jobs=self._algorithm_params['n_threads'])
+        accuracies = []
+        for n_estimators in sorted(self._algorithm_params['n_estimators_range']):
+            # New trees are added to the ones already fitted
+            classifier.set_params(n_estimators=n_estimators)
+            classifier.fit(x_train, y_train)
+            # Subjects which were never out-of-bag (with few trees) have no OOB score (NaN or zero probabilities
+            # depending on the version of scikit-learn): they are counted as misses, so that all the sizes are
+            # scored on the same subjects
+            oob_decision = np.nan_to_num(classifier.oob_decision_function_)
+            oob_scored = oob_decision.sum(axis=1) > 0
+            classes = classifier.classes_
+            y_hat_oob = np.where(y_train == classes[0], classes[-1], classes[0])
+            y_hat_oob[oob_scored] = classes[np.argmax(oob_decision[oob_scored], axis=1)]
+            res = utils.evaluate_prediction(y_train, y_hat_oob)
+            accuracies.append((n_estimators, res['balanced_accuracy']))
+
+        return accuracies
+
+    def _select_best_oob_parameter(self, async_result):
+
+        best_params = None
+        best_acc = -1
+
+        for params, async_acc in async_result.items():
+            for n_estimators, acc in async_acc.get():
+                if acc > best_acc:
+                    best_params = (n_estimators,) + params
+                    best_acc = acc
+
+        return {'n_estimators': best_params[0],
+                'max_depth': best_params[1],
+                'min_samples_split': best_params[2],
+                'max_features': best_params[3],
+                'balanced_accuracy': best_acc}
+
     def evaluate(self, train_index, test_index):
 
+        if self._algorithm_params['grid_search_method'] == 'oob':
+            return self.evaluate_oob(train_index, test_index)
+
         inner_pool = ThreadPool(self._algorithm_params['n_threads'])
         async_result = {}
         for i in range(self._algorithm_params['grid_search_folds']):
@@ -472,6 +617,52 @@ class RandomForest(base.MLAlgorithm):
 
         return result
 
+    def evaluate_oob(self, train_index, test_index):
+        """Same as evaluate, but the parameters are selected with the out-of-bag balanced accuracy.
+
+        One forest is trained per (max_depth, min_samples_split, max_features) setting and grown over
+        n_estimators_range (warm start), instead of one forest per combination and per inner fold.
+        """
+
+        x_train = self._x[train_index]
+        y_train = self._y[train_index]
+        x_test = self._x[test_index]
+        y_test = self._y[test_index]
+
+        parameters_combinations = list(itertools.product(self._algorithm_params['max_depth_range'],
+                                                         self._algorithm_params['min_samples_split_range'],
+                                                         self._algorithm_params['max_features_range']))
+
+        inner_pool = ThreadPool(self._algorithm_params['n_threads'])
+        async_result = {}
+        for parameters in parameters_combinations:
+            async_result[parameters] = inner_pool.apply_async(self._oob_search,
+                                                              (x_train, y_train,
+                                                               parameters[0], parameters[1], parameters[2]))
+        inner_pool.close()
+        inner_pool.join()
+        best_parameter = self._select_best_oob_parameter(async_result)
+
+        _, y_hat, auc, y_hat_train = self._launch_random_forest(x_train, x_test, y_train, y_test,
+                                                                best_parameter['n_estimators'],
+                                                                best_parameter['max_depth'],
+                                                                best_parameter['min_samples_split'],
+                                                                best_parameter['max_features'])
+
+        result = dict()
+        result['best_parameter'] = best_parameter
+        result['evaluation'] = utils.evaluate_prediction(y_test, y_hat)
+        result['evaluation_train'] = utils.evaluate_prediction(y_train, y_hat_train)
+        result['y_hat'] = y_hat
+        result['y_hat_train'] = y_hat_train
+        result['y'] = y_test
+        result['y_train'] = y_train
+        result['y_index'] = test_index
+        result['x_index'] = train_index
+        result['auc'] = auc
+
+        return result
+
     def evaluate_no_cv(self, train_index, test_index):
 
         x_train = self._x[train_index]
@@ -583,6 +774,7 @@ class RandomForest(base.MLAlgorithm):
                            'max_depth_range': (None, 6, 8, 10, 12),
                            'min_samples_split_range': (2, 4, 6, 8),
                            'max_features_range': ('auto', 0.1, 0.2, 0.3, 0.4, 0.5),
+                           'grid_search_method': 'cross_validation',
                            'n_threads': 15}
 
         return parameters_dict
@@ -43,14 +43,27 @@ class MLWorkflow(ABC):
         # Instantiating cross-validation method and classification algorithm
         self._validation = self._validation_class(self._algorithm, self._validation_params)
 
-        # Launching classification with selected cross-validation
-        classifier, best_params, results = self._validation.validate(y)
-
         # Creation of the directory to save results
         classifier_dir = path.join(self._output_dir, 'classifier')
         if not path.exists(classifier_dir):
             makedirs(classifier_dir)
 
+        # Evaluations of a previous (or concurrent) run with the same data and parameters are reused
+        if self._validation_params.get('checkpoint_dir'):
+            from clinica.pipelines.machine_learning.checkpoint import get_fingerprint
+
+            input_data = kernel if self._algorithm_class.uses_kernel() else x
+            fingerprint = get_fingerprint(input_data, y, self._algorithm_class, self._algorithm_params,
+                                          self._validation_class, self._validation_params)
+            self._validation.open_checkpoint(self._validation_params['checkpoint_dir'], fingerprint, y)
+
+        # Results of the folds are written while they are evaluated
+        if self._validation_params.get('results_format') == 'parquet':
+            self._validation.open_result_store(path.join(self._output_dir, 'validation_results.parquet'))
+
+        # Launching classification with selected cross-validation
+        classifier, best_params, results = self._validation.validate(y)
+
         # Saving algorithm trained classifier
         self._algorithm.save_classifier(classifier, classifier_dir)
         self._algorithm.save_weights(classifier, x, classifier_dir)
@@ -106,11 +119,80 @@ class MLValidation(ABC):
         self._validation_results = []
         self._classifier = None
         self._best_params = None
+        self._result_store = None
+        self._checkpoint = None
+        self._evaluations = []
 
     @abstractmethod
     def validate(self, y):
         pass
 
+    def open_checkpoint(self, checkpoint_dir, fingerprint, y):
+        """Keep the results of the evaluations in a checkpoint folder (see checkpoint.py) during validate.
+
+        The split indices of the checkpoints are used if they exist, so that a resumed (or concurrent) validation
+        evaluates the same folds.
+        """
+        from clinica.pipelines.machine_learning.checkpoint import ValidationCheckpoint
+
+        self._checkpoint = ValidationCheckpoint(checkpoint_dir)
+        self._checkpoint.check_fingerprint(fingerprint)
+        self._validation_params['splits_indices'] = self._checkpoint.get_splits(lambda: self.make_splits(y))
+
+    def open_result_store(self, store_file):
+        """Stream the results of the folds to a columnar store (see result_store.py) during validate."""
+        from clinica.pipelines.machine_learning.result_store import ValidationResultStore
+
+        self._result_store = ValidationResultStore(store_file)
+
+    def close_result_store(self):
+        if self._result_store is not None:
+            self._result_store.close()
+
+    def _submit(self, async_pool, evaluate_function, args, iteration=0, fold=0, learning_point=0):
+        """Run _evaluate asynchronously in async_pool (the evaluations of the validation being known by the
+        checkpoints)."""
+        key = 'iteration-%d_fold-%d_point-%d' % (iteration, fold, learning_point)
+        self._evaluations.append((key, evaluate_function, args))
+        return async_pool.apply_async(self._evaluate, (evaluate_function, args, iteration, fold, learning_point))
+
+    def _evaluate(self, evaluate_function, args, iteration=0, fold=0, learning_point=0):
+        """Run an evaluation of the algorithm (e.g. in a ThreadPool) and stream its result to the result store.
+
+        When a result store is open, only the selected parameters and the metrics of the fold are returned (and
+        kept in memory), the predictions being in the store. evaluate_function can also return a list of results
+        (one per learning point, see MLAlgorithm.evaluate_learning_curve). When a checkpoint folder is open, the
+        evaluations already in the checkpoints are not computed again.
+        """
+        if self._checkpoint is None:
+            result = evaluate_function(*args)
+        else:
+            result = self._checkpoint.run('iteration-%d_fold-%d_point-%d' % (iteration, fold, learning_point),
+                                          evaluate_function, args, self._evaluations)
+        if self._result_store is None:
+            return result
+
+        results = result if isinstance(result, list) else [result]
+        for j, fold_result in enumerate(results):
+            self._result_store.append(fold_result, iteration=iteration, fold=fold,
+                                      learning_point=j if isinstance(result, list) else learning_point)
+        summaries = [{key: fold_result[key] for key in ['best_parameter', 'evaluation', 'evaluation_train', 'auc']}
+                     for fold_result in results]
+        return summaries if isinstance(result, list) else summaries[0]
+
+    def save_store_summaries(self, output_dir):
+        """Close the result store and write the TSV summaries derived from it in output_dir."""
+        from clinica.pipelines.machine_learning.result_store import write_validation_summaries
+
+        self.close_result_store()
+        mean_results_df = write_validation_summaries(self._result_store.store_file, output_dir)
+
+        print("Mean results of the classification:")
+        print("Balanced accuracy: %s" % (mean_results_df['balanced_accuracy'].to_string(index=False)))
+        print("specificity: %s" % (mean_results_df['specificity'].to_string(index=False)))
+        print("sensitivity: %s" % (mean_results_df['sensitivity'].to_string(index=False)))
+        print("auc: %s" % (mean_results_df['auc'].to_string(index=False)))
+
     @staticmethod
     @abstractmethod
     def get_default_parameters():
@@ -140,6 +222,24 @@ class MLAlgorithm(ABC):
     def evaluate(self, train_index, test_index):
         pass
 
+    def evaluate_learning_curve(self, train_index, test_index, learning_folds):
+        """Evaluate the algorithm on nested training sets (learning curve).
+
+        Args:
+            train_index: Indexes of the training subjects.
+            test_index: Indexes of the test subjects.
+            learning_folds: List of arrays of positions in train_index. The training set of the j-th learning
+                point is made of the j + 1 first folds.
+
+        Returns:
+            List of the results of evaluate, one per learning point. By default, each learning point is evaluated
+            from scratch; algorithms can override this method to reuse the computations of the previous points.
+        """
+        import numpy as np
+
+        return [self.evaluate(train_index[np.concatenate(learning_folds[:j + 1]).ravel()], test_index)
+                for j in range(len(learning_folds))]
+
     @abstractmethod
     def save_classifier(self, classifier, output_dir):
         pass
@@ -0,0 +1,214 @@
+# coding: utf8
+
+"""Checkpoints of the validation of machine learning workflows.
+
+The result of each evaluation (iteration, fold and learning point) is written in a checkpoint folder as soon as it
+is computed, together with the split indices and a fingerprint of the input data and of the parameters. Running the
+workflow again with the same checkpoint folder only computes the missing evaluations.
+
+Several processes (e.g. on several machines sharing a file system) can run the same workflow with the same
+checkpoint folder: each evaluation is claimed by the process computing it, the others wait for its result. Claims of
+processes which stopped on the same machine are released automatically; claims of processes which stopped on other
+machines are released when the workflow is run again on these machines (or by removing the .claim files).
+
+Layout of the checkpoint folder:
+    fingerprint.json: fingerprint of the input data and of the parameters
+    splits.pkl: split indices of the validation
+    folds/iteration-<i>_fold-<j>_point-<k>.pkl: result of an evaluation (.claim while it is computed)
+"""
+
+# Parameters which do not change the results of the validation
+IGNORED_PARAMETERS = ['n_threads', 'splits_indices', 'results_format', 'checkpoint_dir']
+
+
+def get_fingerprint(input_data, y, algorithm, algorithm_params, validation, validation_params):
+    """Digest of the input data (features or kernel), the labels, the algorithm, the validation and their
+    parameters."""
+    import hashlib
+    import json
+    import numpy as np
+
+    def parameters_to_json(parameters):
+        parameters = {key: value for key, value in parameters.items() if key not in IGNORED_PARAMETERS}
+        return json.dumps(parameters, sort_keys=True, default=lambda value: np.asarray(value).tolist())
+
+    digest = hashlib.sha1()
+    for array in [input_data, y]:
+        array = np.ascontiguousarray(array)
+        digest.update(str((array.shape, array.dtype.str)).encode())
+        digest.update(array.tobytes())
+    for component, parameters in [(algorithm, algorithm_params), (validation, validation_params)]:
+        digest.update(('%s.%s' % (component.__module__, component.__name__)).encode())
+        digest.update(parameters_to_json(parameters).encode())
+    return digest.hexdigest()
+
+
+def write_exclusively(file_path, write_function):
+    """Create a file atomically, only if it does not exist yet.
+
+    Returns:
+        True if the file was created, False if it already existed.
+    """
+    import os
+    import socket
+    import threading
+
+    tmp_file = '%s.%s.%d.%d.tmp' % (file_path, socket.gethostname(), os.getpid(), threading.get_ident())
+    with open(tmp_file, 'wb') as f:
+        write_function(f)
+    try:
+        # Unlike os.replace, os.link fails if the file exists (also on network file systems)
+        os.link(tmp_file, file_path)
+        return True
+    except FileExistsError:
+        return False
+    finally:
+        os.remove(tmp_file)
+
+
+class ValidationCheckpoint:
+    """Checkpoint folder of a validation (see the description of the module)."""
+
+    def __init__(self, checkpoint_dir, poll_interval=10):
+        import os
+
+        self._checkpoint_dir = checkpoint_dir
+        self._poll_interval = poll_interval
+        os.makedirs(os.path.join(checkpoint_dir, 'folds'), exist_ok=True)
+
+    def check_fingerprint(self, fingerprint):
+        """Record the fingerprint of the validation, or check that it is the one of the existing checkpoints."""
+        import json
+        from os import path
+        from clinica.utils.exceptions import ClinicaException
+
+        fingerprint_file = path.join(self._checkpoint_dir, 'fingerprint.json')
+        write_exclusively(fingerprint_file, lambda f: f.write(json.dumps({'fingerprint': fingerprint}).encode()))
+        with open(fingerprint_file) as f:
+            checkpoint_fingerprint = json.load(f)['fingerprint']
+        if checkpoint_fingerprint != fingerprint:
+            raise ClinicaException(
+                'The checkpoints in %s were computed with other input data or parameters. Remove this folder or '
+                'choose another checkpoint folder.' % self._checkpoint_dir)
+
+    def get_splits(self, make_splits):
+        """Return the split indices of the checkpoints, or record the ones given by make_splits()."""
+        import pickle
+        from os import path
+
+        splits_file = path.join(self._checkpoint_dir, 'splits.pkl')
+        if not path.isfile(splits_file):
+            splits = make_splits()
+            write_exclusively(splits_file, lambda f: pickle.dump(splits, f))
+        # Another process may have recorded its splits first
+        with open(splits_file, 'rb') as f:
+            return pickle.load(f)
+
+    def _get_fold_file(self, key, extension):
+        from os import path
+
+        return path.join(self._checkpoint_dir, 'folds', key + extension)
+
+    def is_saved(self, key):
+        from os import path
+
+        return path.isfile(self._get_fold_file(key, '.pkl'))
+
+    def load_result(self, key):
+        import pickle
+
+        if not self.is_saved(key):
+            return None
+        with open(self._get_fold_file(key, '.pkl'), 'rb') as f:
+            return pickle.load(f)
+
+    def save_result(self, key, result):
+        import os
+        import pickle
+
+        result_file = self._get_fold_file(key, '.pkl')
+        tmp_file = '%s.%d.tmp' % (result_file, os.getpid())
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(result, f)
+        os.replace(tmp_file, result_file)
+
+    def claim(self, key):
+        """Claim an evaluation for this process.
+
+        Returns:
+            True if the evaluation was claimed, False if it is claimed by another running process.
+        """
+        import json
+        import os
+        import socket
+
+        claim_file = self._get_fold_file(key, '.claim')
+        owner = {'host': socket.gethostname(), 'pid': os.getpid()}
+        if write_exclusively(claim_file, lambda f: f.write(json.dumps(owner).encode())):
+            return True
+        try:
+            with open(claim_file) as f:
+                claim_owner = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if claim_owner['host'] == owner['host'] and not self._is_process_running(claim_owner['pid']):
+            # Claim of a process of this machine which stopped
+            os.remove(claim_file)
+            return self.claim(key)
+        return False
+
+    @staticmethod
+    def _is_process_running(pid):
+        import os
+
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def release(self, key):
+        import os
+
+        try:
+            os.remove(self._get_fold_file(key, '.claim'))
+        except FileNotFoundError:
+            pass
+
+    def _run_unclaimed(self, key, evaluate_function, args):
+        """Compute an evaluation if it is neither in the checkpoints nor claimed by another process.
+
+        Returns:
+            True if the evaluation is in the checkpoints.
+        """
+        if self.is_saved(key):
+            return True
+        if not self.claim(key):
+            return False
+        try:
+            # The result may have been written since it was looked for
+            if not self.is_saved(key):
+                self.save_result(key, evaluate_function(*args))
+            return True
+        finally:
+            self.release(key)
+
+    def run(self, key, evaluate_function, args, other_evaluations=()):
+        """Return the result of an evaluation, computed only if it is not in the checkpoints.
+
+        While the evaluation is computed by another process, the other evaluations of the validation
+        ((key, evaluate_function, args) tuples), which are neither in the checkpoints nor claimed, are computed
+        (starting from the last one) instead of waiting.
+        """
+        import time
+
+        while not self._run_unclaimed(key, evaluate_function, args):
+            for other_key, other_function, other_args in reversed(list(other_evaluations)):
+                if not self.is_saved(other_key) and self._run_unclaimed(other_key, other_function, other_args):
+                    break
+            else:
+                # Evaluations computed by other processes
+                time.sleep(self._poll_interval)
+        return self.load_result(key)
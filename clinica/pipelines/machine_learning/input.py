@@ -359,11 +359,14 @@ class CAPSVertexBasedInput(CAPSInput):
 
         super().__init__(input_params)
 
+        self._vertex_mask = None
+
     def get_images(self):
         """
         returns list of filnames
         """
         import os
+        from multiprocessing.pool import ThreadPool
 
         if self._images is not None:
             return self._images
@@ -388,13 +391,11 @@ class CAPSVertexBasedInput(CAPSInput):
                         for h in hemi
                     ]
                 )
-            missing_files = []
-            missing_files_string_error = ""
-            for img in self._images:
-                for side in img:
-                    if not os.path.exists(side):
-                        missing_files.append(side)
-                        missing_files_string_error += side + "\n"
+            all_files = [side for img in self._images for side in img]
+            with ThreadPool(self._input_params["n_threads"]) as pool:
+                exists = pool.map(os.path.exists, all_files)
+            missing_files = [side for side, side_exists in zip(all_files, exists) if not side_exists]
+            missing_files_string_error = "".join(side + "\n" for side in missing_files)
             if len(missing_files) > 0:
                 raise IOError(
                     f"Could not find the following files:\n"
@@ -407,6 +408,33 @@ class CAPSVertexBasedInput(CAPSInput):
             )
         return self._images
 
+    def get_vertex_mask(self):
+        """
+        Returns: boolean array of the vertices used as features (None for all the vertices)
+        """
+        import nibabel as nib
+
+        if self._vertex_mask is not None or self._input_params["vertex_mask"] is None:
+            return self._vertex_mask
+
+        vertex_mask = self._input_params["vertex_mask"]
+        if isinstance(vertex_mask, str) and vertex_mask == "cortex":
+            label_files = None
+        elif isinstance(vertex_mask, str):
+            raise ValueError(
+                f"Unknown vertex mask (given value: {vertex_mask}). It must be 'cortex', "
+                f"a list of label files (one per hemisphere) or a boolean array"
+            )
+        elif isinstance(vertex_mask[0], str):
+            label_files = vertex_mask
+        else:
+            self._vertex_mask = np.asarray(vertex_mask, dtype=bool)
+            return self._vertex_mask
+
+        n_vertex = [max(nib.load(side).header.get_data_shape()) for side in self.get_images()[0]]
+        self._vertex_mask = vtxbio.get_cortex_mask(n_vertex, label_files)
+        return self._vertex_mask
+
     def get_x(self):
         """
         Returns numpy 2D array
@@ -415,7 +443,13 @@ class CAPSVertexBasedInput(CAPSInput):
             return self._x
 
         cprint(f"Loading  str({len(self.get_images())} subjects")
-        self._x = vtxbio.load_data(self._images)
+        self._x = vtxbio.load_data(
+            self._images,
+            dtype=self._input_params["dtype"],
+            vertex_mask=self.get_vertex_mask(),
+            n_procs=self._input_params["n_threads"],
+            cache_dir=self._input_params["cache_dir"],
+        )
         cprint(f"{len(self._x)} subjects loaded")
         return self._x
 
@@ -429,6 +463,7 @@ class CAPSVertexBasedInput(CAPSInput):
 
         sample = nib.load(self._images[0][0])
 
+        weights = vtxbio.revert_mask(weights, self.get_vertex_mask())
         infinite_norm = np.max(np.abs(weights))
 
         left_hemi_data = np.atleast_3d(np.divide(weights[:np.int(weights.size / 2)], infinite_norm))
@@ -451,6 +486,10 @@ class CAPSVertexBasedInput(CAPSInput):
         parameters_dict.setdefault("fwhm", 0)
         parameters_dict.setdefault('acq_label', None)
         parameters_dict.setdefault('suvr_reference_region', None)
+        parameters_dict.setdefault("dtype", "float64")
+        parameters_dict.setdefault("vertex_mask", None)
+        parameters_dict.setdefault("cache_dir", None)
+        parameters_dict.setdefault("n_threads", 1)
 
         return parameters_dict
 
@@ -28,6 +28,8 @@ class VoxelBasedKFoldDualSVM(base.MLWorkflow):
         balanced=True,
         c_range=np.logspace(-6, 2, 17),
         splits_indices=None,
+        results_format="tsv",
+        checkpoint_dir=None,
     ):
 
         super(VoxelBasedKFoldDualSVM, self).__init__(
@@ -62,6 +64,8 @@ class VoxelBasedRepKFoldDualSVM(base.MLWorkflow):
         balanced=True,
         c_range=np.logspace(-6, 2, 17),
         splits_indices=None,
+        results_format="tsv",
+        checkpoint_dir=None,
     ):
 
         super(VoxelBasedRepKFoldDualSVM, self).__init__(
@@ -96,6 +100,8 @@ class VoxelBasedRepHoldOutDualSVM(base.MLWorkflow):
         balanced=True,
         c_range=np.logspace(-6, 2, 17),
         splits_indices=None,
+        results_format="tsv",
+        checkpoint_dir=None,
     ):
 
         super().__init__(
@@ -120,6 +126,9 @@ class VertexBasedRepHoldOutDualSVM(base.MLWorkflow):
         suvr_reference_region=None,
         fwhm=20,
         precomputed_kernel=None,
+        dtype="float64",
+        vertex_mask=None,
+        cache_dir=None,
         n_threads=15,
         n_iterations=100,
         test_size=0.3,
@@ -127,6 +136,8 @@ class VertexBasedRepHoldOutDualSVM(base.MLWorkflow):
         balanced=True,
         c_range=np.logspace(-10, 2, 1000),
         splits_indices=None,
+        results_format="tsv",
+        checkpoint_dir=None,
     ):
 
         super(VertexBasedRepHoldOutDualSVM, self).__init__(
@@ -156,6 +167,8 @@ class RegionBasedRepHoldOutDualSVM(base.MLWorkflow):
         balanced=True,
         c_range=np.logspace(-6, 2, 17),
         splits_indices=None,
+        results_format="tsv",
+        checkpoint_dir=None,
     ):
 
         super(RegionBasedRepHoldOutDualSVM, self).__init__(
@@ -187,6 +200,8 @@ class RegionBasedRepHoldOutLogisticRegression(base.MLWorkflow):
         balanced=True,
         c_range=np.logspace(-6, 2, 17),
         splits_indices=None,
+        results_format="tsv",
+        checkpoint_dir=None,
     ):
 
         super(RegionBasedRepHoldOutLogisticRegression, self).__init__(
@@ -220,7 +235,10 @@ class RegionBasedRepHoldOutRandomForest(base.MLWorkflow):
         max_depth_range=[None],
         min_samples_split_range=[2],
         max_features_range=("auto", 0.25, 0.5),
+        grid_search_method="cross_validation",
         splits_indices=None,
+        results_format="tsv",
+        checkpoint_dir=None,
     ):
 
         super(RegionBasedRepHoldOutRandomForest, self).__init__(
@@ -253,6 +271,9 @@ class RegionBasedLearningCurveRepHoldOutDualSVM(base.MLWorkflow):
         grid_search_folds=10,
         balanced=True,
         c_range=np.logspace(-6, 2, 17),
+        incremental=False,
+        results_format="tsv",
+        checkpoint_dir=None,
     ):
 
         super(RegionBasedLearningCurveRepHoldOutDualSVM, self).__init__(
@@ -287,6 +308,9 @@ class VoxelBasedLearningCurveRepHoldOutDualSVM(base.MLWorkflow):
         grid_search_folds=10,
         balanced=True,
         c_range=np.logspace(-6, 2, 17),
+        incremental=False,
+        results_format="tsv",
+        checkpoint_dir=None,
     ):
 
         super(VoxelBasedLearningCurveRepHoldOutDualSVM, self).__init__(
@@ -319,6 +343,8 @@ class RegionBasedRepKFoldDualSVM(base.MLWorkflow):
         balanced=True,
         c_range=np.logspace(-6, 2, 17),
         splits_indices=None,
+        results_format="tsv",
+        checkpoint_dir=None,
     ):
 
         super(RegionBasedRepKFoldDualSVM, self).__init__(
@@ -351,6 +377,8 @@ class CAPSTsvRepHoldOutDualSVM(base.MLWorkflow):
         balanced=True,
         c_range=np.logspace(-6, 2, 17),
         splits_indices=None,
+        results_format="tsv",
+        checkpoint_dir=None,
     ):
 
         super(CAPSTsvRepHoldOutDualSVM, self).__init__(
@@ -385,7 +413,10 @@ class CAPSTsvRepHoldOutRandomForest(base.MLWorkflow):
         max_depth_range=[None],
         min_samples_split_range=[2],
         max_features_range=("auto", 0.25, 0.5),
+        grid_search_method="cross_validation",
         splits_indices=None,
+        results_format="tsv",
+        checkpoint_dir=None,
     ):
 
         super(CAPSTsvRepHoldOutRandomForest, self).__init__(
@@ -424,6 +455,8 @@ class VoxelBasedREGRepKFoldDualSVM(base.MLWorkflow):
         balanced=True,
         c_range=np.logspace(-6, 2, 17),
         splits_indices=None,
+        results_format="tsv",
+        checkpoint_dir=None,
     ):
 
         super(VoxelBasedREGRepKFoldDualSVM, self).__init__(
@@ -453,8 +486,11 @@ class TsvRepHoldOutRandomForest(base.MLWorkflow):
         max_depth_range=[None],
         min_samples_split_range=[2],
         max_features_range=("auto", 0.25, 0.5),
+        grid_search_method="cross_validation",
         splits_indices=None,
         inner_cv=False,
+        results_format="tsv",
+        checkpoint_dir=None,
     ):
 
         super(TsvRepHoldOutRandomForest, self).__init__(
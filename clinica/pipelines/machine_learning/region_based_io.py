@@ -82,18 +82,9 @@ def weights_to_nifti(weights, atlas, output_filename):
     Returns:
 
     """
-    from clinica.utils.atlas import AtlasAbstract
+    from clinica.utils.atlas import get_atlas
 
-    atlas_path = None
-    atlas_classes = AtlasAbstract.__subclasses__()
-    for atlas_class in atlas_classes:
-        if atlas_class.get_name_atlas() == atlas:
-            atlas_path = atlas_class.get_atlas_labels()
-
-    if not atlas_path:
-        raise ValueError('Atlas path not found for atlas name ' + atlas)
-
-    atlas_image = nib.load(atlas_path)
+    atlas_image = nib.load(get_atlas(atlas).get_atlas_labels())
     atlas_data = atlas_image.get_data()
     labels = list(set(atlas_data.ravel()))
     output_image_weights = np.array(atlas_data, dtype='f')
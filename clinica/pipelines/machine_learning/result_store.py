@@ -0,0 +1,150 @@
+# coding: utf8
+
+"""Columnar store of the results of the validation of machine learning workflows.
+
+The results of each fold (metrics, selected parameters and predictions of the subjects) are appended to a single
+Parquet file as soon as the fold is evaluated, one row per fold, instead of being held in memory until the end of
+the validation and written as two TSV files per fold. The TSV summaries are derived from this file, and subsets of
+folds can be read without loading the whole file (see read_validation_results).
+
+This requires the pyarrow package, which is not installed with Clinica.
+"""
+
+import threading
+
+METRICS = ['balanced_accuracy', 'auc', 'accuracy', 'sensitivity', 'specificity', 'ppv', 'npv']
+
+PREDICTIONS = ['y', 'y_hat', 'y_index', 'y_train', 'y_hat_train', 'x_index']
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('The parquet format of the validation results requires the pyarrow package '
+                          '(pip install pyarrow).')
+    return pyarrow
+
+
+class ValidationResultStore:
+    """Append-only Parquet file with one row per evaluated fold.
+
+    Rows are written by row groups of row_group_size folds; the file can be read once the store is closed.
+    """
+
+    def __init__(self, store_file, row_group_size=100):
+        self._store_file = store_file
+        self._row_group_size = row_group_size
+        self._writer = None
+        self._rows = []
+        self._lock = threading.Lock()
+
+    @property
+    def store_file(self):
+        return self._store_file
+
+    def append(self, result, iteration=0, fold=0, learning_point=0):
+        """Write the result of a fold (dictionary returned by MLAlgorithm.evaluate)."""
+        import json
+        import numpy as np
+
+        pa = import_pyarrow()
+
+        row = {'iteration': [iteration], 'fold': [fold], 'learning_point': [learning_point]}
+        for metric in METRICS:
+            value = result['auc'] if metric == 'auc' else result['evaluation'][metric]
+            row[metric] = [float(value)]
+            if metric != 'auc':
+                row['train_' + metric] = [float(result['evaluation_train'][metric])]
+        row['best_parameter'] = [json.dumps(result['best_parameter'], default=str)]
+        for prediction in PREDICTIONS:
+            row[prediction] = [np.asarray(result[prediction]).tolist()]
+
+        with self._lock:
+            self._rows.append(pa.Table.from_pydict(row))
+            if len(self._rows) >= self._row_group_size:
+                self._write_rows()
+
+    def _write_rows(self):
+        pa = import_pyarrow()
+
+        if not self._rows:
+            return
+        if self._writer is None:
+            self._writer = pa.parquet.ParquetWriter(self._store_file, self._rows[0].schema)
+        table = pa.concat_tables([rows.cast(self._writer.schema) for rows in self._rows])
+        self._writer.write_table(table)
+        self._rows = []
+
+    def close(self):
+        with self._lock:
+            self._write_rows()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read_validation_results(store_file, iterations=None, folds=None, learning_points=None, columns=None):
+    """Read the results of some folds from a validation store.
+
+    Args:
+        store_file: Path to the Parquet file written by ValidationResultStore.
+        iterations (optional): List of iterations to read (default: all).
+        folds (optional): List of folds to read (default: all).
+        learning_points (optional): List of learning points to read (default: all).
+        columns (optional): List of columns to read (default: all, predictions included).
+
+    Returns:
+        DataFrame with one row per fold.
+    """
+    pa = import_pyarrow()
+
+    filters = [(name, 'in', list(values)) for name, values in [('iteration', iterations), ('fold', folds),
+                                                                 ('learning_point', learning_points)]
+               if values is not None]
+    return pa.parquet.read_table(store_file, columns=columns, filters=filters or None).to_pandas()
+
+
+def get_subjects_table(results_df, train=False):
+    """Return the predictions of the subjects (one row per subject and per fold) of a results DataFrame."""
+    import numpy as np
+    import pandas as pd
+
+    y, y_hat, index = ('y_train', 'y_hat_train', 'x_index') if train else ('y', 'y_hat', 'y_index')
+    n_subjects = np.array([len(values) for values in results_df[y]], dtype=int)
+    subjects = {key: np.repeat(results_df[key].values, n_subjects) for key in ['iteration', 'fold', 'learning_point']}
+    for column, name in [(y, 'y'), (y_hat, 'y_hat'), (index, 'subject_index')]:
+        subjects[name] = np.concatenate([np.asarray(values) for values in results_df[column]] + [np.array([])])
+    return pd.DataFrame(subjects)
+
+
+def write_validation_summaries(store_file, output_dir):
+    """Write the TSV summaries of a validation store: results.tsv (metrics of each fold), mean_results.tsv (mean
+    metrics, per learning point) and test_subjects.tsv (predictions of the test subjects).
+
+    Returns:
+        DataFrame of the mean results.
+    """
+    from os import path
+    import numpy as np
+
+    results_df = read_validation_results(store_file)
+    subjects_df = get_subjects_table(results_df)
+    subjects_df.to_csv(path.join(output_dir, 'test_subjects.tsv'), index=False, sep='\t', encoding='utf-8')
+
+    metrics_columns = [c for c in results_df.columns
+                       if c in METRICS or (c.startswith('train_') and c[len('train_'):] in METRICS)]
+    results_df = results_df[['iteration', 'fold', 'learning_point'] + metrics_columns + ['best_parameter']]
+    results_df.to_csv(path.join(output_dir, 'results.tsv'), index=False, sep='\t', encoding='utf-8')
+
+    mean_results_df = results_df.groupby('learning_point')[metrics_columns].agg(np.nanmean).reset_index()
+    mean_results_df.to_csv(path.join(output_dir, 'mean_results.tsv'), index=False, sep='\t', encoding='utf-8')
+
+    return mean_results_df
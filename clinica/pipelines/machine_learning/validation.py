@@ -12,19 +12,25 @@ from clinica.pipelines.machine_learning import base
 
 class KFoldCV(base.MLValidation):
 
-    def validate(self, y):
+    def make_splits(self, y):
 
         if self._validation_params['splits_indices'] is None:
             skf = StratifiedKFold(n_splits=self._validation_params['n_folds'], shuffle=True)
             self._validation_params['splits_indices'] = list(skf.split(np.zeros(len(y)), y))
 
+        return self._validation_params['splits_indices']
+
+    def validate(self, y):
+
+        self.make_splits(y)
+
         async_pool = ThreadPool(self._validation_params['n_threads'])
         async_result = {}
 
         for i in range(self._validation_params['n_folds']):
 
             train_index, test_index = self._validation_params['splits_indices'][i]
-            async_result[i] = async_pool.apply_async(self._ml_algorithm.evaluate, (train_index, test_index))
+            async_result[i] = self._submit(async_pool, self._ml_algorithm.evaluate, (train_index, test_index), 0, i)
 
         async_pool.close()
         async_pool.join()
@@ -39,6 +45,8 @@ class KFoldCV(base.MLValidation):
     def save_results(self, output_dir):
         if self._validation_results is None:
             raise Exception("No results to save. Method validate() must be run before save_results().")
+        if self._result_store is not None:
+            return self.save_store_summaries(output_dir)
 
         subjects_folds = []
         results_folds = []
@@ -98,14 +106,16 @@ class KFoldCV(base.MLValidation):
         parameters_dict = {'n_folds': 10,
                            'n_threads': 15,
                            'splits_indices': None,
-                           'inner_cv': True}
+                           'inner_cv': True,
+                           'results_format': 'tsv',
+                           'checkpoint_dir': None}
 
         return parameters_dict
 
 
 class RepeatedKFoldCV(base.MLValidation):
 
-    def validate(self, y):
+    def make_splits(self, y):
 
         if self._validation_params['splits_indices'] is None:
             self._validation_params['splits_indices'] = []
@@ -114,13 +124,14 @@ class RepeatedKFoldCV(base.MLValidation):
                 skf = StratifiedKFold(n_splits=self._validation_params['n_folds'], shuffle=True)
                 self._validation_params['splits_indices'].append(list(skf.split(np.zeros(len(y)), y)))
 
-        async_pool = ThreadPool(self._validation_params['n_threads'])
-        async_result = {}
+        return self._validation_params['splits_indices']
 
-        for i in range(self._validation_params['n_iterations']):
+    def validate(self, y):
 
-            train_index, test_index = self._validation_params['splits_indices'][i]
-            async_result[i] = async_pool.apply_async(self._ml_algorithm.evaluate, (train_index, test_index))
+        self.make_splits(y)
+
+        async_pool = ThreadPool(self._validation_params['n_threads'])
+        async_result = {}
 
         for r in range(self._validation_params['n_iterations']):
 
@@ -130,7 +141,8 @@ class RepeatedKFoldCV(base.MLValidation):
             for i in range(self._validation_params['n_folds']):
 
                 train_index, test_index = self._validation_params['splits_indices'][r][i]
-                async_result[r][i] = async_pool.apply_async(self._ml_algorithm.evaluate, (train_index, test_index))
+                async_result[r][i] = self._submit(async_pool, self._ml_algorithm.evaluate,
+                                                  (train_index, test_index), r, i)
 
         async_pool.close()
         async_pool.join()
@@ -147,6 +159,8 @@ class RepeatedKFoldCV(base.MLValidation):
     def save_results(self, output_dir):
         if self._validation_results is None:
             raise Exception("No results to save. Method validate() must be run before save_results().")
+        if self._result_store is not None:
+            return self.save_store_summaries(output_dir)
 
         all_results_list = []
         all_subjects_list = []
@@ -232,20 +246,28 @@ class RepeatedKFoldCV(base.MLValidation):
                            'n_folds': 10,
                            'n_threads': 15,
                            'splits_indices': None,
-                           'inner_cv': True}
+                           'inner_cv': True,
+                           'results_format': 'tsv',
+                           'checkpoint_dir': None}
 
         return parameters_dict
 
 
 class RepeatedHoldOut(base.MLValidation):
 
-    def validate(self, y):
+    def make_splits(self, y):
 
         if self._validation_params['splits_indices'] is None:
             splits = StratifiedShuffleSplit(n_splits=self._validation_params['n_iterations'],
                                             test_size=self._validation_params['test_size'])
             self._validation_params['splits_indices'] = list(splits.split(np.zeros(len(y)), y))
 
+        return self._validation_params['splits_indices']
+
+    def validate(self, y):
+
+        self.make_splits(y)
+
         async_pool = ThreadPool(self._validation_params['n_threads'])
         async_result = {}
 
@@ -253,9 +275,10 @@ class RepeatedHoldOut(base.MLValidation):
 
             train_index, test_index = self._validation_params['splits_indices'][i]
             if self._validation_params['inner_cv']:
-                async_result[i] = async_pool.apply_async(self._ml_algorithm.evaluate, (train_index, test_index))
+                async_result[i] = self._submit(async_pool, self._ml_algorithm.evaluate, (train_index, test_index), i)
             else:
-                async_result[i] = async_pool.apply_async(self._ml_algorithm.evaluate_no_cv, (train_index, test_index))
+                async_result[i] = self._submit(async_pool, self._ml_algorithm.evaluate_no_cv,
+                                               (train_index, test_index), i)
 
         async_pool.close()
         async_pool.join()
@@ -269,6 +292,8 @@ class RepeatedHoldOut(base.MLValidation):
     def save_results(self, output_dir):
         if self._validation_results is None:
             raise Exception("No results to save. Method validate() must be run before save_results().")
+        if self._result_store is not None:
+            return self.save_store_summaries(output_dir)
 
         all_results_list = []
         all_train_subjects_list = []
@@ -349,20 +374,28 @@ class RepeatedHoldOut(base.MLValidation):
                            'test_size': 0.2,
                            'n_threads': 15,
                            'splits_indices': None,
-                           'inner_cv': True}
+                           'inner_cv': True,
+                           'results_format': 'tsv',
+                           'checkpoint_dir': None}
 
         return parameters_dict
 
 
 class LearningCurveRepeatedHoldOut(base.MLValidation):
 
-    def validate(self, y):
+    def make_splits(self, y):
 
         if self._validation_params['splits_indices'] is None:
             splits = StratifiedShuffleSplit(n_splits=self._validation_params['n_iterations'],
                                             test_size=self._validation_params['test_size'])
             self._validation_params['splits_indices'] = list(splits.split(np.zeros(len(y)), y))
 
+        return self._validation_params['splits_indices']
+
+    def validate(self, y):
+
+        self.make_splits(y)
+
         async_pool = ThreadPool(self._validation_params['n_threads'])
         async_result = {}
 
@@ -373,19 +406,32 @@ class LearningCurveRepeatedHoldOut(base.MLValidation):
             skf = StratifiedKFold(n_splits=self._validation_params['n_learning_points'], shuffle=False)
             inner_cv_splits = list(skf.split(np.zeros(len(y[train_index])), y[train_index]))
 
+            if self._validation_params['incremental']:
+                # All the learning points of an iteration are evaluated at once, reusing the previous points
+                async_result[i] = self._submit(async_pool, self._ml_algorithm.evaluate_learning_curve,
+                                               (train_index, test_index,
+                                                [indexes[1] for indexes in inner_cv_splits]), i)
+                continue
+
             for j in range(self._validation_params['n_learning_points']):
                 inner_train_index = np.concatenate([indexes[1] for indexes in
                                                     inner_cv_splits[:j + 1]]).ravel()
-                async_result[i][j] = async_pool.apply_async(self._ml_algorithm.evaluate,
-                                                            (train_index[inner_train_index], test_index))
+                async_result[i][j] = self._submit(async_pool, self._ml_algorithm.evaluate,
+                                                  (train_index[inner_train_index], test_index), i, 0, j)
 
         async_pool.close()
         async_pool.join()
 
+        if self._validation_params['incremental']:
+            async_result = {i: async_result[i].get() for i in range(self._validation_params['n_iterations'])}
+
         for j in range(self._validation_params['n_learning_points']):
             learning_point_results = []
             for i in range(self._validation_params['n_iterations']):
-                learning_point_results.append(async_result[i][j].get())
+                if self._validation_params['incremental']:
+                    learning_point_results.append(async_result[i][j])
+                else:
+                    learning_point_results.append(async_result[i][j].get())
 
             self._validation_results.append(learning_point_results)
 
@@ -401,6 +447,8 @@ class LearningCurveRepeatedHoldOut(base.MLValidation):
     def save_results(self, output_dir):
         if self._validation_results is None:
             raise Exception("No results to save. Method validate() must be run before save_results().")
+        if self._result_store is not None:
+            return self.save_store_summaries(output_dir)
 
         for learning_point in range(self._validation_params['n_learning_points']):
 
@@ -466,7 +514,10 @@ class LearningCurveRepeatedHoldOut(base.MLValidation):
                            'n_learning_points': 10,
                            'n_threads': 15,
                            'splits_indices': None,
-                           'inner_cv': True}
+                           'inner_cv': True,
+                           'incremental': False,
+                           'results_format': 'tsv',
+                           'checkpoint_dir': None}
 
         return parameters_dict
 
@@ -1,31 +1,127 @@
 # coding: utf8
 
 
-def load_data(mgh_list):
+def get_cortex_mask(n_vertex, label_files=None):
+    """Return the mask of the vertices of the cortex (i.e. without the medial wall) of each hemisphere.
+
+    Args:
+        n_vertex: list of the number of vertices of each surface (e.g. [lh, rh]).
+        label_files (optional): list of FreeSurfer label files (one per surface). Default: lh.cortex.label and
+            rh.cortex.label of fsaverage (in $FREESURFER_HOME/subjects/fsaverage/label).
+
+    Returns: mask : boolean array of sum(n_vertex) elements
+
+    """
+    import os
+    import nibabel as nib
+    import numpy as np
+
+    if label_files is None:
+        label_files = [os.path.join(os.path.expandvars('$FREESURFER_HOME'), 'subjects', 'fsaverage', 'label',
+                                    '%s.cortex.label' % hemi) for hemi in ['lh', 'rh']]
+    if len(label_files) != len(n_vertex):
+        raise ValueError('One label file per surface is needed (%d surfaces, %d label files).'
+                         % (len(n_vertex), len(label_files)))
+
+    masks = []
+    for n, label_file in zip(n_vertex, label_files):
+        mask = np.zeros(n, dtype=bool)
+        mask[nib.freesurfer.read_label(label_file)] = True
+        masks.append(mask)
+    return np.concatenate(masks)
+
+
+def get_cache_key(mgh_list, dtype, vertex_mask, n_procs=1):
+    """Digest of the paths, sizes and modification times of the files, of the data type and of the vertex mask."""
+    import hashlib
+    import os
+    from multiprocessing.pool import ThreadPool
+    import numpy as np
+
+    files = [f for subject_files in mgh_list for f in subject_files]
+    with ThreadPool(n_procs) as pool:
+        stats = pool.map(os.stat, files)
+
+    digest = hashlib.sha1()
+    for f, st in zip(files, stats):
+        digest.update(('%s:%d:%d\n' % (os.path.abspath(f), st.st_size, st.st_mtime_ns)).encode())
+    digest.update(np.dtype(dtype).str.encode())
+    if vertex_mask is not None:
+        digest.update(np.packbits(vertex_mask).tobytes())
+    return digest.hexdigest()
+
+
+def load_data(mgh_list, dtype='float64', vertex_mask=None, n_procs=1, cache_dir=None):
     """
 
     Args: mgh_list : list of mgh files. Each element contains as many paths as
     needed (each element must be associated to a single subject). Surfaces must
     have the same number of vertices across subjects.
+    dtype : data type of the matrix (e.g. float32 to halve its size).
+    vertex_mask : boolean array (as many elements as the vertices of the surfaces
+    of a subject) of the vertices to keep. Default: all the vertices.
+    n_procs : number of threads decoding the files.
+    cache_dir : folder where the matrix is kept as a .npy file. The matrix is
+    written there while the files are decoded and memory-mapped; it is loaded
+    (memory-mapped) from there as long as the files have not been modified.
 
     Returns: data : matrix of raw data
 
     """
+    import os
+    from multiprocessing.pool import ThreadPool
     import nibabel as nib
     import numpy as np
 
+    if cache_dir is not None:
+        cache_file = os.path.join(cache_dir, 'vertex_data_%s.npy' % get_cache_key(mgh_list, dtype, vertex_mask,
+                                                                                     n_procs))
+        if os.path.isfile(cache_file):
+            return np.load(cache_file, mmap_mode='r')
+
     # Construct 0-matrix with the good size, based on the size of the surfaces
     # provided by the first subject
     N_vertex = []  # array containing the surface size of the different surfaces of a subject
     sample = mgh_list[0]
     for i in range(len(sample)):
         N_vertex.append(np.max(nib.load(sample[i]).header.get_data_shape()))
-    data = np.zeros((len(mgh_list), np.sum(N_vertex)))
-
-    # Fill data matrix
     N_cumul = np.concatenate(([0], np.cumsum(N_vertex)))
-    for s in range(len(mgh_list)):
+    if vertex_mask is not None and len(vertex_mask) != N_cumul[-1]:
+        raise ValueError('The vertex mask has %d elements but the surfaces have %d vertices.'
+                         % (len(vertex_mask), N_cumul[-1]))
+    n_features = N_cumul[-1] if vertex_mask is None else np.count_nonzero(vertex_mask)
+
+    if cache_dir is None:
+        data = np.empty((len(mgh_list), n_features), dtype=dtype)
+    else:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_file = '%s.%d.tmp' % (cache_file, os.getpid())
+        data = np.lib.format.open_memmap(tmp_file, mode='w+', dtype=dtype, shape=(len(mgh_list), n_features))
+
+    def load_subject(s):
+        row = np.empty(N_cumul[-1], dtype=dtype)
         for h in range(len(mgh_list[s])):
-            current_data = np.squeeze(nib.load(mgh_list[s][h]).get_data())
-            data[s, N_cumul[h]: N_cumul[h+1]] = current_data
+            row[N_cumul[h]: N_cumul[h + 1]] = np.asanyarray(nib.load(mgh_list[s][h]).dataobj).ravel()
+        data[s, :] = row if vertex_mask is None else row[vertex_mask]
+
+    # Fill data matrix (nibabel releases the GIL while reading the files)
+    with ThreadPool(n_procs) as pool:
+        pool.map(load_subject, range(len(mgh_list)))
+
+    if cache_dir is not None:
+        data.flush()
+        del data
+        os.replace(tmp_file, cache_file)
+        return np.load(cache_file, mmap_mode='r')
     return data
+
+
+def revert_mask(weights, vertex_mask):
+    """Return the weights of all the vertices (0 outside of the vertex mask)."""
+    import numpy as np
+
+    if vertex_mask is None:
+        return weights
+    all_weights = np.zeros(len(vertex_mask), dtype=weights.dtype)
+    all_weights[vertex_mask] = weights
+    return all_weights
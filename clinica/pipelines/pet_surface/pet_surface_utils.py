@@ -452,93 +452,17 @@ def surf2surf(in_surface, reg_file, gtmsegfile, subject_id, session_id, caps_dir
     return tval
 
 
-def vol2surf(volume, surface, subject_id, session_id, caps_dir, gtmsegfile, is_longitudinal):
-    """vol2surf is a wrapper of freesurfer command mri_vol2surf. It projects the volume into the surface : the value at
-    each vertex is given by the value of the voxel it intersects
+def weighted_mean_projection(volume, in_surfaces):
+    """weighted_mean_projection projects the volume onto the 7 intracortical surfaces and makes a weighted average at
+    each node of the surface. The weight are defined by a normal distribution (centered on the mid surface).
 
-    Args:
-        (string) volume     : Path to PET volume (in gtmseg space) that needs to be mapped into surface
-        (string) surface    : Path to surface file
-        (string) gtmsegfile :l Path to the gtm segmentation file (provides information on space, labels are not used
-        (string) subject_id : The subject_id (something like sub-ADNI002S4213)
-        (string) session_id : The session id ( something like : ses-M12)
-        (string) caps_dir   : Path to the CAPS directory
-
-    Returns:
-        (string) Path to the data projected onto the surface
-    """
-    import os
-    import shutil
-    import sys
-    import clinica.pipelines.pet_surface.pet_surface_utils as utils
-
-    # set subjects_dir env. variable for mri_vol2surf to work properly
-    subjects_dir_backup = os.path.expandvars('$SUBJECTS_DIR')
-
-    root_env, freesurfer_id = utils.get_new_subjects_dir(is_longitudinal, caps_dir, subject_id, session_id)
-
-    os.environ["SUBJECTS_DIR"] = root_env
-
-    # TODO write nicer way to grab hemi & filename (difficulty caused by the dots in filenames)
-    # extract hemisphere based on filename
-    hemi = os.path.basename(surface)[0:2]
-    surfname = os.path.basename(surface)[3:]
-
-    # copy surface file in caps surf folder to allow processing
-    shutil.copy(surface, os.path.join(os.path.expandvars('$SUBJECTS_DIR'),
-                                      freesurfer_id,
-                                      'surf'))
-
-    if not os.path.exists(os.path.join(os.path.expandvars('$SUBJECTS_DIR'),
-                                       freesurfer_id,
-                                       'mri',
-                                       'gtmseg.mgz')):
-        shutil.copy(gtmsegfile, os.path.join(os.path.expandvars('$SUBJECTS_DIR'),
-                                             freesurfer_id,
-                                             'mri',
-                                             'gtmseg.mgz'))
-
-    # execute vol2surf
-    output = os.path.abspath('./' + hemi + '.projection_' + os.path.basename(surface) + '.mgh')
-    cmd = 'mri_vol2surf'
-    cmd += ' --mov ' + volume
-    cmd += ' --o ' + output
-    cmd += ' --surf ' + surfname
-    cmd += ' --hemi ' + hemi
-    cmd += ' --regheader ' + freesurfer_id
-    cmd += ' --ref gtmseg.mgz'
-    cmd += ' --interp nearest'
-
-    # If system is MacOS, this export command must be run just before the mri_vol2surf command to bypass MacOs security
-    if sys.platform == 'darwin':
-        cmd = 'export DYLD_LIBRARY_PATH=$FREESURFER_HOME/lib/gcc/lib && ' + cmd
-    os.system(cmd)
-
-    # remove file in caps
-    os.remove(os.path.join(os.path.expandvars('$SUBJECTS_DIR'),
-                           freesurfer_id,
-                           'surf',
-                           os.path.basename(surface)))
-    # TODO carreful here...
-    # Removing gtmseg.mgz may lead to problems as other vol2surf are using it
-    os.remove(os.path.join(os.path.expandvars('$SUBJECTS_DIR'),
-                           freesurfer_id,
-                           'mri',
-                           'gtmseg.mgz'))
-
-    # put back original subjects_dir env
-    os.environ["SUBJECTS_DIR"] = subjects_dir_backup
-
-    return output
-
-
-def weighted_mean(in_surfaces):
-    """weighted_mean make a weighted average at each node of the surface. The weight are defined by a normal
-    distribution (centered on the mid surface)
+    The projection reproduces mri_vol2surf with nearest neighbour interpolation (the value at each vertex is given by the
+    value of the voxel it intersects), but the 7 projections are kept in memory: only the averaged projection is
+    written on disk.
 
     Args:
-        (list of strings) in_surfaces : List of path to the data projected on the 7 surfaces (35 to 65 % of thickness)
-            at each nodes)
+        (string) volume : Path to PET volume (in gtmseg space) that needs to be mapped into surface
+        (list of strings) in_surfaces : List of path to the 7 surfaces (35 to 65 % of thickness) in gtmseg space
 
     Returns:
         (string) Path to the data averaged
@@ -550,23 +474,39 @@ def weighted_mean(in_surfaces):
     # coefficient for normal repartition
     coefficient = [0.1034, 0.1399, 0.1677, 0.1782, 0.1677, 0.1399, 0.1034]
 
-    # sample only to get dimension
-    sample = nib.load(in_surfaces[0])
-    data_normalized = np.zeros(sample.header.get_data_shape())
-
     if len(in_surfaces) != 7:
         raise Exception('There should be 7 surfaces at this point of the pipeline, but found '
                         + str(len(in_surfaces))
                         + ', something went wrong...')
 
+    pet = nib.load(volume)
+    pet_data = np.asarray(pet.dataobj, dtype=np.float32)
+    if pet_data.ndim > 3:
+        pet_data = pet_data.reshape(pet_data.shape[:3])
+    dims = np.array(pet_data.shape)
+
+    # Surfaces are expressed in the tkregister space of the volume: vox2ras-tkr shares the orientation and voxel sizes
+    # of the volume, but is centered on the middle of the field of view
+    vox2ras_tkr = pet.affine.copy()
+    vox2ras_tkr[:3, 3] = - vox2ras_tkr[:3, :3].dot(dims / 2.0)
+    ras2vox_tkr = np.linalg.inv(vox2ras_tkr)
+
+    data_normalized = None
     for i in range(len(in_surfaces)):
-        current_surf = nib.load(in_surfaces[i])
-        data_normalized += current_surf.get_data() * coefficient[i]
+        coords, _ = nib.freesurfer.io.read_geometry(in_surfaces[i])
+        if data_normalized is None:
+            data_normalized = np.zeros(coords.shape[0], dtype=np.float32)
+
+        voxels = np.rint(coords.dot(ras2vox_tkr[:3, :3].T) + ras2vox_tkr[:3, 3]).astype(int)
+        # Vertices falling outside of the field of view are given the value 0, as mri_vol2surf does
+        inside = np.all((voxels >= 0) & (voxels < dims), axis=1)
+        projection = np.zeros(coords.shape[0], dtype=np.float32)
+        projection[inside] = pet_data[voxels[inside, 0], voxels[inside, 1], voxels[inside, 2]]
+        data_normalized += projection * np.float32(coefficient[i])
 
     # hemisphere name will always be in our case the first 2 letters of the filename
     hemi = os.path.basename(in_surfaces[0])[0:2]
-    # data_normalized = np.atleast_3d(data_normalized)
-    hemi_projection = nib.MGHImage(data_normalized, affine=sample.affine, header=sample.header)
+    hemi_projection = nib.MGHImage(data_normalized.reshape((-1, 1, 1)), affine=np.eye(4))
     out_surface = './' + hemi + '.averaged_projection_on_cortical_surface.mgh'
     out_surface = os.path.abspath(out_surface)
     nib.save(hemi_projection, out_surface)
@@ -669,64 +609,55 @@ def produce_tsv(pet, atlas_files):
     """produce_tsv computes the average of PET signal based on annot files from Freesurfer. Those files describes the
     brain according to known atlases.
 
+    Regional averages are computed with a single weighted bincount per hemisphere and per atlas: the PET projection of
+    each hemisphere is read once and shared by all the atlases.
+
         Args:
             (string) pet      : list of path to the PET projection (must be a MGH file) [left_hemisphere, right_hemisphere]
             (string) atlas_files  : Dictionnary containing path to lh and rh annotation files for any number of atlases.
 
         Returns:
-            (string) tsv  : path to the tsv containing average PET values
+            (string) tsv  : paths to the tsv containing average PET values for the destrieux and desikan atlases
         """
     import nibabel as nib
     import numpy as np
     import pandas as pds
     import os
-    from clinica.utils.stream import cprint
-
-    # Extract data from projected PET data
-    lh_pet_mgh = np.squeeze(nib.load(pet[0]).get_data())
-    rh_pet_mgh = np.squeeze(nib.load(pet[1]).get_data())
 
-    filename_tsv = []
-    for atlas in atlas_files:
+    def regional_means(annot_labels, n_regions, pet_data):
+        # Vertices without label (-1) are assigned to the first region, as done by FreeSurfer (Unknown / Medial wall)
+        labels = np.where(annot_labels == -1, 0, annot_labels)
+        n_vertices = np.bincount(labels, minlength=n_regions)[:n_regions]
+        sum_pet = np.bincount(labels, weights=pet_data, minlength=n_regions)[:n_regions]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(n_vertices == 0, np.nan, sum_pet / n_vertices)
 
-        annot_atlas_left = nib.freesurfer.io.read_annot(atlas_files[atlas]['lh'], orig_ids=False)
-        annot_atlas_left[0][annot_atlas_left[0] == -1] = 0
-        annot_atlas_right = nib.freesurfer.io.read_annot(atlas_files[atlas]['rh'], orig_ids=False)
-        annot_atlas_right[0][annot_atlas_right[0] == -1] = 0
+    # Extract data from projected PET data (only once for all the atlases)
+    pet_data = {'lh': np.squeeze(nib.load(pet[0]).get_data()).astype('float64').ravel(),
+                'rh': np.squeeze(nib.load(pet[1]).get_data()).astype('float64').ravel()}
 
-        average_region = []
-        region_names = []
-        for r in range(len(annot_atlas_left[2])):
-            cprint(annot_atlas_left[2][r])
-            region_names.append(annot_atlas_left[2][r].astype(str) + '_lh')
-            region_names.append(annot_atlas_left[2][r].astype(str) + '_rh')
-
-            mask_left = annot_atlas_left[0] == r
-            mask_left = np.uint(mask_left)
-
-            masked_data_left = mask_left * lh_pet_mgh
-            if np.sum(mask_left) == 0:
-                average_region.append(np.nan)
-            else:
-                average_region.append(np.sum(masked_data_left) / np.sum(mask_left))
+    filename_tsv = {}
+    for atlas in atlas_files:
+        annot_atlas = {hemi: nib.freesurfer.io.read_annot(atlas_files[atlas][hemi], orig_ids=False)
+                       for hemi in ['lh', 'rh']}
+        # Region names are taken from the left hemisphere annotation for both hemispheres
+        names = [name.astype(str) for name in annot_atlas['lh'][2]]
+        n_regions = len(names)
 
-            mask_right = annot_atlas_right[0] == r
-            mask_right = np.uint(mask_right)
-            masked_data_right = mask_right * rh_pet_mgh
-            if np.sum(mask_right) == 0:
-                average_region.append(np.nan)
-            else:
-                average_region.append(np.sum(masked_data_right) / np.sum(mask_right))
+        average_region = np.empty(2 * n_regions)
+        average_region[0::2] = regional_means(annot_atlas['lh'][0], n_regions, pet_data['lh'])
+        average_region[1::2] = regional_means(annot_atlas['rh'][0], n_regions, pet_data['rh'])
+        region_names = [name + suffix for name in names for suffix in ['_lh', '_rh']]
 
         final_tsv = pds.DataFrame({'index': range(len(region_names)),
                                    'label_name': region_names,
-                                   'mean_scalar': list(average_region)})
-        filename_atlas_tsv = './' + atlas + '.tsv'
-        filename_tsv.append(filename_atlas_tsv)
+                                   'mean_scalar': average_region})
+        filename_atlas_tsv = os.path.abspath('./' + atlas + '.tsv')
+        filename_tsv[atlas] = filename_atlas_tsv
         final_tsv.to_csv(filename_atlas_tsv, sep='\t', index=False, columns=['index',
                                                                              'label_name',
                                                                              'mean_scalar'])
-    return os.path.abspath(filename_tsv[0]), os.path.abspath(filename_tsv[1])
+    return filename_tsv['destrieux'], filename_tsv['desikan']
 
 
 def get_wf(subject_id,
@@ -927,25 +858,10 @@ def get_wf(subject_id,
     surf_conversion.inputs.caps_dir = caps_dir
     surf_conversion.inputs.is_longitudinal = is_longitudinal
 
-    vol_on_surf = pe.MapNode(niu.Function(input_names=['volume',
-                                                       'surface',
-                                                       'subject_id',
-                                                       'session_id',
-                                                       'caps_dir',
-                                                       'gtmsegfile',
-                                                       'is_longitudinal'],
-                                          output_names=['output'],
-                                          function=utils.vol2surf),
-                             name='vol_on_surf',
-                             iterfield=['surface'])
-    vol_on_surf.inputs.subject_id = subject_id
-    vol_on_surf.inputs.session_id = session_id
-    vol_on_surf.inputs.caps_dir = caps_dir
-    vol_on_surf.inputs.is_longitudinal = is_longitudinal
-
-    normal_average = pe.Node(niu.Function(input_names=['in_surfaces'],
+    normal_average = pe.Node(niu.Function(input_names=['volume',
+                                                       'in_surfaces'],
                                           output_names=['out_surface'],
-                                          function=utils.weighted_mean),
+                                          function=utils.weighted_mean_projection),
                              name='normal_average')
 
     project_on_fsaverage = pe.Node(niu.Function(input_names=['projection',
@@ -1127,11 +1043,8 @@ def get_wf(subject_id,
                 (tkregister, surf_conversion, [('reg_file', 'reg_file')]),
                 (gtmsegmentation, surf_conversion, [('gtmseg_file', 'gtmsegfile')]),
 
-                (pvc, vol_on_surf, [('out_file', 'volume')]),
-                (surf_conversion, vol_on_surf, [('tval', 'surface')]),
-                (gtmsegmentation, vol_on_surf, [('gtmseg_file', 'gtmsegfile')]),
-
-                (vol_on_surf, normal_average, [('output', 'in_surfaces')]),
+                (pvc, normal_average, [('out_file', 'volume')]),
+                (surf_conversion, normal_average, [('tval', 'in_surfaces')]),
 
                 (normal_average, project_on_fsaverage, [('out_surface', 'projection')]),
 
@@ -38,6 +38,12 @@ class PETVolumeCLI(ce.CmdParser):
                               help='TSV file containing for each PET image its point spread function (PSF) measured '
                                    'in mm at x, y & z coordinates. Columns must contain: '
                                    'participant_id, session_id, acq_label, psf_x, psf_y and psf_z.')
+        optional.add_argument("-gas", "--group_atlas_statistics",
+                              action='store_true', default=False,
+                              help='Compute the atlas statistics of all the images at once after their SUVR '
+                                   'normalization. In addition to the TSV files of each image, a TSV file gathering '
+                                   'the statistics of the whole group is written in the groups/ folder of the CAPS '
+                                   'directory (one file per atlas).')
         # Clinica standard arguments (e.g. --n_procs)
         self.add_clinica_standard_arguments()
         # Advanced arguments (i.e. tricky parameters)
@@ -72,6 +78,7 @@ class PETVolumeCLI(ce.CmdParser):
             'mask_threshold': args.mask_threshold,
             'pvc_mask_tissues': args.pvc_mask_tissues,
             'smooth': args.smooth,
+            'group_atlas_statistics': args.group_atlas_statistics,
         }
         pipeline = PETVolume(
             bids_directory=self.absolute_path(args.bids_directory),
@@ -32,6 +32,7 @@ class PETVolume(cpe.Pipeline):
         self.parameters.setdefault("pvc_mask_tissues", [1, 2, 3])
         self.parameters.setdefault("smooth", [8])
         self.parameters.setdefault("atlases", PET_VOLUME_ATLASES)
+        self.parameters.setdefault("group_atlas_statistics", False)
 
     def check_custom_dependencies(self):
         """Check dependencies that can not be listed in the `info.json` file."""
@@ -294,6 +295,35 @@ class PETVolume(cpe.Pipeline):
              re.escape(self.parameters['suvr_reference_region']) + r'\4')
         ]
 
+        # Writing group atlas statistics into CAPS
+        # ========================================
+        if self.parameters['group_atlas_statistics']:
+            group_folder = 'group-' + self.parameters['group_label']
+            suvr_region = re.escape(self.parameters['suvr_reference_region'])
+            write_group_atlas_node = npe.Node(name='write_group_atlas_node',
+                                              interface=nio.DataSink())
+            write_group_atlas_node.inputs.base_directory = self.caps_directory
+            write_group_atlas_node.inputs.parameterization = False
+            write_group_atlas_node.inputs.regexp_substitutions = [
+                (r'(.*/)atlas_statistics/suvr_wr(sub-[a-zA-Z0-9]+)_(ses-[a-zA-Z0-9]+)_(.*)(_statistics\.tsv)$',
+                 r'\1subjects/\2/\3/pet/preprocessing/' + group_folder + r'/atlas_statistics/\2_\3_\4_suvr-'
+                 + suvr_region + r'\5'),
+                (r'(.*/)pvc_atlas_statistics/suvr_wpvc-rbv_r(sub-[a-zA-Z0-9]+)_(ses-[a-zA-Z0-9]+)_(.*)(_statistics\.tsv)$',
+                 r'\1subjects/\2/\3/pet/preprocessing/' + group_folder + r'/atlas_statistics/\2_\3_\4_pvc-rbv_suvr-'
+                 + suvr_region + r'\5'),
+                (r'(.*/)group_atlas_statistics/(group-.*)(_statistics\.tsv)$',
+                 r'\1groups/' + group_folder + r'/pet/atlas_statistics/\2_suvr-' + suvr_region + r'\3'),
+                (r'(.*/)pvc_group_atlas_statistics/(group-.*)(_statistics\.tsv)$',
+                 r'\1groups/' + group_folder + r'/pet/atlas_statistics/\2_pvc-rbv_suvr-' + suvr_region + r'\3')
+            ]
+            self.connect([(self.get_node('atlas_stats_group'), write_group_atlas_node,
+                           [('atlas_statistics', 'atlas_statistics'),
+                            ('group_atlas_statistics', 'group_atlas_statistics')])])
+            if self.parameters['apply_pvc']:
+                self.connect([(self.get_node('atlas_stats_group_pvc'), write_group_atlas_node,
+                               [('atlas_statistics', 'pvc_atlas_statistics'),
+                                ('group_atlas_statistics', 'pvc_group_atlas_statistics')])])
+
         self.connect([(self.input_node, container_path, [('pet_image', 'pet_filename')]),
                       (container_path, write_images_node, [(('container', fix_join, 'group-' + self.parameters['group_label']),
                                                             'container')]),
@@ -387,27 +417,14 @@ class PETVolume(cpe.Pipeline):
         # ======================================
         reslice = npe.Node(spmutils.Reslice(), name='reslice')
 
-        # Normalize PET values according to reference region
-        # ==================================================
-        norm_to_ref = npe.Node(nutil.Function(input_names=['pet_image', 'region_mask'],
-                                              output_names=['suvr_pet_path'],
-                                              function=utils.normalize_to_reference),
+        # Normalize PET values according to reference region, create binary mask
+        # from segmented tissues and mask PET image
+        # =======================================================================
+        norm_to_ref = npe.Node(nutil.Function(input_names=['pet_image', 'region_mask', 'tissues', 'threshold'],
+                                              output_names=['suvr_pet_path', 'out_mask', 'masked_image_path'],
+                                              function=utils.normalize_and_create_brain_mask),
                                name='norm_to_ref')
-
-        # Create binary mask from segmented tissues
-        # =========================================
-        binary_mask = npe.Node(nutil.Function(input_names=['tissues', 'threshold'],
-                                              output_names=['out_mask'],
-                                              function=utils.create_binary_mask),
-                               name='binary_mask')
-        binary_mask.inputs.threshold = self.parameters['mask_threshold']
-
-        # Mask PET image
-        # ==============
-        apply_mask = npe.Node(nutil.Function(input_names=['image', 'binary_mask'],
-                                             output_names=['masked_image_path'],
-                                             function=utils.apply_binary_mask),
-                              name='apply_mask')
+        norm_to_ref.inputs.threshold = self.parameters['mask_threshold']
 
         # Smoothing
         # =========
@@ -418,7 +435,7 @@ class PETVolume(cpe.Pipeline):
             smoothing_node.inputs.fwhm = [[x, x, x] for x in self.parameters['smooth']]
             smoothing_node.inputs.out_prefix = ['fwhm-' + str(x) + 'mm_' for x in self.parameters['smooth']]
             self.connect([
-                (apply_mask, smoothing_node, [('masked_image_path', 'in_files')]),
+                (norm_to_ref, smoothing_node, [('masked_image_path', 'in_files')]),
                 (smoothing_node, self.output_node, [('smoothed_files', 'pet_suvr_masked_smoothed')])
             ])
         else:
@@ -426,12 +443,29 @@ class PETVolume(cpe.Pipeline):
 
         # Atlas Statistics
         # ================
-        atlas_stats_node = npe.MapNode(nutil.Function(input_names=['in_image',
-                                                                   'in_atlas_list'],
-                                                      output_names=['atlas_statistics'],
-                                                      function=utils.atlas_statistics),
-                                       name='atlas_stats_node',
-                                       iterfield=['in_image'])
+        if self.parameters['group_atlas_statistics']:
+            # Statistics of all the subjects are computed at once (see build_output_node for the CAPS outputs)
+            atlas_stats_node = npe.JoinNode(nutil.Function(input_names=['in_images',
+                                                                        'in_atlas_list',
+                                                                        'group_label'],
+                                                           output_names=['atlas_statistics',
+                                                                         'group_atlas_statistics'],
+                                                           function=utils.atlas_statistics_group),
+                                            name='atlas_stats_group',
+                                            joinsource='LoadingCLIArguments',
+                                            joinfield=['in_images'])
+            atlas_stats_node.inputs.group_label = self.parameters['group_label']
+            self.connect([(norm_to_ref, atlas_stats_node, [('suvr_pet_path', 'in_images')])])
+            self.output_node.inputs.atlas_statistics = [[]]
+        else:
+            atlas_stats_node = npe.MapNode(nutil.Function(input_names=['in_image',
+                                                                       'in_atlas_list'],
+                                                          output_names=['atlas_statistics'],
+                                                          function=utils.atlas_statistics),
+                                           name='atlas_stats_node',
+                                           iterfield=['in_image'])
+            self.connect([(norm_to_ref, atlas_stats_node, [('suvr_pet_path', 'in_image')]),
+                          (atlas_stats_node, self.output_node, [('atlas_statistics', 'atlas_statistics')])])
         atlas_stats_node.inputs.in_atlas_list = self.parameters['atlases']
 
         # Connection
@@ -449,22 +483,18 @@ class PETVolume(cpe.Pipeline):
                       (unzip_flow_fields, dartel_mni_reg, [('out_file', 'flowfield_files')]),
                       (unzip_dartel_template, dartel_mni_reg, [('out_file', 'template_file')]),
                       (unzip_reference_mask, reslice, [('out_file', 'in_file')]),
-                      (unzip_mask_tissues, binary_mask, [('out_file', 'tissues')]),
+                      (unzip_mask_tissues, norm_to_ref, [('out_file', 'tissues')]),
 
                       (coreg_pet_t1, dartel_mni_reg, [('coregistered_source', 'apply_to_files')]),
                       (dartel_mni_reg, reslice, [('normalized_files', 'space_defining')]),
                       (dartel_mni_reg, norm_to_ref, [('normalized_files', 'pet_image')]),
                       (reslice, norm_to_ref, [('out_file', 'region_mask')]),
-                      (norm_to_ref, apply_mask, [('suvr_pet_path', 'image')]),
-                      (binary_mask, apply_mask, [('out_mask', 'binary_mask')]),
-                      (norm_to_ref, atlas_stats_node, [('suvr_pet_path', 'in_image')]),
 
                       (coreg_pet_t1, self.output_node, [('coregistered_source', 'pet_t1_native')]),
                       (dartel_mni_reg, self.output_node, [('normalized_files', 'pet_mni')]),
-                      (norm_to_ref, self.output_node, [('suvr_pet_path', 'pet_suvr')]),
-                      (binary_mask, self.output_node, [('out_mask', 'binary_mask')]),
-                      (apply_mask, self.output_node, [('masked_image_path', 'pet_suvr_masked')]),
-                      (atlas_stats_node, self.output_node, [('atlas_statistics', 'atlas_statistics')])
+                      (norm_to_ref, self.output_node, [('suvr_pet_path', 'pet_suvr'),
+                                                       ('out_mask', 'binary_mask'),
+                                                       ('masked_image_path', 'pet_suvr_masked')])
                       ])
 
         # PVC
@@ -500,19 +530,12 @@ class PETVolume(cpe.Pipeline):
             # ======================================
             reslice_pvc = npe.Node(spmutils.Reslice(), name='reslice_pvc')
 
-            # Normalize PET values according to reference region
-            # ==================================================
-            norm_to_ref_pvc = npe.Node(nutil.Function(input_names=['pet_image', 'region_mask'],
-                                                      output_names=['suvr_pet_path'],
-                                                      function=utils.normalize_to_reference),
+            # Normalize PET values according to reference region and mask PET image
+            # ======================================================================
+            norm_to_ref_pvc = npe.Node(nutil.Function(input_names=['pet_image', 'region_mask', 'binary_mask'],
+                                                      output_names=['suvr_pet_path', 'masked_image_path'],
+                                                      function=utils.normalize_and_apply_brain_mask),
                                        name='norm_to_ref_pvc')
-
-            # Mask PET image
-            # ==============
-            apply_mask_pvc = npe.Node(nutil.Function(input_names=['image', 'binary_mask'],
-                                                     output_names=['masked_image_path'],
-                                                     function=utils.apply_binary_mask),
-                                      name='apply_mask_pvc')
             # Smoothing
             # =========
             if self.parameters['smooth'] is not None and len(self.parameters['smooth']) > 0:
@@ -522,19 +545,35 @@ class PETVolume(cpe.Pipeline):
                 smoothing_pvc.inputs.fwhm = [[x, x, x] for x in self.parameters['smooth']]
                 smoothing_pvc.inputs.out_prefix = ['fwhm-' + str(x) + 'mm_' for x in self.parameters['smooth']]
                 self.connect([
-                    (apply_mask_pvc, smoothing_pvc, [('masked_image_path', 'in_files')]),
+                    (norm_to_ref_pvc, smoothing_pvc, [('masked_image_path', 'in_files')]),
                     (smoothing_pvc, self.output_node, [('smoothed_files', 'pet_pvc_suvr_masked_smoothed')])
                 ])
             else:
                 self.output_node.inputs.pet_pvc_suvr_masked_smoothed = [[]]
             # Atlas Statistics
             # ================
-            atlas_stats_pvc = npe.MapNode(nutil.Function(input_names=['in_image',
-                                                                      'in_atlas_list'],
-                                                         output_names=['atlas_statistics'],
-                                                         function=utils.atlas_statistics),
-                                          name='atlas_stats_pvc',
-                                          iterfield=['in_image'])
+            if self.parameters['group_atlas_statistics']:
+                atlas_stats_pvc = npe.JoinNode(nutil.Function(input_names=['in_images',
+                                                                           'in_atlas_list',
+                                                                           'group_label'],
+                                                              output_names=['atlas_statistics',
+                                                                            'group_atlas_statistics'],
+                                                              function=utils.atlas_statistics_group),
+                                               name='atlas_stats_group_pvc',
+                                               joinsource='LoadingCLIArguments',
+                                               joinfield=['in_images'])
+                atlas_stats_pvc.inputs.group_label = self.parameters['group_label']
+                self.connect([(norm_to_ref_pvc, atlas_stats_pvc, [('suvr_pet_path', 'in_images')])])
+                self.output_node.inputs.pvc_atlas_statistics = [[]]
+            else:
+                atlas_stats_pvc = npe.MapNode(nutil.Function(input_names=['in_image',
+                                                                          'in_atlas_list'],
+                                                             output_names=['atlas_statistics'],
+                                                             function=utils.atlas_statistics),
+                                              name='atlas_stats_pvc',
+                                              iterfield=['in_image'])
+                self.connect([(norm_to_ref_pvc, atlas_stats_pvc, [('suvr_pet_path', 'in_image')]),
+                              (atlas_stats_pvc, self.output_node, [('atlas_statistics', 'pvc_atlas_statistics')])])
             atlas_stats_pvc.inputs.in_atlas_list = self.parameters['atlases']
 
             # Connection
@@ -554,16 +593,12 @@ class PETVolume(cpe.Pipeline):
                           (dartel_mni_reg_pvc, reslice_pvc, [('normalized_files', 'space_defining')]),
                           (dartel_mni_reg_pvc, norm_to_ref_pvc, [('normalized_files', 'pet_image')]),
                           (reslice_pvc, norm_to_ref_pvc, [('out_file', 'region_mask')]),
-
-                          (norm_to_ref_pvc, apply_mask_pvc, [('suvr_pet_path', 'image')]),
-                          (binary_mask, apply_mask_pvc, [('out_mask', 'binary_mask')]),
-                          (norm_to_ref_pvc, atlas_stats_pvc, [('suvr_pet_path', 'in_image')]),
+                          (norm_to_ref, norm_to_ref_pvc, [('out_mask', 'binary_mask')]),
 
                           (petpvc, self.output_node, [('out_file', 'pet_pvc')]),
                           (dartel_mni_reg_pvc, self.output_node, [('normalized_files', 'pet_pvc_mni')]),
-                          (norm_to_ref_pvc, self.output_node, [('suvr_pet_path', 'pet_pvc_suvr')]),
-                          (apply_mask_pvc, self.output_node, [('masked_image_path', 'pet_pvc_suvr_masked')]),
-                          (atlas_stats_pvc, self.output_node, [('atlas_statistics', 'pvc_atlas_statistics')])
+                          (norm_to_ref_pvc, self.output_node, [('suvr_pet_path', 'pet_pvc_suvr'),
+                                                               ('masked_image_path', 'pet_pvc_suvr_masked')])
                           ])
         else:
             self.output_node.inputs.pet_pvc = [[]]
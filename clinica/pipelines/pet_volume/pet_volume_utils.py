@@ -27,113 +27,143 @@ def init_input_node(pet_nii):
     return pet_nii
 
 
-def create_binary_mask(tissues, threshold=0.3):
-    """
-
-    Args:
-        tissues:
-        threshold:
-
-    Returns:
+def create_pvc_mask(tissues):
 
-    """
     import nibabel as nib
     import numpy as np
     from os import getcwd
-    from os.path import join, basename
+    from os.path import join
 
     if len(tissues) == 0:
         raise RuntimeError('The length of the list of tissues must be greater than zero.')
 
     img_0 = nib.load(tissues[0])
-    shape = list(img_0.get_data().shape)
+    shape = img_0.shape[:3] + (len(tissues) + 1,)
+    data = np.empty(shape=shape, dtype=np.float32)
 
-    data = np.zeros(shape=shape)
-
-    for image in tissues:
-        data = data + nib.load(image).get_data()
+    for i in range(len(tissues)):
+        data[..., i] = np.asanyarray(nib.load(tissues[i]).dataobj)
 
-    data = (data > threshold) * 1.0
-    out_mask = join(getcwd(), basename(tissues[0]) + '_brainmask.nii')
+    # Background is the complement of the sum of the tissues
+    data[..., len(tissues)] = 1.0 - data[..., :len(tissues)].sum(axis=-1)
 
-    mask = nib.Nifti1Image(data, img_0.affine, header=img_0.header)
+    out_mask = join(getcwd(), 'pvc_mask.nii')
+    header = img_0.header.copy()
+    header.set_data_dtype(np.float32)
+    mask = nib.Nifti1Image(data, img_0.affine, header=header)
     nib.save(mask, out_mask)
     return out_mask
 
 
-def apply_binary_mask(image, binary_mask):
+def pet_pvc_name(pet_image, pvc_method):
+    from os.path import basename
+    pet_pvc_path = 'pvc-' + pvc_method.lower() + '_' + basename(pet_image)
+    return pet_pvc_path
+
+
+def compute_suvr(pet_image, region_mask):
+    """Normalize the PET image by the average uptake in the reference region.
+
+    Args:
+        pet_image: Nifti image of the PET
+        region_mask: Nifti image of the reference region (in PET space)
+
+    Returns:
+        Loaded PET image, SUVR data (float32 array)
+    """
     import nibabel as nib
+    import numpy as np
+
+    pet = nib.load(pet_image)
+    pet_data = np.asanyarray(pet.dataobj).astype(np.float32)
+    region = pet_data * np.asanyarray(nib.load(region_mask).dataobj).astype(np.float32)
+    region_mean = np.nanmean(region[region != 0], dtype=np.float64)
+
+    pet_data /= np.float32(region_mean)
+    return pet, pet_data
+
+
+def save_float32(data, reference_image, filename):
+    """Save data in float32 with the geometry of reference_image in the current directory."""
+    import nibabel as nib
+    import numpy as np
     from os import getcwd
-    from os.path import join, basename
+    from os.path import join
 
-    original_image = nib.load(image)
-    mask = nib.load(binary_mask)
+    out_file = join(getcwd(), filename)
+    header = reference_image.header.copy()
+    header.set_data_dtype(np.float32)
+    nib.save(nib.Nifti1Image(data, reference_image.affine, header=header), out_file)
+    return out_file
 
-    data = original_image.get_data() * mask.get_data()
 
-    masked_image_path = join(getcwd(), 'masked_' + basename(image))
-    masked_image = nib.Nifti1Image(data, original_image.affine, header=original_image.header)
-    nib.save(masked_image, masked_image_path)
-    return masked_image_path
+def normalize_and_create_brain_mask(pet_image, region_mask, tissues, threshold=0.3):
+    """Compute the SUVR PET image, the binary brain mask and the masked SUVR PET image in one pass.
 
+    The brain mask is the sum of the tissue maps thresholded by `threshold`.
 
-def create_pvc_mask(tissues):
+    Args:
+        pet_image: Nifti image of the PET (in MNI space)
+        region_mask: Nifti image of the reference region (in PET space)
+        tissues: List of tissue maps (in MNI space)
+        threshold: Threshold used to binarize the sum of the tissue maps
 
+    Returns:
+        Path to the SUVR PET image, path to the binary mask, path to the masked SUVR PET image
+    """
     import nibabel as nib
     import numpy as np
     from os import getcwd
-    from os.path import join
+    from os.path import basename, join
+    import clinica.pipelines.pet_volume.pet_volume_utils as utils
 
     if len(tissues) == 0:
         raise RuntimeError('The length of the list of tissues must be greater than zero.')
 
     img_0 = nib.load(tissues[0])
-    shape = img_0.get_data().shape
-    background = np.zeros(shape=shape)
+    data = np.zeros(img_0.shape, dtype=np.float32)
+    for image in tissues:
+        data += np.asanyarray(nib.load(image).dataobj)
+    brain_mask = data > threshold
 
-    shape += tuple([len(tissues) + 1])
-    data = np.empty(shape=shape, dtype=np.float64)
+    out_mask = join(getcwd(), basename(tissues[0]) + '_brainmask.nii')
+    header = img_0.header.copy()
+    header.set_data_dtype(np.uint8)
+    header.set_slope_inter(1, 0)
+    nib.save(nib.Nifti1Image(brain_mask.astype(np.uint8), img_0.affine, header=header), out_mask)
 
-    for i in range(len(tissues)):
-        image = nib.load(tissues[i])
-        data[..., i] = np.array(image.get_data())
-        background = background + image.get_data()
+    pet, suvr_data = utils.compute_suvr(pet_image, region_mask)
+    suvr_pet_path = utils.save_float32(suvr_data, pet, 'suvr_' + basename(pet_image))
 
-    background = 1.0 - background
-    data[..., len(tissues)] = np.array(background)
+    suvr_data *= brain_mask
+    masked_image_path = utils.save_float32(suvr_data, pet, 'masked_suvr_' + basename(pet_image))
 
-    out_mask = join(getcwd(), 'pvc_mask.nii')
-    mask = nib.Nifti1Image(data, img_0.affine, header=img_0.header)
-    nib.save(mask, out_mask)
-    return out_mask
+    return suvr_pet_path, out_mask, masked_image_path
 
 
-def pet_pvc_name(pet_image, pvc_method):
-    from os.path import basename
-    pet_pvc_path = 'pvc-' + pvc_method.lower() + '_' + basename(pet_image)
-    return pet_pvc_path
+def normalize_and_apply_brain_mask(pet_image, region_mask, binary_mask):
+    """Compute the SUVR PET image and the masked SUVR PET image in one pass.
 
+    Args:
+        pet_image: Nifti image of the PET (in MNI space)
+        region_mask: Nifti image of the reference region (in PET space)
+        binary_mask: Nifti image of the binary brain mask
 
-def normalize_to_reference(pet_image, region_mask):
+    Returns:
+        Path to the SUVR PET image, path to the masked SUVR PET image
+    """
     import nibabel as nib
     import numpy as np
-    from os import getcwd
-    from os.path import basename, join
-
-    pet = nib.load(pet_image)
-    ref = nib.load(region_mask)
-
-    region = np.multiply(pet.get_data(), ref.get_data())
-    region_mean = np.nanmean(np.where(region != 0, region, np.nan))
-
-    data = pet.get_data() / region_mean
+    from os.path import basename
+    import clinica.pipelines.pet_volume.pet_volume_utils as utils
 
-    suvr_pet_path = join(getcwd(), 'suvr_' + basename(pet_image))
+    pet, suvr_data = utils.compute_suvr(pet_image, region_mask)
+    suvr_pet_path = utils.save_float32(suvr_data, pet, 'suvr_' + basename(pet_image))
 
-    suvr_pet = nib.Nifti1Image(data, pet.affine, header=pet.header)
-    nib.save(suvr_pet, suvr_pet_path)
+    suvr_data *= np.asanyarray(nib.load(binary_mask).dataobj) > 0
+    masked_image_path = utils.save_float32(suvr_data, pet, 'masked_suvr_' + basename(pet_image))
 
-    return suvr_pet_path
+    return suvr_pet_path, masked_image_path
 
 
 def atlas_statistics(in_image, in_atlas_list):
@@ -151,23 +181,71 @@ def atlas_statistics(in_image, in_atlas_list):
     from os import getcwd
     from os.path import abspath, join
     from nipype.utils.filemanip import split_filename
-    from clinica.utils.atlas import AtlasAbstract
+    from clinica.utils.atlas import get_atlas
     from clinica.utils.statistics import statistics_on_atlas
 
     orig_dir, base, ext = split_filename(in_image)
-    atlas_classes = AtlasAbstract.__subclasses__()
     atlas_statistics_list = []
     for atlas in in_atlas_list:
-        for atlas_class in atlas_classes:
-            if atlas_class.get_name_atlas() == atlas:
-                out_atlas_statistics = abspath(join(getcwd(), base + '_space-' + atlas + '_statistics.tsv'))
-                statistics_on_atlas(in_image, atlas_class(), out_atlas_statistics)
-                atlas_statistics_list.append(out_atlas_statistics)
-                break
+        out_atlas_statistics = abspath(join(getcwd(), base + '_space-' + atlas + '_statistics.tsv'))
+        statistics_on_atlas(in_image, get_atlas(atlas), out_atlas_statistics)
+        atlas_statistics_list.append(out_atlas_statistics)
 
     return atlas_statistics_list
 
 
+def atlas_statistics_group(in_images, in_atlas_list, group_label):
+    """
+    For each atlas name provided it calculates for all the input images the mean
+    for each region in the atlas. The statistics are saved in one TSV file per image
+    (same content as `atlas_statistics`) and in one TSV file for the whole group
+    (one row per image, one column per region).
+
+    Args:
+        in_images: List of Nifti images (one per subject/session)
+        in_atlas_list: List of names of atlas to be applied
+        group_label: Label of the group
+
+    Returns:
+        List of paths to the tsv files of each image, list of paths to the tsv files of the group
+    """
+    import re
+    from os import getcwd
+    from os.path import abspath, join
+    import pandas as pds
+    from nipype.utils.filemanip import split_filename
+    from clinica.utils.atlas import get_atlas
+    from clinica.utils.statistics import statistics_on_atlas_group
+
+    bases = [split_filename(in_image)[1] for in_image in in_images]
+    ids = [re.search(r'(sub-[a-zA-Z0-9]+)_(ses-[a-zA-Z0-9]+)_(.*)$', base) for base in bases]
+    if any(m is None for m in ids):
+        raise ValueError('Input filenames are not in a BIDS or CAPS compliant format. They do not contain the subject' +
+                         ' and session information.')
+
+    atlas_statistics_list = []
+    group_atlas_statistics_list = []
+    for atlas in in_atlas_list:
+        mean_signal_value, label_name = statistics_on_atlas_group(in_images, get_atlas(atlas))
+
+        for base, mean_signal in zip(bases, mean_signal_value):
+            out_atlas_statistics = abspath(join(getcwd(), base + '_space-' + atlas + '_statistics.tsv'))
+            pds.DataFrame({'label_name': label_name,
+                           'mean_scalar': mean_signal}).to_csv(out_atlas_statistics, sep='\t',
+                                                               index=True, encoding='utf-8')
+            atlas_statistics_list.append(out_atlas_statistics)
+
+        group_statistics = pds.DataFrame(mean_signal_value, columns=label_name)
+        group_statistics.insert(0, 'session_id', [m.group(2) for m in ids])
+        group_statistics.insert(0, 'participant_id', [m.group(1) for m in ids])
+        out_group_statistics = abspath(join(getcwd(), 'group-' + group_label + '_' + ids[0].group(3)
+                                            + '_space-' + atlas + '_statistics.tsv'))
+        group_statistics.to_csv(out_group_statistics, sep='\t', index=False, encoding='utf-8')
+        group_atlas_statistics_list.append(out_group_statistics)
+
+    return atlas_statistics_list, group_atlas_statistics_list
+
+
 def pet_container_from_filename(pet_filename):
     import re
     from os.path import join
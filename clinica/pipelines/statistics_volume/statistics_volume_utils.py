@@ -197,8 +197,9 @@ def run_m_script(m_file):
         output_mat_file: (str) path to the SPM.mat file needed in SPM analysis
     """
     from os.path import isfile, dirname, basename, abspath, join
-    from os import system
+    from os import system, environ, getcwd
     from clinica.utils.spm import spm_standalone_is_available
+    from clinica.utils.matlab_pool import MATLAB_POOL_SOCKET, submit_matlab_script
     import clinica.pipelines.statistics_volume.statistics_volume_utils as utls
     from nipype.interfaces.matlab import MatlabCommand, get_matlab_command
     import platform
@@ -209,7 +210,14 @@ def run_m_script(m_file):
     assert m_file[-2:] == '.m', '[Error] ' + m_file + ' is not a Matlab file (extension must be .m)'
 
     # Generate command line to run
-    if spm_standalone_is_available():
+    if MATLAB_POOL_SOCKET in environ:
+        # The script (with its spm_jobman line) is run by a MATLAB process of the pool of the pipeline
+        returncode, output = submit_matlab_script(m_file, getcwd())
+        with open(abspath('./matlab_output.log'), 'w') as f:
+            f.write(output)
+        if returncode != 0:
+            raise RuntimeError('[Error] ' + m_file + ' failed in the MATLAB pool:\n' + output)
+    elif spm_standalone_is_available():
         utls.delete_last_line(m_file)
         # SPM standalone must be run directly from its root folder
         if platform.system().lower().startswith('darwin'):
@@ -72,6 +72,11 @@ class T1VolumeCLI(ce.CmdParser):
                               nargs=3, type=float,
                               help="A list of 3 floats specifying the voxel sizeof the output image "
                                    "(default: --voxel_size 1.5 1.5 1.5).")
+        advanced.add_argument("-sg", "--single_graph",
+                              action='store_true', default=False,
+                              help="Run the 4 parts of the pipeline in a single Nipype graph: each part starts "
+                                   "as soon as its inputs are ready instead of waiting for the previous part "
+                                   "to finish for all the images.")
 
     def run_command(self, args):
         """Run the pipeline with defined args."""
@@ -101,6 +106,10 @@ class T1VolumeCLI(ce.CmdParser):
             args.subjects_sessions_tsv = now + '_participants.tsv'
             save_participants_sessions(participant_ids, session_ids, os.getcwd(), args.subjects_sessions_tsv)
 
+        if args.single_graph:
+            self.run_single_graph(args)
+            return
+
         cprint('%s\nPart 1/4: Running t1-volume-segmentation pipeline%s' % (Fore.BLUE, Fore.RESET))
         tissue_segmentation_cli = T1VolumeTissueSegmentationCLI()
         tissue_segmentation_cli.run_command(args)
@@ -116,3 +125,93 @@ class T1VolumeCLI(ce.CmdParser):
         cprint('%s\nPart 4/4: Running t1-volume-parcellation pipeline%s' % (Fore.BLUE, Fore.RESET))
         parcellation_cli = T1VolumeParcellationCLI()
         parcellation_cli.run_command(args)
+
+    def run_single_graph(self, args):
+        """Run the 4 parts of the pipeline in a single Nipype graph (see PipelineChain)."""
+        from networkx import Graph
+        from clinica.pipelines.engine import PipelineChain
+        from clinica.utils.atlas import T1_VOLUME_ATLASES
+        from clinica.utils.input_files import (t1_volume_dartel_input_tissue, t1_volume_native_tpm,
+                                               t1_volume_deformation_to_template, t1_volume_final_group_template,
+                                               t1_volume_template_tpm_in_mni)
+        from clinica.utils.ux import print_end_pipeline, print_crash_files_and_exit
+        from ..t1_volume_tissue_segmentation.t1_volume_tissue_segmentation_pipeline import T1VolumeTissueSegmentation
+        from ..t1_volume_create_dartel.t1_volume_create_dartel_pipeline import T1VolumeCreateDartel
+        from ..t1_volume_dartel2mni.t1_volume_dartel2mni_pipeline import T1VolumeDartel2MNI
+        from ..t1_volume_parcellation.t1_volume_parcellation_pipeline import T1VolumeParcellation
+        from .t1_volume_utils import select_caps_files, select_caps_file
+
+        pipeline_parameters = [
+            (T1VolumeTissueSegmentation, {
+                'tissue_classes': args.tissue_classes,
+                'dartel_tissues': args.dartel_tissues,
+                'tissue_probability_maps': args.tissue_probability_maps,
+                'save_warped_unmodulated': not args.dont_save_warped_unmodulated,
+                'save_warped_modulated': args.save_warped_modulated,
+            }),
+            (T1VolumeCreateDartel, {
+                'group_label': args.group_label,
+                'dartel_tissues': args.dartel_tissues,
+            }),
+            (T1VolumeDartel2MNI, {
+                'group_label': args.group_label,
+                'tissues': args.tissues,
+                'voxel_size': args.voxel_size,
+                'modulate': args.modulate,
+                'smooth': args.smooth,
+            }),
+            (T1VolumeParcellation, {
+                'group_label': args.group_label,
+                'atlases': T1_VOLUME_ATLASES,
+            }),
+        ]
+        # The BIDS directory is given to all the pipelines since the CAPS directory may not exist yet
+        segmentation, create_dartel, dartel2mni, parcellation = [
+            pipeline_class(
+                bids_directory=self.absolute_path(args.bids_directory),
+                caps_directory=self.absolute_path(args.caps_directory),
+                tsv_file=self.absolute_path(args.subjects_sessions_tsv),
+                base_dir=self.absolute_path(args.working_directory),
+                parameters=parameters
+            ) for pipeline_class, parameters in pipeline_parameters
+        ]
+        # The input nodes of the chained pipelines are not built: the checks of create-dartel are done here
+        create_dartel.check_template_creation()
+
+        chain = PipelineChain([segmentation, create_dartel, dartel2mni, parcellation],
+                              name='T1Volume',
+                              base_dir=self.absolute_path(args.working_directory))
+        # Inputs of each part are the files written in CAPS by the previous parts
+        chain.connect_pipelines(
+            segmentation, 'WriteCAPS.out_file', create_dartel, 'dartel_input_images',
+            join_source='ReadingFiles', function=select_caps_files,
+            function_args={'patterns': [t1_volume_dartel_input_tissue(t)['pattern'] for t in args.dartel_tissues]})
+        chain.connect_pipelines(
+            segmentation, 'WriteCAPS.out_file', dartel2mni, 'native_segmentations',
+            join_source='ReadingFiles', function=select_caps_files,
+            function_args={'patterns': [t1_volume_native_tpm(t)['pattern'] for t in args.tissues],
+                           'group_by_image': True})
+        chain.connect_pipelines(
+            create_dartel, 'write_flowfields_node.out_file', dartel2mni, 'flowfield_files',
+            function=select_caps_files,
+            function_args={'patterns': [t1_volume_deformation_to_template(args.group_label)['pattern']]})
+        chain.connect_pipelines(
+            create_dartel, 'write_template_node.out_file', dartel2mni, 'template_file',
+            function=select_caps_file,
+            function_args={'pattern': t1_volume_final_group_template(args.group_label)['pattern']})
+        chain.connect_pipelines(
+            dartel2mni, 'write_normalized_node.out_file', parcellation, 'file_list',
+            function=select_caps_files,
+            function_args={'patterns': [t1_volume_template_tpm_in_mni(args.group_label, 1, True)['pattern']]})
+        parcellation.input_node.inputs.atlas_list = T1_VOLUME_ATLASES
+
+        if args.n_procs:
+            exec_pipeline = chain.run(plugin='MultiProc',
+                                      plugin_args={'n_procs': args.n_procs})
+        else:
+            exec_pipeline = chain.run()
+
+        if isinstance(exec_pipeline, Graph):
+            print_end_pipeline(self.name, chain.base_dir, chain.base_dir_was_specified)
+        else:
+            print_crash_files_and_exit(args.logname, chain.base_dir)
@@ -0,0 +1,57 @@
+# coding: utf8
+
+
+def select_caps_files(caps_files, patterns, group_by_image=False):
+    """
+    Select, among the files written in CAPS by a pipeline, the inputs of the next pipeline of t1-volume.
+
+    Args:
+        caps_files: Files written by a DataSink, as a list with one element (file or nested lists of files) per image
+        patterns: List of patterns of the files to select (e.g. the 'pattern' field of clinica.utils.input_files)
+        group_by_image: If True, returns one list of files (one per pattern) per image,
+            otherwise one list of files (one per image) per pattern
+
+    Returns:
+        List of lists of files (or list of files if only one pattern is given and group_by_image is False)
+    """
+    from fnmatch import fnmatch
+
+    def flatten(files):
+        if isinstance(files, str):
+            return [files]
+        return [f for sub_files in files for f in flatten(sub_files)]
+
+    selected_files = []
+    for image_files in caps_files:
+        image_files = flatten(image_files)
+        selected_image_files = []
+        for pattern in patterns:
+            matching_files = [f for f in image_files if fnmatch(f, '*' + pattern)]
+            if len(matching_files) != 1:
+                raise ValueError('%s files matching %s were found among %s.'
+                                 % (len(matching_files), pattern, image_files))
+            selected_image_files.append(matching_files[0])
+        selected_files.append(selected_image_files)
+
+    if group_by_image:
+        return selected_files
+    selected_files = [list(pattern_files) for pattern_files in zip(*selected_files)]
+    if len(patterns) == 1:
+        return selected_files[0]
+    return selected_files
+
+
+def select_caps_file(caps_files, pattern):
+    """
+    Select the file matching pattern among the files written in CAPS by a pipeline (e.g. a group template).
+
+    Args:
+        caps_files: Files written by a DataSink (file or nested lists of files)
+        pattern: Pattern of the file to select
+
+    Returns:
+        Path to the file
+    """
+    from clinica.pipelines.t1_volume.t1_volume_utils import select_caps_files
+
+    return select_caps_files([caps_files], [pattern])[0]
@@ -42,18 +42,18 @@ class T1VolumeCreateDartel(cpe.Pipeline):
 
         return ['final_template_file', 'template_files', 'dartel_flow_fields']
 
-    def build_input_node(self):
-        """Build and connect an input node to the pipeline."""
+    def check_template_creation(self):
+        """Check that the DARTEL template of the group does not exist yet and that there are at least 2 images.
+
+        Also called by `clinica run t1-volume --single_graph` before building the chained pipelines, whose input
+        nodes are not built.
+        """
         import os
         import sys
         from colorama import Fore
-        import nipype.pipeline.engine as npe
-        import nipype.interfaces.utility as nutil
-        from clinica.utils.inputs import clinica_file_reader
-        from clinica.utils.input_files import t1_volume_dartel_input_tissue
         from clinica.utils.exceptions import ClinicaException
         from clinica.utils.stream import cprint
-        from clinica.utils.ux import print_groups_in_caps_directory, print_images_to_process, print_begin_image
+        from clinica.utils.ux import print_groups_in_caps_directory
 
         representative_output = os.path.join(self.caps_directory,
                                              'groups',
@@ -72,6 +72,18 @@ class T1VolumeCreateDartel(cpe.Pipeline):
             raise ClinicaException('%sThis pipeline needs at least 2 images to create DARTEL template but '
                                    'Clinica only found %s.%s' % (Fore.RED, len(self.subjects), Fore.RESET))
 
+    def build_input_node(self):
+        """Build and connect an input node to the pipeline."""
+        import nipype.pipeline.engine as npe
+        import nipype.interfaces.utility as nutil
+        from clinica.utils.inputs import clinica_file_reader
+        from clinica.utils.input_files import t1_volume_dartel_input_tissue
+        from clinica.utils.exceptions import ClinicaException
+        from clinica.utils.stream import cprint
+        from clinica.utils.ux import print_images_to_process, print_begin_image
+
+        self.check_template_creation()
+
         read_parameters_node = npe.Node(name="LoadingCLIArguments",
                                         interface=nutil.IdentityInterface(fields=self.get_input_fields(),
                                                                           mandatory_inputs=True))
@@ -64,25 +64,7 @@ class AtlasAbstract:
         Returns the spatial resolution of the atlas (in format "XxXxX" e.g.
         1x1x1 or 1.5x1.5x1.5).
         """
-        import nibabel as nib
-
-        img_labels = nib.load(self.get_atlas_labels())
-        voxels_labels = img_labels.header.get_zooms()
-        # Will display integers without decimals
-        if int(voxels_labels[0]) == voxels_labels[0]:
-            s_x = str(int(voxels_labels[0]))
-        else:
-            s_x = str(voxels_labels[0])
-        if int(voxels_labels[1]) == voxels_labels[1]:
-            s_y = str(int(voxels_labels[1]))
-        else:
-            s_y = str(voxels_labels[1])
-        if int(voxels_labels[2]) == voxels_labels[2]:
-            s_z = str(int(voxels_labels[2]))
-        else:
-            s_z = str(voxels_labels[2])
-
-        return s_x + "x" + s_y + "x" + s_z
+        return get_atlas_geometry(self).resolution
 
     @abc.abstractmethod
     def get_atlas_labels(self):
@@ -100,16 +82,9 @@ class AtlasAbstract:
         pass
 
     def get_index(self):
-        import nibabel as nib
         import numpy as np
 
-        img_labels = nib.load(self.get_atlas_labels())
-        img_labels = img_labels.get_data()
-        labels = list(set(img_labels.ravel()))
-        index_vector = np.zeros(len(labels))
-        for index, n in enumerate(labels):
-            index_vector[index] = index
-        return index_vector
+        return np.arange(len(get_atlas_geometry(self).image_labels), dtype=float)
 
 
 class JHUDTI811mm(AtlasAbstract):
@@ -463,3 +438,213 @@ class AtlasLoader:
 
     def get_atlases(self):
         return self.atlas
+
+
+# Geometry of the atlases loaded by this process (see get_atlas_geometry)
+_atlas_registry = {}
+
+
+def get_atlas(name):
+    """Return the atlas named `name` (see AtlasAbstract.get_name_atlas)."""
+    for atlas_class in AtlasAbstract.__subclasses__():
+        if atlas_class.get_name_atlas() == name:
+            return atlas_class()
+    raise ValueError("Unknown atlas %s" % name)
+
+
+def format_spatial_resolution(zooms):
+    """Format voxel sizes as "XxXxX" (integers without decimals, e.g. 1x1x1 or 1.5x1.5x1.5)."""
+    return "x".join(str(int(z)) if int(z) == z else str(z) for z in zooms[:3])
+
+
+class AtlasGeometry:
+    """
+    Labels of an atlas, loaded once per process (see get_atlas_geometry).
+
+    The ROIs are those of the TSV file of the atlas (roi_name, roi_value).
+    The voxels of the ROIs are indexed by runs: voxel_index lists the
+    indices (in the flattened label image) of the voxels of the ROIs,
+    sorted by ROI, and the voxels of the i-th distinct ROI value are
+    voxel_index[offsets[i]:offsets[i + 1]]. This index is computed when it
+    is first needed, and can be kept in a cache folder.
+    """
+
+    def __init__(self, atlas, cache_dir=None):
+        import nibabel as nib
+        import pandas
+
+        self.name = atlas.get_name_atlas()
+        self.labels_file = atlas.get_atlas_labels()
+        header = nib.load(self.labels_file).header
+        self.shape = header.get_data_shape()[:3]
+        self.zooms = header.get_zooms()[:3]
+        self.resolution = format_spatial_resolution(self.zooms)
+
+        atlas_correspondence = pandas.io.parsers.read_csv(atlas.get_tsv_roi(), sep='\t')
+        self.roi_name = list(atlas_correspondence.roi_name)
+        self.roi_value = list(atlas_correspondence.roi_value)
+
+        self._cache_dir = cache_dir
+        self._index = None
+
+    def _get_cache_file(self):
+        import hashlib
+        import os
+        from clinica.utils.hashing import fast_hash_file
+
+        digest = hashlib.sha1(fast_hash_file(self.labels_file).encode())
+        digest.update(str(self.roi_value).encode())
+        return os.path.join(self._cache_dir, "atlas-%s_%s_index.npz" % (self.name, digest.hexdigest()))
+
+    def _compute_index(self):
+        import nibabel as nib
+        import numpy as np
+
+        labels = np.asanyarray(nib.load(self.labels_file).dataobj).ravel()
+        unique_value, value_index = np.unique(self.roi_value, return_inverse=True)
+        position = np.clip(np.searchsorted(unique_value, labels), 0, len(unique_value) - 1)
+        voxel_index = np.flatnonzero(unique_value[position] == labels)
+        voxel_index = voxel_index[np.argsort(position[voxel_index], kind="stable")]
+        offsets = np.searchsorted(position[voxel_index], np.arange(len(unique_value) + 1))
+        return {
+            "voxel_index": voxel_index.astype(np.int64),
+            "offsets": offsets,
+            "value_index": value_index,
+            "image_labels": np.unique(labels),
+        }
+
+    def _get_index(self):
+        import os
+        import numpy as np
+
+        if self._index is not None:
+            return self._index
+        cache_file = self._get_cache_file() if self._cache_dir else None
+        if cache_file and os.path.isfile(cache_file):
+            with np.load(cache_file) as index:
+                self._index = dict(index)
+            return self._index
+        self._index = self._compute_index()
+        if cache_file:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            tmp_file = "%s.%d.tmp.npz" % (cache_file[:-len(".npz")], os.getpid())
+            np.savez(tmp_file, **self._index)
+            os.replace(tmp_file, cache_file)
+        return self._index
+
+    @property
+    def voxel_index(self):
+        return self._get_index()["voxel_index"]
+
+    @property
+    def offsets(self):
+        return self._get_index()["offsets"]
+
+    @property
+    def image_labels(self):
+        """Distinct values of the label image."""
+        return self._get_index()["image_labels"]
+
+    @property
+    def n_voxels(self):
+        """Number of voxels of each ROI (order of the TSV file)."""
+        import numpy as np
+
+        return np.diff(self.offsets)[self._get_index()["value_index"]]
+
+    def roi_means(self, data):
+        """
+        Mean of images in each ROI.
+
+        Args:
+            data (np.ndarray): An image registered on the atlas, or a matrix
+                with one flattened image per row.
+
+        Returns:
+            Mean of the image in each ROI (order of the TSV file; NaN for
+            ROIs without voxel), or matrix with one row per image.
+        """
+        import numpy as np
+
+        index = self._get_index()
+        data = np.asanyarray(data)
+        n_image_voxels = int(np.prod(self.shape))
+        values = data.reshape(-1, n_image_voxels)[:, index["voxel_index"]]
+
+        offsets = index["offsets"]
+        n_voxels = np.diff(offsets)
+        sums = np.zeros((values.shape[0], len(n_voxels)))
+        # Runs of the distinct ROI values containing voxels
+        non_empty = np.flatnonzero(n_voxels)
+        if len(non_empty):
+            sums[:, non_empty] = np.add.reduceat(values, offsets[non_empty], axis=1, dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = (sums / n_voxels)[:, index["value_index"]]
+        return means[0] if data.size == n_image_voxels else means
+
+    def roi_statistics(self, data):
+        """
+        Mean, standard deviation and number of voxels of images in each ROI.
+
+        The standard deviation is computed in a second pass on the voxels of
+        the ROIs, centered on the mean of their ROI.
+
+        Args:
+            data (np.ndarray): An image registered on the atlas, or a matrix
+                with one flattened image per row.
+
+        Returns:
+            Tuple (means, stds, n_voxels) where means and stds are arrays
+            with one value per ROI (order of the TSV file; NaN for ROIs
+            without voxel), or matrices with one row per image, and n_voxels
+            is the number of voxels of each ROI.
+        """
+        import numpy as np
+
+        index = self._get_index()
+        data = np.asanyarray(data)
+        n_image_voxels = int(np.prod(self.shape))
+        values = data.reshape(-1, n_image_voxels)[:, index["voxel_index"]].astype(np.float64)
+
+        offsets = index["offsets"]
+        n_voxels = np.diff(offsets)
+        sums = np.zeros((values.shape[0], len(n_voxels)))
+        squares = np.zeros((values.shape[0], len(n_voxels)))
+        non_empty = np.flatnonzero(n_voxels)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if len(non_empty):
+                sums[:, non_empty] = np.add.reduceat(values, offsets[non_empty], axis=1)
+                run_means = sums / n_voxels
+                values -= np.repeat(run_means[:, non_empty], n_voxels[non_empty], axis=1)
+                squares[:, non_empty] = np.add.reduceat(values * values, offsets[non_empty], axis=1)
+            means = (sums / n_voxels)[:, index["value_index"]]
+            stds = np.sqrt(squares / n_voxels)[:, index["value_index"]]
+        n_voxels = n_voxels[index["value_index"]]
+        if data.size == n_image_voxels:
+            return means[0], stds[0], n_voxels
+        return means, stds, n_voxels
+
+
+def get_atlas_geometry(atlas, persistent=True):
+    """
+    Return the geometry of an atlas, loaded once per process.
+
+    Args:
+        atlas (:obj: AtlasAbstract or str): An atlas or its name.
+        persistent (bool): If True, the voxel index of the atlas is kept in
+            the cache directory of Clinica (see get_cache_directory) and
+            shared between processes and runs.
+
+    Returns:
+        AtlasGeometry of the atlas.
+    """
+    import os
+    from clinica.utils.filemanip import get_cache_directory
+
+    if isinstance(atlas, str):
+        atlas = get_atlas(atlas)
+    name = atlas.get_name_atlas()
+    if name not in _atlas_registry:
+        cache_dir = os.path.join(get_cache_directory(), "atlases") if persistent else None
+        _atlas_registry[name] = AtlasGeometry(atlas, cache_dir)
+    return _atlas_registry[name]
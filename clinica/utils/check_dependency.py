@@ -7,16 +7,85 @@ This module contains utilities to check dependencies before running Clinica.
 These functions can check binaries, software (e.g. FreeSurfer) or toolboxes (e.g. SPM).
 """
 
+import threading
+
+# Versions of the software probed by Clinica (see get_cached_version)
+_version_cache = {'refresh': False, 'versions': None}
+_version_cache_lock = threading.Lock()
+
+
+def refresh_dependency_cache():
+    """Make the version probes ignore the cached versions (the cache is then updated)."""
+    _version_cache['refresh'] = True
+    _version_cache['versions'] = None
+
+
+def is_dependency_cache_refreshed():
+    return _version_cache['refresh']
+
+
+def get_dependency_cache_file():
+    from os.path import join
+    from clinica.utils.filemanip import get_cache_directory
+
+    return join(get_cache_directory(), 'dependency_versions.json')
+
+
+def get_cached_version(path, probe):
+    """
+    Get the version of a software, probed only when the given file changed.
+
+    Versions are stored in a user-level cache file (see get_dependency_cache_file) indexed by the path and the
+    modification time of the file (e.g. the binary of the software or its version file), so that expensive probes
+    (e.g. launching MATLAB) are not done again by each call of Clinica.
+
+    Args:
+        path (str): Path to the file identifying the installation of the software.
+        probe (callable): Function without argument returning the version of the software.
+
+    Returns:
+        Version returned by the probe.
+    """
+    import json
+    import os
+
+    path = os.path.realpath(path)
+    mtime = os.stat(path).st_mtime_ns if os.path.exists(path) else None
+
+    with _version_cache_lock:
+        if _version_cache['versions'] is None:
+            _version_cache['versions'] = {}
+            if not _version_cache['refresh'] and os.path.isfile(get_dependency_cache_file()):
+                try:
+                    with open(get_dependency_cache_file()) as f:
+                        _version_cache['versions'] = json.load(f)
+                except (OSError, ValueError):
+                    pass
+        cached = _version_cache['versions'].get(path)
+    if cached is not None and mtime is not None and cached['mtime'] == mtime:
+        return cached['version']
+
+    version = probe()
+    if mtime is not None:
+        with _version_cache_lock:
+            _version_cache['versions'][path] = {'mtime': mtime, 'version': version}
+            try:
+                os.makedirs(os.path.dirname(get_dependency_cache_file()), exist_ok=True)
+                tmp_file = '%s.%d.tmp' % (get_dependency_cache_file(), os.getpid())
+                with open(tmp_file, 'w') as f:
+                    json.dump(_version_cache['versions'], f, indent=4, sort_keys=True)
+                os.replace(tmp_file, get_dependency_cache_file())
+            except OSError:
+                # The cache is only an optimization: a read-only cache directory must not stop Clinica
+                pass
+    return version
+
 
 def is_binary_present(binary):
     """
     Check if a binary is present.
 
-    This function checks if the program is present. Do not use this function
-    with a binary GUI, it will open the GUI.
-
-    Taken from:
-    https://stackoverflow.com/questions/11210104/check-if-a-program-exists-from-a-python-script
+    The binary is searched in the PATH environment (it is not launched).
 
     Args:
         binary (str): Name of the program.
@@ -24,21 +93,9 @@ def is_binary_present(binary):
     Returns:
         True if the binary is present, False otherwise.
     """
-    import subprocess
-    import os
-    import sys
-    if sys.version_info[0] >= 3 and sys.version_info[1] >= 7:
-        import errno
-    else:
-        errno = os.errno
+    import shutil
 
-    try:
-        devnull = open(os.devnull)
-        subprocess.Popen([binary], stdout=devnull, stderr=devnull).communicate()
-    except OSError as e:
-        if e.errno == errno.ENOENT:
-            return False
-    return True
+    return shutil.which(binary) is not None
 
 
 def check_environment_variable(environment_variable, software_name):
@@ -134,15 +191,17 @@ def check_freesurfer(version_requirements=None):
 
 def check_fsl(version_requirements=None):
     """Check FSL software."""
+    from os.path import join
     import nipype.interfaces.fsl as fsl
     from colorama import Fore
     from clinica.utils.exceptions import ClinicaMissingDependencyError
     from clinica.utils.stream import cprint
 
-    check_environment_variable('FSLDIR', 'FSL')
+    fsl_dir = check_environment_variable('FSLDIR', 'FSL')
 
     try:
-        if fsl.Info.version().split(".") < ['5', '0', '5']:
+        fsl_version = get_cached_version(join(fsl_dir, 'etc', 'fslversion'), fsl.Info.version)
+        if fsl_version.split(".") < ['5', '0', '5']:
             raise ClinicaMissingDependencyError(
                 '%sFSL version must be greater than 5.0.5%s'
                 % (Fore.RED, Fore.RESET))
@@ -198,7 +257,7 @@ def check_spm(version_requirements=None):
     #             'PATH environment.' % binary)
 
 
-def check_matlab():
+def check_matlab(version_requirements=None):
     """Check Matlab toolbox."""
     from colorama import Fore
     from clinica.utils.exceptions import ClinicaMissingDependencyError
@@ -4,6 +4,90 @@
 """This module contains utilities for DWI handling."""
 
 
+def select_volumes(data, indices):
+    """
+    Select volumes of a 4D array along the t dimension.
+
+    When the indices form a contiguous increasing range, a view of the array
+    is returned (no copy of the data, and only the selected volumes are read
+    from a memory-mapped image). Otherwise, the volumes are copied once.
+
+    Args:
+        data (np.ndarray): 4D array (possibly memory-mapped).
+        indices (List[int]): Indices of the volumes to select.
+
+    Returns:
+        The 4D array of the selected volumes.
+    """
+    import numpy as np
+
+    indices = np.asarray(indices, dtype=int)
+    if len(indices) > 0 and np.array_equal(indices, np.arange(indices[0], indices[0] + len(indices))):
+        return data[..., indices[0]:indices[0] + len(indices)]
+    return data[..., indices]
+
+
+def save_volumes(data, reference_image, out_file):
+    """
+    Save volumes with the header and affine of a reference image.
+
+    Args:
+        data (np.ndarray): 3D or 4D array.
+        reference_image (nibabel image): Image whose header and affine are used.
+        out_file (str): Name of the output file.
+
+    Returns:
+        out_file (str): The output file.
+    """
+    import nibabel as nib
+
+    hdr = reference_image.header.copy()
+    hdr.set_data_shape(data.shape)
+    hdr.set_data_dtype(data.dtype)
+    nib.Nifti1Image(data, reference_image.affine, hdr).to_filename(out_file)
+    return out_file
+
+
+def concatenate_volumes(in_files, out_file=None):
+    """
+    Concatenate a list of 3D or 4D images in the t dimension.
+
+    Each input is memory-mapped when possible and copied only once in the
+    output array, which is written once (same result as fslmerge -t).
+
+    Args:
+        in_files (List[str]): Images to concatenate.
+        out_file (Optional[str]): Name of the output file
+            (Default: <first input>_merged.nii.gz).
+
+    Returns:
+        merged_file (str): The images merged.
+    """
+    import numpy as np
+    import nibabel as nib
+    import os.path as op
+    from clinica.utils.dwi import save_volumes
+
+    if out_file is None:
+        fname, ext = op.splitext(op.basename(in_files[0]))
+        if ext == ".gz":
+            fname, ext2 = op.splitext(fname)
+        out_file = op.abspath("%s_merged.nii.gz" % fname)
+
+    images = [nib.load(f) for f in in_files]
+    n_volumes = [im.shape[3] if len(im.shape) > 3 else 1 for im in images]
+    dtype = np.result_type(*[im.get_data_dtype() if im.dataobj.slope == 1 and im.dataobj.inter == 0
+                             else np.float32 for im in images])
+
+    merged = np.empty(images[0].shape[:3] + (sum(n_volumes),), dtype=dtype)
+    start = 0
+    for im, n in zip(images, n_volumes):
+        merged[..., start:start + n] = np.asanyarray(im.dataobj).reshape(im.shape[:3] + (n,))
+        start += n
+
+    return save_volumes(merged, images[0], out_file)
+
+
 def merge_volumes_tdim(in_file1, in_file2):
     """
     Merge 'in_file1' and 'in_file2' in the t dimension.
@@ -16,12 +100,9 @@ def merge_volumes_tdim(in_file1, in_file2):
         out_file (str): The two sets of volumes merged.
     """
     import os.path as op
-    import os
+    from clinica.utils.dwi import concatenate_volumes
 
-    out_file = op.abspath('merged_files.nii.gz')
-    cmd = 'fslmerge -t %s %s %s ' % (out_file, in_file1, in_file2)
-    os.system(cmd)
-    return out_file
+    return concatenate_volumes([in_file1, in_file2], op.abspath('merged_files.nii.gz'))
 
 
 def count_b0s(in_bval, low_bval=5.0):
@@ -69,16 +150,18 @@ def b0_average(in_file, out_file=None):
             ext = ext2 + ext
         out_file = op.abspath("%s_avg_b0%s" % (fname, ext))
 
-    imgs = np.array(nb.four_to_three(nb.load(in_file)))
-    b0s = [im.get_data().astype(np.float32)
-           for im in imgs]
-    b0 = np.average(np.array(b0s), axis=0)
+    img = nb.load(in_file)
+    data = np.asanyarray(img.dataobj)
+    if data.ndim == 4:
+        b0 = data.mean(axis=-1, dtype=np.float32)
+    else:
+        b0 = data.astype(np.float32)
 
-    hdr = imgs[0].get_header().copy()
+    hdr = img.header.copy()
     hdr.set_data_shape(b0.shape)
     hdr.set_xyzt_units('mm')
     hdr.set_data_dtype(np.float32)
-    nb.Nifti1Image(b0, imgs[0].get_affine(), hdr).to_filename(out_file)
+    nb.Nifti1Image(b0, img.affine, hdr).to_filename(out_file)
 
     return out_file
 
@@ -106,6 +189,7 @@ def b0_dwi_split(in_dwi, in_bval, in_bvec, low_bval=5.0):
     import nibabel as nib
     import os.path as op
     import warnings
+    from clinica.utils.dwi import save_volumes, select_volumes
 
     assert(op.isfile(in_dwi))
     assert(op.isfile(in_bval))
@@ -113,8 +197,7 @@ def b0_dwi_split(in_dwi, in_bval, in_bvec, low_bval=5.0):
     assert(low_bval >= 0)
 
     im = nib.load(in_dwi)
-    data = im.get_data()
-    hdr = im.get_header().copy()
+    data = np.asanyarray(im.dataobj)
     bvals = np.loadtxt(in_bval)
     bvecs = np.loadtxt(in_bvec)
 
@@ -131,24 +214,17 @@ def b0_dwi_split(in_dwi, in_bval, in_bvec, low_bval=5.0):
         fname_b0, ext2 = op.splitext(fname_b0)
         ext_b0 = ext2 + ext_b0
     out_b0 = op.abspath("%s_b0%s" % (fname_b0, ext_b0))
-    # out_b0 = op.abspath('b0.nii.gz')
-    b0data = data[..., lowbs]
-    hdr.set_data_shape(b0data.shape)
-    nib.Nifti1Image(b0data, im.get_affine(), hdr).to_filename(out_b0)
+    save_volumes(select_volumes(data, lowbs), im, out_b0)
 
     dwi_bvals = np.where(bvals > low_bval)[0]
     out_dwi = op.abspath('dwi.nii.gz')
-    dwi_data = data[..., dwi_bvals]
-    hdr.set_data_shape(dwi_data.shape)
-    nib.Nifti1Image(dwi_data, im.get_affine(), hdr).to_filename(out_dwi)
+    save_volumes(select_volumes(data, dwi_bvals), im, out_dwi)
 
     bvals_dwi = bvals[dwi_bvals]
     out_bvals = op.abspath('bvals')
     np.savetxt(out_bvals, bvals_dwi, fmt='%d', delimiter=' ')
 
-    bvecs_dwi = np.array([bvecs[0][dwi_bvals].tolist(),
-                          bvecs[1][dwi_bvals].tolist(),
-                          bvecs[2][dwi_bvals].tolist()])
+    bvecs_dwi = bvecs[:3, dwi_bvals]
     out_bvecs = op.abspath('bvecs')
     np.savetxt(out_bvecs, bvecs_dwi, fmt='%10.5f', delimiter=' ')
 
@@ -294,10 +370,10 @@ def hmc_split(in_file, in_bval, ref_num=0, lowbval=5.0):
     import numpy as np
     import nibabel as nib
     import os.path as op
+    from clinica.utils.dwi import save_volumes, select_volumes
 
     im = nib.load(in_file)
-    data = im.get_data()
-    hdr = im.get_header().copy()
+    data = np.asanyarray(im.dataobj)
     bval = np.loadtxt(in_bval)
 
     lowbs = np.where(bval <= lowbval)[0]
@@ -305,26 +381,15 @@ def hmc_split(in_file, in_bval, ref_num=0, lowbval=5.0):
     volid = ref_num
 
     out_ref = op.abspath('hmc_ref.nii.gz')
-    refdata = data[..., volid]
-    hdr.set_data_shape(refdata.shape)
-    nib.Nifti1Image(refdata, im.get_affine(), hdr).to_filename(out_ref)
-
-    if volid == 0:
-        data = data[..., 1:]
-        bval = bval[1:]
-    elif volid == (data.shape[-1] - 1):
-        data = data[..., :-1]
-        bval = bval[:-1]
-    else:
-        data = np.concatenate((data[..., :volid], data[..., (volid + 1):]),
-                              axis=3)
-        bval = np.hstack((bval[:volid], bval[(volid + 1):]))
+    save_volumes(data[..., volid], im, out_ref)
+
+    moving = np.delete(np.arange(data.shape[-1]), volid)
+    bval = bval[moving]
 
     out_mov = op.abspath('hmc_mov.nii.gz')
     out_bval = op.abspath('bval_split.txt')
 
-    hdr.set_data_shape(data.shape)
-    nib.Nifti1Image(data, im.get_affine(), hdr).to_filename(out_mov)
+    save_volumes(select_volumes(data, moving), im, out_mov)
     np.savetxt(out_bval, bval)
     return out_ref, out_mov, out_bval, volid
 
@@ -4,10 +4,9 @@
 def zip_nii(in_file, same_dir=False):
     from os import getcwd
     from os.path import abspath, join
-    import gzip
-    import shutil
     from nipype.utils.filemanip import split_filename
     from traits.trait_base import _Undefined
+    from clinica.utils.nifti_staging import get_gzip_options, gzip_file
 
     if (in_file is None) or isinstance(in_file, _Undefined):
         return None
@@ -27,16 +26,18 @@ def zip_nii(in_file, same_dir=False):
     else:
         out_file = abspath(join(getcwd(), base + ext + '.gz'))
 
-    with open(in_file, 'rb') as f_in, gzip.open(out_file, 'wb') as f_out:
-        shutil.copyfileobj(f_in, f_out)
-
-    return out_file
+    # Level of gzip and number of threads given by `clinica --gzip_level L --gzip_threads N`
+    level, n_threads = get_gzip_options()
+    return gzip_file(in_file, out_file, level, n_threads)
 
 
 def unzip_nii(in_file):
+    from os import getcwd
+    from os.path import abspath, join
     from nipype.utils.filemanip import split_filename
     from nipype.algorithms.misc import Gunzip
     from traits.trait_base import _Undefined
+    from clinica.utils.nifti_staging import stage_uncompressed
 
     if (in_file is None) or isinstance(in_file, _Undefined):
         return None
@@ -49,7 +50,10 @@ def unzip_nii(in_file):
     # Not compressed
     if ext[-3:].lower() != ".gz":
         return in_file
-    # Compressed
+    # Compressed, and decompressed once for all the nodes with `clinica --nifti_cache`
+    out_file = stage_uncompressed(in_file, abspath(join(getcwd(), base + ext[:-3])))
+    if out_file is not None:
+        return out_file
     gunzip = Gunzip(in_file=in_file)
     gunzip.run()
     return gunzip.aggregate_outputs().out_file
@@ -191,3 +195,17 @@ def read_participant_tsv(tsv_file):
 
     # Remove potential whitespace in participant_id or session_id
     return [sub.strip(' ') for sub in participants], [ses.strip(' ') for ses in sessions]
+
+
+def get_cache_directory():
+    """Return the user-level cache directory of Clinica (created if needed).
+
+    The directory can be set with the CLINICA_CACHE_DIR environment variable
+    (default: ~/.cache/clinica).
+    """
+    import os
+    from os.path import expanduser, join
+
+    cache_dir = os.environ.get('CLINICA_CACHE_DIR', join(expanduser('~'), '.cache', 'clinica'))
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
@@ -1,5 +1,100 @@
 # coding: utf8
 
+"""
+This module contains utilities to prepare phase difference fieldmaps.
+
+The first functions work on NumPy arrays (phase scaling, conversion in rad/s,
+masking, demeaning, smoothing) so that the steps of the preparation of a
+fieldmap can be chained in memory. The other functions are used by the nodes
+of the pipelines: they load their inputs with nibabel and only write their
+final image (float32).
+"""
+
+
+def phase_to_radians(data):
+    """Scale a SIEMENS phase image (e.g. [0, 4095]) in [-pi, pi]."""
+    import math
+    import numpy as np
+
+    data = np.asarray(data, dtype=np.float32)
+    imin = data.min()
+    imax = data.max()
+    return (2.0 * math.pi * (data - imin) / (imax - imin) - math.pi).astype(np.float32)
+
+
+def radians_to_radsec(data, delta_te):
+    """Convert a phase difference (in radians) in a fieldmap (in rad/s). (delta_te should be in seconds)"""
+    import numpy as np
+
+    return np.asarray(data, dtype=np.float32) * np.float32(1.0 / delta_te)
+
+
+def mask_fmap(data, mask):
+    """Set the fieldmap to 0 outside of the mask."""
+    import numpy as np
+
+    return np.where(np.asarray(mask) > 0, data, 0).astype(np.float32)
+
+
+def demean_fmap(data, mask=None):
+    """Subtract the median of the fieldmap in the mask (whole image if mask is None) to the voxels of the mask."""
+    import numpy as np
+
+    data = np.array(data, dtype=np.float32)
+    mask = np.ones(data.shape, dtype=bool) if mask is None else np.asarray(mask) > 0
+    data[mask] -= np.median(data[mask])
+    return data
+
+
+def smooth_fmap(data, zooms, sigma, mask=None):
+    """
+    Smooth the fieldmap with a 3D Gaussian kernel.
+
+    Args:
+        data (np.ndarray): Fieldmap.
+        zooms (tuple): Voxel sizes (in mm).
+        sigma (float): Standard deviation of the Gaussian kernel (in mm,
+            as the smooth3d option of FUGUE).
+        mask (Optional[np.ndarray]): Mask of the fieldmap. The smoothing is
+            normalized inside the mask (voxels outside of the mask are
+            ignored) and the fieldmap is set to 0 outside of the mask.
+
+    Returns:
+        Smoothed fieldmap.
+    """
+    import numpy as np
+    from scipy.ndimage import gaussian_filter
+
+    sigma_voxels = [sigma / z for z in zooms[:3]]
+    data = np.asarray(data, dtype=np.float32)
+    if mask is None:
+        return gaussian_filter(data, sigma_voxels, mode='nearest')
+
+    mask = np.asarray(mask) > 0
+    weights = gaussian_filter(mask.astype(np.float32), sigma_voxels, mode='constant')
+    smoothed = gaussian_filter(np.where(mask, data, 0).astype(np.float32), sigma_voxels, mode='constant')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(mask, smoothed / weights, 0).astype(np.float32)
+
+
+def _get_out_file(in_file, suffix):
+    import os.path as op
+
+    fname, ext = op.splitext(op.basename(in_file))
+    if ext == ".gz":
+        fname, _ = op.splitext(fname)
+    return op.abspath("%s_%s.nii.gz" % (fname, suffix))
+
+
+def _save_float32(data, ref_img, out_file):
+    import nibabel as nb
+    import numpy as np
+
+    header = ref_img.header.copy()
+    header.set_data_dtype(np.float32)
+    nb.Nifti1Image(np.asarray(data, dtype=np.float32), ref_img.affine, header).to_filename(out_file)
+    return out_file
+
 
 def convert_phase_in_radians(in_file, out_file=None):
     """
@@ -9,25 +104,64 @@ def convert_phase_in_radians(in_file, out_file=None):
     import nibabel as nb
     import numpy as np
     import os.path as op
-    import os
 
     assert(op.isfile(in_file))
 
+    if out_file is None:
+        out_file = op.abspath('phase_in_rad.nii.gz')
+
     img = nb.load(in_file)
-    imin = np.amin(img.get_data())
-    imax = np.amax(img.get_data())
+    data = np.asanyarray(img.dataobj).astype(np.float32)
+    data *= np.float32(2.0 * math.pi / data.max())
 
+    return _save_float32(data, img, out_file)
+
+
+def convert_siemens_phase_in_radians(in_file, out_file=None):
+    """
+    Convert SIEMENS phase image(s) in radians.
+
+    Args:
+        in_file (str or List[str]): Phase difference image, 4D image with
+            two phase volumes or list of two phase images (the difference of
+            the two phases is computed).
+        out_file (Optional[str]): Filename (default: <in_file>_rads.nii.gz).
+
+    Returns:
+        Phase (difference) image scaled in [-pi, pi].
+    """
+    import nibabel as nb
+    import numpy as np
+    from clinica.utils.fmap import phase_to_radians, _get_out_file, _save_float32
+
+    in_files = np.atleast_1d(in_file).tolist()
     if out_file is None:
-        out_file = op.abspath('phase_in_rad.nii.gz')
+        out_file = _get_out_file(in_files[0], 'rads')
 
-    cmd = 'fslmaths %s -mul %s -div %s %s -odt float' \
-          % (in_file, 2.0*math.pi, imax, out_file)
-    os.system(cmd)
+    img = nb.load(in_files[0])
+    data = np.asanyarray(img.dataobj).astype(np.float32)
+    if len(in_files) == 2:
+        data = np.asanyarray(nb.load(in_files[1]).dataobj).astype(np.float32) - data
+    elif data.ndim == 4 and data.shape[-1] == 2:
+        data = np.squeeze(data[..., 1] - data[..., 0])
 
-    data = (img2.get_data().astype(np.float32)-img1.get_data().astype(np.float32)) * (1.0/delta_te)
-    nb.Nifti1Image(data, img.get_affine(), img.get_header()).to_filename(out_file)
+    return _save_float32(phase_to_radians(data), img, out_file)
 
-    return out_file
+
+def convert_radians_in_radsec(in_file, delta_te, out_file=None):
+    """
+    Convert (unwrapped) phase difference image in a fieldmap in rad/s.
+    (delta_te should be in seconds)
+    """
+    import nibabel as nb
+    import numpy as np
+    from clinica.utils.fmap import radians_to_radsec, _get_out_file, _save_float32
+
+    if out_file is None:
+        out_file = _get_out_file(in_file, 'radsec')
+
+    img = nb.load(in_file)
+    return _save_float32(radians_to_radsec(np.asanyarray(img.dataobj), delta_te), img, out_file)
 
 
 def create_phase_in_radsec(in_phase1, in_phase2, delta_te, out_file=None):
@@ -38,15 +172,57 @@ def create_phase_in_radsec(in_phase1, in_phase2, delta_te, out_file=None):
     import numpy as np
     import nibabel as nb
     import os.path as op
+    from clinica.utils.fmap import radians_to_radsec, _save_float32
 
     if out_file is None:
         out_file = op.abspath('fmap_radsec.nii.gz')
 
     img1 = nb.load(in_phase1)
-    img2 = nb.load(in_phase2)
-    data = (img2.get_data().astype(np.float32)-img1.get_data().astype(np.float32)) * (1.0/delta_te)
-    nb.Nifti1Image(data, img1.get_affine(), img1.get_header()).to_filename(out_file)
-    return out_file
+    data = (np.asanyarray(nb.load(in_phase2).dataobj).astype(np.float32)
+            - np.asanyarray(img1.dataobj).astype(np.float32))
+    return _save_float32(radians_to_radsec(data, delta_te), img1, out_file)
+
+
+def demean_fmap_image(in_file, in_mask=None, out_file=None):
+    """
+    Subtract the median of the fieldmap in the mask.
+
+    Args:
+        in_file (str): Fieldmap image.
+        in_mask (Optional[str]): Mask image.
+        out_file (Optional[str]): Filename (default: <in_file>_demean.nii.gz).
+
+    Returns:
+        Demeaned fieldmap image.
+    """
+    import nibabel as nb
+    import numpy as np
+    from clinica.utils.fmap import demean_fmap, _get_out_file, _save_float32
+
+    if out_file is None:
+        out_file = _get_out_file(in_file, 'demean')
+
+    img = nb.load(in_file)
+    mask = None if in_mask is None else np.asanyarray(nb.load(in_mask).dataobj)
+    return _save_float32(demean_fmap(np.asanyarray(img.dataobj), mask), img, out_file)
+
+
+def add_empty_volume(in_file, out_file=None):
+    """
+    Add an empty volume after the fieldmap (4D image expected by FUGUE
+    with the asym_se_time option).
+    """
+    import nibabel as nb
+    import numpy as np
+    from clinica.utils.fmap import _get_out_file, _save_float32
+
+    if out_file is None:
+        out_file = _get_out_file(in_file, '4D')
+
+    img = nb.load(in_file)
+    data = np.zeros(img.shape[:3] + (2,), dtype=np.float32)
+    data[..., 0] = np.asanyarray(img.dataobj).reshape(img.shape[:3])
+    return _save_float32(data, img, out_file)
 
 
 def resample_fmap_to_b0(in_fmap, in_b0, out_file=None):
@@ -84,3 +260,59 @@ def resample_fmap_to_b0(in_fmap, in_b0, out_file=None):
     nibabel.nifti1.save(resampled_fmap, out_resampled_fmap)
 
     return out_resampled_fmap
+
+
+def prepare_fmap(in_phase, delta_te, in_b0=None, in_mask=None, smooth3d=None, out_file=None):
+    """
+    Prepare a fieldmap from an unwrapped phase difference image in one step.
+
+    The phase difference is converted in rad/s, masked, smoothed and
+    resampled onto the b0 image in memory: only the final fieldmap is
+    written.
+
+    Warnings:
+        The fieldmap should already be aligned on the b0.
+
+    Args:
+        in_phase (str): Unwrapped phase difference image (in radians).
+        delta_te (float): Difference of echo times (in seconds).
+        in_b0 (Optional[str]): B0 image. If given, the fieldmap is resampled
+            onto the b0 image.
+        in_mask (Optional[str]): Mask image in the space of the phase image.
+        smooth3d (Optional[float]): Standard deviation (in mm) of the 3D
+            Gaussian smoothing of the fieldmap.
+        out_file (Optional[str]): Filename (default:
+            <in_phase>_radsec.nii.gz, or <in_phase>_radsec_space-b0.nii.gz
+            if in_b0 is given).
+
+    Returns:
+        Fieldmap image (in rad/s).
+    """
+    import nibabel as nb
+    import numpy as np
+    from clinica.utils.fmap import (radians_to_radsec, mask_fmap, smooth_fmap,
+                                    _get_out_file, _save_float32)
+
+    if out_file is None:
+        out_file = _get_out_file(in_phase, 'radsec' if in_b0 is None else 'radsec_space-b0')
+
+    img = nb.load(in_phase)
+    fmap = radians_to_radsec(np.asanyarray(img.dataobj), delta_te)
+    mask = None
+    if in_mask is not None:
+        mask = np.asanyarray(nb.load(in_mask).dataobj)
+        fmap = mask_fmap(fmap, mask)
+    if smooth3d:
+        fmap = smooth_fmap(fmap, img.header.get_zooms(), smooth3d, mask)
+
+    if in_b0 is None:
+        return _save_float32(fmap, img, out_file)
+
+    from nilearn.image import resample_to_img
+
+    header = img.header.copy()
+    header.set_data_dtype(np.float32)
+    resampled_fmap = resample_to_img(
+        source_img=nb.Nifti1Image(fmap, img.affine, header), target_img=in_b0,
+        interpolation='continuous')
+    return _save_float32(resampled_fmap.get_fdata(dtype=np.float32), resampled_fmap, out_file)
@@ -56,6 +56,13 @@ def get_secondary_stats(stats_filename, info_type):
             the brain, associated values are the corresponding
             volume/thickness/area depending on the input info type
     """
+    with open(stats_filename, 'r') as stats_file:
+        stats = stats_file.read()
+    return parse_secondary_stats(stats.splitlines(), info_type)
+
+
+def parse_secondary_stats(stats_line_list, info_type):
+    """Extract the 'secondary' statistical info from the lines of a .stats file (see get_secondary_stats)."""
     # initialise structure containing the secondary statistical info
     secondary_stats_dict = dict()
 
@@ -76,10 +83,7 @@ def get_secondary_stats(stats_filename, info_type):
         info_keyword_dict['area'] = ['area', 'Area']
         info_keyword_dict['thickness'] = ['thickness', 'Thickness']
 
-        # read stats file line by line and only keep relevant lines
-        with open(stats_filename, 'r') as stats_file:
-            stats = stats_file.read()
-        stats_line_list = stats.splitlines()
+        # only keep relevant lines
         for stats_line in stats_line_list:
             startswith_condition = stats_line.startswith('# Measure')
             endswith_condition = stats_line.endswith(endline_dict[info_type])
@@ -96,56 +100,52 @@ def get_secondary_stats(stats_filename, info_type):
     return secondary_stats_dict
 
 
-def generate_regional_measures(
-        segmentation_path, subject_id, output_dir=None):
+def read_stats_file(stats_filename, columns):
+    """Read the table and all the 'secondary' statistical info of a .stats file at once.
+
+    Args:
+        stats_filename (string): path to the .stats file
+        columns (list of string): names of the columns of the table
+
+    Returns:
+        table (dictionary of list of string): keys are the columns of the
+            table, associated values are the column values
+        secondary_stats (dictionary of dictionary): keys are the info types
+            ('volume', 'thickness', 'area' and 'meancurv'), associated values
+            are the dictionaries returned by get_secondary_stats
     """
-    Read stats files located in
-    <segmentation_path>/<subject_id>/stats/*.stats
-    and generate TSV files in <segmentation_path>/regional_measures
-    folder.
+    with open(stats_filename, 'r') as stats_file:
+        stats_line_list = stats_file.read().splitlines()
+
+    rows = [line.split() for line in stats_line_list if line.strip() and not line.startswith('#')]
+    table = {column: [row[i] for row in rows] for i, column in enumerate(columns)}
+    secondary_stats = {info: parse_secondary_stats(stats_line_list, info)
+                       for info in ('volume', 'thickness', 'area', 'meancurv')}
+    return table, secondary_stats
+
+
+def read_regional_measures(stats_folder):
+    """Read all the regional measures of a FreeSurfer segmentation, each .stats file being read once.
 
     Note: the .stats files contain both 1) a table with statistical
     information (e.g., structure volume) and 2) 'secondary' statistical
     information with all lines starting with the sentence '# Measure'.
-    The .tsv files return the relevant statistical information from both
+    The measures gather the relevant statistical information from both
     sources.
 
     Args:
-        segmentation_path (string): Path to the FreeSurfer segmentation.
-        subject_id (string): Subject ID in the form sub-CLNC01_ses-M00, sub-CLNC01_long-M00M18 or
-            sub-CLNC01_ses-M00.long.sub-CLNC01_long-M00M18
-        output_dir (string): folder where the .tsv stats files will be
-            stored. Will be [path_segmentation]/regional_measures if no
-            dir is provided by the user
+        stats_folder (string): path to the stats/ folder of the FreeSurfer segmentation
+
+    Returns:
+        measures (dictionary of tuple): keys are the suffixes of the TSV
+            files of the measures (e.g. 'parcellation-desikan_volume'),
+            associated values are (list of region names, info type, list
+            of values)
     """
     import os
-    import errno
-    import pandas
-    from clinica.utils.freesurfer import write_tsv_file
 
-    image_id = extract_image_id_from_longitudinal_segmentation(subject_id)
-    prefix = image_id.participant_id
-    if image_id.session_id:
-        prefix = prefix + '_' + image_id.session_id
-    if image_id.long_id:
-        prefix = prefix + '_' + image_id.long_id
-
-    stats_folder = os.path.join(os.path.expanduser(segmentation_path), subject_id, 'stats')
-
-    if not os.path.isdir(stats_folder):
-        raise IOError("Image %s does not contain FreeSurfer segmentation" % prefix.replace('_', ' | '))
-
-    if not output_dir:
-        output_dir = os.path.join(segmentation_path, 'regional_measures')
-    try:
-        os.makedirs(output_dir)
-    except OSError as exception:
-        # if dest_dir exists, go on, if its other error, raise
-        if exception.errno != errno.EEXIST:
-            raise
+    measures = dict()
 
-    # Generate TSV files for parcellation files
-    #
     # Columns in ?h.BA.stats, ?h.aparc.stats or ?h.aparc.a2009s.stats file
     columns_parcellation = [
         'StructName', 'NumVert', 'SurfArea', 'GrayVol', 'ThickAvg', 'ThickStd',
@@ -167,65 +167,210 @@ def generate_regional_measures(
         'meancurv': 'MeanCurv'
     }
     for atlas in ('desikan', 'destrieux', 'ba'):
-        stats_filename_dict = dict()
-        df_dict = dict()
+        table_dict = dict()
+        secondary_stats_dict = dict()
         # read both left and right .stats files
         for hemi in ('left', 'right'):
-            stats_filename_dict[hemi] = os.path.join(
+            stats_filename = os.path.join(
                 stats_folder,
                 '{0}.{1}.stats'.format(hemi_dict[hemi], atlas_dict[atlas]))
-            df_dict[hemi] = pandas.read_csv(
-                stats_filename_dict[hemi],
-                names=columns_parcellation,
-                comment='#', header=None, delimiter='\s+', dtype=str)
-        # generate .tsv from 1) the table in .stats file and 2) the
+            table_dict[hemi], secondary_stats_dict[hemi] = read_stats_file(stats_filename, columns_parcellation)
+        # measures from 1) the table in .stats file and 2) the
         # secondary (commented out) information common to both 'left'
         # and 'right' .stats file
         for info in ('volume', 'thickness', 'area', 'meancurv'):
             # Secondary information (common to 'left' and 'right')
-            secondary_stats_dict = get_secondary_stats(stats_filename_dict['left'], info)
+            secondary_stats = secondary_stats_dict['left'][info]
             # Join primary and secondary information
-            key_list = (list('lh_'+df_dict['left']['StructName']) +
-                        list('rh_'+df_dict['right']['StructName']) +
-                        list(secondary_stats_dict.keys()))
+            key_list = (['lh_' + name for name in table_dict['left']['StructName']] +
+                        ['rh_' + name for name in table_dict['right']['StructName']] +
+                        list(secondary_stats.keys()))
             col_name = info_dict[info]
-            value_list = (list(df_dict['left'][col_name]) +
-                          list(df_dict['right'][col_name]) +
-                          list(secondary_stats_dict.values()))
-            # Write .tsv
-            write_tsv_file(os.path.join(output_dir, '{0}_parcellation-{1}_{2}.tsv'.format(prefix, atlas, info)),
-                           key_list, info, value_list)
-
-    # Generate TSV files for segmentation files
-    #
+            value_list = (table_dict['left'][col_name] +
+                          table_dict['right'][col_name] +
+                          list(secondary_stats.values()))
+            measures['parcellation-{0}_{1}'.format(atlas, info)] = (key_list, info, value_list)
+
     # Columns in aseg.stats or wmparc.stats file
     columns_segmentation = [
         'Index', 'SegId', 'NVoxels', 'Volume_mm3', 'StructName', 'normMean',
         'normStdDev', 'normMin', 'normMax', 'normRange']
 
-    # Parsing aseg.stats
-    stats_filename = os.path.join(stats_folder, 'aseg.stats')
-    df = pandas.read_csv(
-        stats_filename,
-        comment='#', header=None, delimiter='\s+', dtype=str,
-        names=columns_segmentation)
-    secondary_stats_dict = get_secondary_stats(stats_filename, 'volume')
-    key_list = list(df['StructName'])+list(secondary_stats_dict.keys())
-    value_list = list(df['Volume_mm3'])+list(secondary_stats_dict.values())
-    write_tsv_file(os.path.join(output_dir, prefix + '_segmentationVolumes.tsv'),
-                   key_list, 'volume', value_list)
-
-    # Parsing wmparc.stats
-    stats_filename = os.path.join(stats_folder, 'wmparc.stats')
-    df = pandas.read_csv(
-        stats_filename,
-        comment='#', header=None, delimiter='\s+', dtype=str,
-        names=columns_segmentation)
-    secondary_stats_dict = get_secondary_stats(stats_filename, 'volume')
-    key_list = list(df['StructName'])+list(secondary_stats_dict.keys())
-    value_list = list(df['Volume_mm3'])+list(secondary_stats_dict.values())
-    write_tsv_file(os.path.join(output_dir, prefix + '_parcellation-wm_volume.tsv'),
-                   key_list, 'volume', value_list)
+    for stats_name, suffix in (('aseg', 'segmentationVolumes'), ('wmparc', 'parcellation-wm_volume')):
+        table, secondary_stats_dict = read_stats_file(os.path.join(stats_folder, stats_name + '.stats'),
+                                                      columns_segmentation)
+        secondary_stats = secondary_stats_dict['volume']
+        key_list = table['StructName'] + list(secondary_stats.keys())
+        value_list = table['Volume_mm3'] + list(secondary_stats.values())
+        measures[suffix] = (key_list, 'volume', value_list)
+
+    return measures
+
+
+def generate_regional_measures(
+        segmentation_path, subject_id, output_dir=None):
+    """
+    Read stats files located in
+    <segmentation_path>/<subject_id>/stats/*.stats
+    and generate TSV files in <segmentation_path>/regional_measures
+    folder.
+
+    Note: the .stats files contain both 1) a table with statistical
+    information (e.g., structure volume) and 2) 'secondary' statistical
+    information with all lines starting with the sentence '# Measure'.
+    The .tsv files return the relevant statistical information from both
+    sources (see read_regional_measures).
+
+    Args:
+        segmentation_path (string): Path to the FreeSurfer segmentation.
+        subject_id (string): Subject ID in the form sub-CLNC01_ses-M00, sub-CLNC01_long-M00M18 or
+            sub-CLNC01_ses-M00.long.sub-CLNC01_long-M00M18
+        output_dir (string): folder where the .tsv stats files will be
+            stored. Will be [path_segmentation]/regional_measures if no
+            dir is provided by the user
+    """
+    import os
+    import errno
+    from clinica.utils.freesurfer import write_tsv_file
+
+    prefix = get_regional_measures_prefix(subject_id)
+
+    stats_folder = os.path.join(os.path.expanduser(segmentation_path), subject_id, 'stats')
+
+    if not os.path.isdir(stats_folder):
+        raise IOError("Image %s does not contain FreeSurfer segmentation" % prefix.replace('_', ' | '))
+
+    if not output_dir:
+        output_dir = os.path.join(segmentation_path, 'regional_measures')
+    try:
+        os.makedirs(output_dir)
+    except OSError as exception:
+        # if dest_dir exists, go on, if its other error, raise
+        if exception.errno != errno.EEXIST:
+            raise
+
+    # Generate TSV files for parcellation and segmentation files
+    for suffix, (key_list, info, value_list) in read_regional_measures(stats_folder).items():
+        write_tsv_file(os.path.join(output_dir, '{0}_{1}.tsv'.format(prefix, suffix)),
+                       key_list, info, value_list)
+
+
+def get_regional_measures_prefix(subject_id):
+    """Return the prefix of the TSV files of the regional measures of a FreeSurfer subject ID (e.g.
+    sub-CLNC01_ses-M00_long-M00M18 for sub-CLNC01_ses-M00.long.sub-CLNC01_long-M00M18)."""
+    image_id = extract_image_id_from_longitudinal_segmentation(subject_id)
+    prefix = image_id.participant_id
+    if image_id.session_id:
+        prefix = prefix + '_' + image_id.session_id
+    if image_id.long_id:
+        prefix = prefix + '_' + image_id.long_id
+    return prefix
+
+
+def find_freesurfer_segmentations(caps_directory):
+    """Return the stats/ folders of the cross-sectional and longitudinal FreeSurfer segmentations of a CAPS
+    directory.
+
+    Returns:
+        segmentations (dictionary of string): keys are the FreeSurfer
+            subject IDs (e.g. sub-CLNC01_ses-M00 or
+            sub-CLNC01_ses-M00.long.sub-CLNC01_long-M00M18), associated
+            values are the paths to their stats/ folder
+    """
+    import os
+    from glob import glob
+
+    patterns = [
+        os.path.join('t1', 'freesurfer_cross_sectional', 'sub-*_ses-*', 'stats'),
+        os.path.join('t1', 'long-*', 'freesurfer_longitudinal', 'sub-*_ses-*.long.sub-*_long-*', 'stats'),
+    ]
+    segmentations = dict()
+    for pattern in patterns:
+        for stats_folder in glob(os.path.join(os.path.expanduser(caps_directory), 'subjects', 'sub-*', 'ses-*',
+                                              pattern)):
+            segmentations[os.path.basename(os.path.dirname(stats_folder))] = stats_folder
+    return segmentations
+
+
+def get_stats_signature(stats_folder):
+    """Return the names, sizes and modification times of the .stats files of a stats/ folder."""
+    import os
+
+    return sorted((entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+                  for entry in os.scandir(stats_folder) if entry.name.endswith('.stats'))
+
+
+def compile_regional_measures(caps_directory, output_dir, n_procs=None):
+    """Compile the regional measures of all the FreeSurfer segmentations of a CAPS directory into group tables.
+
+    One TSV file is written in `output_dir` per measure (e.g.
+    parcellation-desikan_volume.tsv), with one row per image (participant_id,
+    session_id and long_id columns) and one column per region. The .stats
+    files are read once per image, in parallel, and the measures are cached
+    in `output_dir`: when the tables are compiled again (e.g. once new
+    subjects have been processed), only the new or modified segmentations
+    are read.
+
+    Args:
+        caps_directory (string): Path to the CAPS directory.
+        output_dir (string): Folder where the group tables are written.
+        n_procs (int): Number of processes reading the .stats files
+            (default: number of CPUs).
+
+    Returns:
+        List of the TSV files written.
+    """
+    import os
+    import pickle
+    from concurrent.futures import ProcessPoolExecutor
+    import pandas
+    from colorama import Fore
+    from clinica.utils.stream import cprint
+
+    os.makedirs(output_dir, exist_ok=True)
+    cache_file = os.path.join(output_dir, 'regional_measures_cache.pkl')
+    cache = dict()
+    if os.path.isfile(cache_file):
+        with open(cache_file, 'rb') as f:
+            cache = pickle.load(f)
+
+    # Segmentations which are new or whose .stats files were modified since the last compilation
+    segmentations = find_freesurfer_segmentations(caps_directory)
+    signatures = {subject_id: get_stats_signature(stats_folder) for subject_id, stats_folder in segmentations.items()}
+    to_read = sorted(subject_id for subject_id in segmentations
+                     if subject_id not in cache or cache[subject_id][0] != signatures[subject_id])
+    cache = {subject_id: cache[subject_id] for subject_id in segmentations if subject_id not in to_read}
+
+    with ProcessPoolExecutor(max_workers=n_procs) as executor:
+        futures = {subject_id: executor.submit(read_regional_measures, segmentations[subject_id])
+                   for subject_id in to_read}
+    for subject_id, future in futures.items():
+        try:
+            cache[subject_id] = (signatures[subject_id], future.result())
+        except (IOError, OSError, IndexError) as e:
+            cprint('%s%s: regional measures could not be read (%s).%s'
+                   % (Fore.YELLOW, subject_id.replace('_', ' | '), e, Fore.RESET))
+
+    with open(cache_file + '.tmp', 'wb') as f:
+        pickle.dump(cache, f)
+    os.replace(cache_file + '.tmp', cache_file)
+
+    # Wide tables (images x regions)
+    rows = dict()
+    for subject_id in sorted(cache):
+        image_id = extract_image_id_from_longitudinal_segmentation(subject_id)
+        for suffix, (key_list, _, value_list) in cache[subject_id][1].items():
+            row = {'participant_id': image_id.participant_id, 'session_id': image_id.session_id,
+                   'long_id': image_id.long_id}
+            row.update(zip(key_list, (float(value) for value in value_list)))
+            rows.setdefault(suffix, []).append(row)
+
+    tsv_files = []
+    for suffix, suffix_rows in rows.items():
+        tsv_file = os.path.join(output_dir, suffix + '.tsv')
+        pandas.DataFrame(suffix_rows).to_csv(tsv_file, sep='\t', index=False, encoding='utf-8', na_rep='n/a')
+        tsv_files.append(tsv_file)
+    return tsv_files
 
 
 def write_tsv_file(out_filename, name_list, scalar_name, scalar_list):
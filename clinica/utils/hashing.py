@@ -0,0 +1,189 @@
+# coding: utf8
+
+"""This module contains a fast hashing layer for the content hash method of Nipype.
+
+With the 'content' hash method, Nipype computes the MD5 digest of every input file of every node each time a
+workflow is run or resumed. This module replaces this digest by a fast hash which is stored in a persistent cache
+indexed by (path, inode, size, modification time): files which did not change since the last run are not read again.
+
+The replacement of the hash function of Nipype only applies to the processes forked from the process enabling it:
+the MultiProc plugin must use the 'fork' start method (see check_hash_method_context).
+"""
+
+import hashlib
+
+HASH_METHODS = ['content', 'cached', 'sampled']
+
+# Hashing of sampled blocks is used for files bigger than SAMPLED_BLOCKS * SAMPLED_BLOCK_SIZE
+SAMPLED_BLOCKS = 64
+SAMPLED_BLOCK_SIZE = 1024 * 1024
+
+_state = {'original_hash_infile': None, 'sampled': False, 'cache_file': None, 'connection': None, 'pid': None}
+
+
+def new_hasher():
+    """Return a fast hash object (xxhash if installed, BLAKE2 otherwise)."""
+    try:
+        import xxhash
+        return xxhash.xxh3_128()
+    except (ImportError, AttributeError):
+        return hashlib.blake2b(digest_size=16)
+
+
+def fast_hash_file(filename, sampled=False, chunk_len=SAMPLED_BLOCK_SIZE):
+    """Compute a fast (non-cryptographic) digest of a file.
+
+    Args:
+        filename (str): Path to the file.
+        sampled (bool): If True, only SAMPLED_BLOCKS blocks evenly spaced in the file (including the first
+            and the last ones) are hashed for large files, together with the size of the file.
+        chunk_len (int): Size of the blocks read.
+
+    Returns:
+        Hexadecimal digest of the file.
+    """
+    import os
+
+    size = os.path.getsize(filename)
+    hasher = new_hasher()
+    hasher.update(str(size).encode())
+    with open(filename, 'rb') as fp:
+        if sampled and size > SAMPLED_BLOCKS * chunk_len:
+            for i in range(SAMPLED_BLOCKS):
+                # The last block ends at the end of the file
+                fp.seek(i * (size - chunk_len) // (SAMPLED_BLOCKS - 1))
+                hasher.update(fp.read(chunk_len))
+        else:
+            for data in iter(lambda: fp.read(chunk_len), b''):
+                hasher.update(data)
+    return hasher.hexdigest()
+
+
+def get_connection():
+    """Return the connection to the digest cache of the current process."""
+    import os
+    import sqlite3
+
+    # A SQLite connection cannot be shared with the processes forked by the MultiProc plugin
+    if _state['connection'] is None or _state['pid'] != os.getpid():
+        connection = sqlite3.connect(_state['cache_file'], timeout=60, isolation_level=None)
+        connection.execute('CREATE TABLE IF NOT EXISTS digests (path TEXT, method TEXT, inode INTEGER, '
+                           'size INTEGER, mtime INTEGER, digest TEXT, PRIMARY KEY (path, method))')
+        _state['connection'] = connection
+        _state['pid'] = os.getpid()
+    return _state['connection']
+
+
+def cached_hash_file(filename, sampled=False):
+    """Return the fast digest of a file, read from the cache if the file did not change.
+
+    Args:
+        filename (str): Path to the file.
+        sampled (bool): See fast_hash_file.
+
+    Returns:
+        Hexadecimal digest of the file.
+    """
+    import os
+    import sqlite3
+
+    path = os.path.realpath(filename)
+    stat = os.stat(path)
+    key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    method = 'sampled' if sampled else 'cached'
+
+    try:
+        row = get_connection().execute('SELECT inode, size, mtime, digest FROM digests WHERE path=? AND method=?',
+                                       (path, method)).fetchone()
+    except sqlite3.Error:
+        row = None
+    if row is not None and tuple(row[:3]) == key:
+        return row[3]
+
+    digest = fast_hash_file(path, sampled=sampled)
+    try:
+        get_connection().execute('INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?, ?)',
+                                 (path, method) + key + (digest,))
+    except sqlite3.Error:
+        # The cache is only an optimization: a locked or read-only database must not stop the pipeline
+        pass
+    return digest
+
+
+def hash_infile(afile, chunk_len=8192, crypto=hashlib.md5, raise_notfound=False):
+    """Replacement of nipype.utils.filemanip.hash_infile using the digest cache.
+
+    Digests requested with another cryptographic function than MD5 (e.g. SHA-512 for provenance) are still
+    computed by Nipype.
+    """
+    import os
+
+    if crypto is not hashlib.md5:
+        return _state['original_hash_infile'](afile, chunk_len=chunk_len, crypto=crypto,
+                                              raise_notfound=raise_notfound)
+    if not os.path.isfile(afile):
+        if raise_notfound:
+            raise RuntimeError('File "%s" not found.' % afile)
+        return None
+    return cached_hash_file(afile, sampled=_state['sampled'])
+
+
+def enable_cached_hashing(hash_method='cached', cache_file=None):
+    """Make Nipype use the cached fast hashing for the 'content' hash method.
+
+    Args:
+        hash_method (str): 'content' (Nipype default: MD5 of the whole file, nothing is changed),
+            'cached' (fast hash of the whole file, cached) or 'sampled' (fast hash of sampled blocks, cached).
+        cache_file (Optional[str]): SQLite file storing the digests
+            (default: file_digests.sqlite in the Clinica cache directory).
+    """
+    from os.path import join
+    from nipype import config
+    import nipype.utils.filemanip
+    import nipype.interfaces.base.specs
+    import nipype.interfaces.base.support
+    from clinica.utils.filemanip import get_cache_directory
+
+    if hash_method not in HASH_METHODS:
+        raise ValueError('Unknown hash method %s (available: %s).' % (hash_method, ', '.join(HASH_METHODS)))
+    if hash_method == 'content':
+        return
+
+    if _state['original_hash_infile'] is None:
+        _state['original_hash_infile'] = nipype.utils.filemanip.hash_infile
+    _state['sampled'] = (hash_method == 'sampled')
+    _state['cache_file'] = cache_file or join(get_cache_directory(), 'file_digests.sqlite')
+    _state['connection'] = None
+    config.set('execution', 'hash_method', 'content')
+
+    # hash_infile is imported by name in the Nipype modules computing the hash of the inputs
+    for module in [nipype.utils.filemanip, nipype.interfaces.base.specs, nipype.interfaces.base.support]:
+        if hasattr(module, 'hash_infile'):
+            module.hash_infile = hash_infile
+
+
+def is_cached_hashing_enabled():
+    return _state['original_hash_infile'] is not None
+
+
+def check_hash_method_context(plugin, plugin_args=None):
+    """Check that the workers of the MultiProc plugin use the cached hashing enabled in this process.
+
+    The workers started with the 'spawn' or 'forkserver' methods (e.g. default on macOS, or `mp_context` in the
+    plugin arguments) do not inherit the replacement of the hash function: they would compute other digests than
+    this process and run the nodes again.
+
+    Raises:
+        ClinicaException: If the cached hashing is enabled and the workers are not forked.
+    """
+    import multiprocessing
+    from nipype.pipeline.plugins import MultiProcPlugin
+    from clinica.utils.exceptions import ClinicaException
+
+    if not is_cached_hashing_enabled() or not (plugin == 'MultiProc' or isinstance(plugin, MultiProcPlugin)):
+        return
+    start_method = (plugin_args or {}).get('mp_context') or multiprocessing.get_start_method()
+    if start_method != 'fork':
+        raise ClinicaException(
+            'The --hash_method option needs the MultiProc plugin to fork its workers (start method: %s). '
+            'Run Clinica without --hash_method or with the fork start method.' % start_method)
@@ -7,6 +7,8 @@ This module contains utilities to grab or download files for Clinica.
 import hashlib
 from collections import namedtuple
 
+from clinica.utils.profiling import timed
+
 RemoteFileStructure = namedtuple("RemoteFileStructure", ["filename", "url", "checksum"])
 
 
@@ -163,6 +165,7 @@ def check_caps_folder(caps_directory):
         raise ClinicaCAPSError(error_string)
 
 
+@timed('clinica_file_reader')
 def clinica_file_reader(
     subjects, sessions, input_directory, information, raise_exception=True
 ):
@@ -322,6 +325,7 @@ def clinica_file_reader(
     return results
 
 
+@timed('clinica_group_reader')
 def clinica_group_reader(caps_directory, information, raise_exception=True):
     """
     This function grabs files relative to a group, according to a glob pattern (using *). Only one file can be returned,
@@ -0,0 +1,328 @@
+# coding: utf8
+
+"""This module contains a pool of long-lived MATLAB/SPM standalone processes for SPM-based nodes.
+
+Without the pool, each SPM node (and each call to statistics-volume's run_m_script) starts a new MATLAB or SPM
+standalone process, which costs the startup of MATLAB or of the MATLAB Common Runtime for each image and each step.
+When the pool is enabled (`clinica --matlab_pool N ...`), Pipeline.run starts a server listening on a local (Unix)
+socket. Nodes, run in the processes of the MultiProc plugin, send the path of their MATLAB script to this server,
+which runs it in one of at most N MATLAB processes started on demand and reused until the end of the run.
+
+The process running the scripts is given by a backend (see MATLAB_BACKENDS): MATLAB, SPM standalone or a stub
+which does not run anything (e.g. for tests). Other backends can be added with register_matlab_backend.
+"""
+
+from contextlib import contextmanager
+
+# Environment variable giving the socket of the pool to the nodes
+MATLAB_POOL_SOCKET = 'CLINICA_MATLAB_POOL_SOCKET'
+
+# Line printed by the MATLAB processes at the end of each script
+END_OF_JOB = '__CLINICA_END_OF_JOB__'
+
+# MATLAB code run by the MATLAB processes: each line read on the standard input is a job
+JOB_LOOP = "while true, clinica_job = input('', 's'); if strcmp(clinica_job, 'exit'), break; end; eval(clinica_job); end"
+
+_matlab_pool = {'n_workers': 0, 'backend': None}
+
+
+class MatlabBackend:
+    """Long-lived MATLAB process running the scripts written on its standard input."""
+
+    def __init__(self):
+        self._process = None
+
+    def get_command(self):
+        """Command line starting the MATLAB process (running JOB_LOOP)."""
+        from nipype.interfaces.matlab import get_matlab_command
+        import platform
+
+        command = [get_matlab_command() or 'matlab', '-nodesktop', '-nosplash']
+        if platform.system().lower().startswith('linux'):
+            command.append('-nosoftwareopengl')
+        return command + ['-r', JOB_LOOP]
+
+    def get_job(self, script_file):
+        """MATLAB code running a script."""
+        return "run('%s')" % script_file.replace("'", "''")
+
+    def start(self):
+        import subprocess
+
+        self._process = subprocess.Popen(self.get_command(), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         stderr=subprocess.STDOUT, universal_newlines=True, bufsize=1)
+
+    def is_running(self):
+        return self._process is not None and self._process.poll() is None
+
+    def run_script(self, script_file, cwd):
+        """Run a MATLAB script in the folder cwd.
+
+        Returns:
+            Return code (0 if the script succeeded, 1 otherwise), output of the script.
+        """
+        if not self.is_running():
+            self.start()
+
+        job = ("clinica_status = 0; try, cd('%s'); %s; catch clinica_error, clinica_status = 1; "
+               "disp(getReport(clinica_error, 'extended', 'hyperlinks', 'off')); end; "
+               "fprintf('\\n%s %%d\\n', clinica_status);" % (cwd.replace("'", "''"), self.get_job(script_file),
+                                                             END_OF_JOB))
+        self._process.stdin.write(job + '\n')
+        self._process.stdin.flush()
+
+        output = []
+        for line in self._process.stdout:
+            if line.startswith(END_OF_JOB):
+                return int(line.split()[-1]), ''.join(output)
+            output.append(line)
+        raise RuntimeError('The MATLAB process stopped while running %s:\n%s' % (script_file, ''.join(output)))
+
+    def stop(self):
+        import subprocess
+
+        if not self.is_running():
+            return
+        try:
+            self._process.stdin.write('exit\n')
+            self._process.stdin.flush()
+            self._process.wait(timeout=30)
+        except (OSError, subprocess.TimeoutExpired):
+            self._process.kill()
+
+
+class SPMStandaloneBackend(MatlabBackend):
+    """Long-lived SPM standalone process (MATLAB Common Runtime)."""
+
+    def get_command(self):
+        import os
+
+        return [os.path.join(os.environ['SPMSTANDALONE_HOME'], 'run_spm12.sh'), os.environ['MCR_HOME'],
+                'eval', JOB_LOOP]
+
+    def get_job(self, script_file):
+        # Scripts which are not compiled can not be run by the MATLAB Common Runtime: their code is evaluated
+        return "eval(fileread('%s'))" % script_file.replace("'", "''")
+
+
+class StubBackend(MatlabBackend):
+    """Backend which does not run the scripts (e.g. for tests), only records them."""
+
+    def __init__(self):
+        super(StubBackend, self).__init__()
+        self.jobs = []
+
+    def start(self):
+        pass
+
+    def is_running(self):
+        return True
+
+    def run_script(self, script_file, cwd):
+        self.jobs.append((script_file, cwd))
+        return 0, 'Stub MATLAB backend: %s was not run.\n' % script_file
+
+    def stop(self):
+        pass
+
+
+MATLAB_BACKENDS = {
+    'matlab': MatlabBackend,
+    'spm_standalone': SPMStandaloneBackend,
+    'stub': StubBackend,
+}
+
+
+def register_matlab_backend(name, backend_class):
+    """Make a backend (subclass of MatlabBackend) available to the pool."""
+    MATLAB_BACKENDS[name] = backend_class
+
+
+def get_default_backend():
+    """Backend given by the CLINICA_MATLAB_BACKEND variable, otherwise SPM standalone if available, MATLAB if not."""
+    import os
+    from clinica.utils.spm import spm_standalone_is_available
+
+    if os.environ.get('CLINICA_MATLAB_BACKEND'):
+        return os.environ['CLINICA_MATLAB_BACKEND']
+    return 'spm_standalone' if spm_standalone_is_available() else 'matlab'
+
+
+class MatlabPool:
+    """Server dispatching the scripts sent on a Unix socket to at most n_workers MATLAB processes."""
+
+    def __init__(self, n_workers, backend):
+        import queue
+        import threading
+
+        self.n_workers = n_workers
+        self.backend = backend
+        self.socket_file = None
+        self._server = None
+        self._workers = []
+        self._idle_workers = queue.Queue()
+        self._lock = threading.Lock()
+
+    def acquire_worker(self):
+        import queue
+
+        try:
+            return self._idle_workers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._workers) < self.n_workers:
+                worker = MATLAB_BACKENDS[self.backend]()
+                self._workers.append(worker)
+                return worker
+        return self._idle_workers.get()
+
+    def release_worker(self, worker):
+        self._idle_workers.put(worker)
+
+    def run_script(self, script_file, cwd):
+        worker = self.acquire_worker()
+        try:
+            return worker.run_script(script_file, cwd)
+        except Exception as e:
+            # The process is restarted by the next job
+            worker.stop()
+            return 1, str(e)
+        finally:
+            self.release_worker(worker)
+
+    def start(self):
+        import json
+        import os
+        import socketserver
+        import threading
+        from tempfile import mkdtemp
+
+        pool = self
+
+        class JobHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                request = json.loads(self.rfile.readline().decode())
+                returncode, output = pool.run_script(request['script_file'], request['cwd'])
+                self.wfile.write((json.dumps({'returncode': returncode, 'output': output}) + '\n').encode())
+
+        self.socket_file = os.path.join(mkdtemp(), 'matlab_pool.sock')
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_file, JobHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        import os
+        import shutil
+
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            shutil.rmtree(os.path.dirname(self.socket_file), ignore_errors=True)
+            self._server = None
+        for worker in self._workers:
+            worker.stop()
+        self._workers = []
+
+
+def enable_matlab_pool(n_workers, backend=None):
+    """Make Pipeline.run start a pool of n_workers MATLAB processes (see matlab_pool).
+
+    Args:
+        n_workers (int): Maximum number of MATLAB processes.
+        backend (optional): Name of the backend (see MATLAB_BACKENDS, default: see get_default_backend).
+    """
+    if backend is not None and backend not in MATLAB_BACKENDS:
+        raise ValueError('Unknown MATLAB backend %s (available: %s).' % (backend, ', '.join(MATLAB_BACKENDS)))
+    _matlab_pool['n_workers'] = n_workers
+    _matlab_pool['backend'] = backend
+    install_spm_dispatch()
+
+
+def is_matlab_pool_enabled():
+    return _matlab_pool['n_workers'] > 0
+
+
+@contextmanager
+def matlab_pool():
+    """Context manager running a MATLAB pool (if enabled) for the SPM nodes run inside it."""
+    import os
+
+    if not is_matlab_pool_enabled() or MATLAB_POOL_SOCKET in os.environ:
+        yield None
+        return
+    backend = _matlab_pool['backend'] or get_default_backend()
+    if backend not in MATLAB_BACKENDS:
+        raise ValueError('Unknown MATLAB backend %s (available: %s).' % (backend, ', '.join(MATLAB_BACKENDS)))
+    pool = MatlabPool(_matlab_pool['n_workers'], backend)
+    pool.start()
+    os.environ[MATLAB_POOL_SOCKET] = pool.socket_file
+    try:
+        yield pool
+    finally:
+        del os.environ[MATLAB_POOL_SOCKET]
+        pool.stop()
+
+
+def submit_matlab_script(script_file, cwd=None):
+    """Run a MATLAB script in the MATLAB pool of the current pipeline.
+
+    Args:
+        script_file (str): Path to the script.
+        cwd (optional): Folder where the script is run (default: folder of the script).
+
+    Returns:
+        Return code (0 if the script succeeded), output of the script.
+    """
+    import json
+    import os
+    import socket
+
+    cwd = cwd or os.path.dirname(os.path.abspath(script_file))
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(os.environ[MATLAB_POOL_SOCKET])
+        request = {'script_file': os.path.abspath(script_file), 'cwd': os.path.abspath(cwd)}
+        connection.sendall((json.dumps(request) + '\n').encode())
+        response = connection.makefile('rb').readline()
+    if not response:
+        raise RuntimeError('The MATLAB pool did not answer for %s.' % script_file)
+    response = json.loads(response.decode())
+    return response['returncode'], response['output']
+
+
+def install_spm_dispatch():
+    """Make the SPM interfaces of Nipype send their script to the MATLAB pool when it is running."""
+    from nipype.interfaces.spm.base import SPMCommand
+
+    if getattr(SPMCommand._run_interface, 'clinica_dispatch', False):
+        return
+    original_run_interface = SPMCommand._run_interface
+
+    def run_interface(self, runtime):
+        import os
+        from copy import deepcopy
+        from nipype.interfaces.base import isdefined
+
+        if MATLAB_POOL_SOCKET not in os.environ:
+            return original_run_interface(self, runtime)
+
+        script_lines = []
+        if isdefined(self.inputs.paths) and not (isdefined(self.inputs.use_mcr) and self.inputs.use_mcr):
+            script_lines += ["addpath('%s');" % path for path in self.inputs.paths]
+        script_lines.append(self._make_matlab_command(deepcopy(self._parse_inputs())))
+        script_file = os.path.abspath('pyscript_%s.m' % self.__class__.__name__.split('.')[-1].lower())
+        with open(script_file, 'w') as f:
+            f.write('\n'.join(script_lines))
+
+        returncode, output = submit_matlab_script(script_file, os.getcwd())
+        runtime.returncode = returncode
+        runtime.stdout = output
+        runtime.stderr = ''
+        runtime.merged = output
+        if returncode != 0 or (isdefined(self.inputs.use_mcr) and self.inputs.use_mcr and 'Skipped' in output):
+            raise RuntimeError('The MATLAB pool failed to run %s (return code %d):\n%s'
+                               % (script_file, returncode, output))
+        return runtime
+
+    run_interface.clinica_dispatch = True
+    SPMCommand._run_interface = run_interface
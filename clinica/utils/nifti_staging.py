@@ -0,0 +1,163 @@
+# coding: utf8
+
+"""This module contains the staging of the compressed NIfTI images for the SPM-based nodes.
+
+SPM only reads uncompressed NIfTI images: the inputs of the SPM nodes are decompressed by unzip_nii in the folder
+of the node, and their outputs are compressed by zip_nii before being written in CAPS. The same images (e.g. the
+T1w image of a subject, the tissue maps) are decompressed again by each node using them, and are compressed with the
+highest level of gzip, single-threaded.
+
+When the NIfTI cache is enabled (`clinica --nifti_cache ...`), each compressed image is decompressed once in a cache
+of the working directory, indexed by the digest of its content, and unzip_nii copies the decompressed image from this
+cache (a copy and not a link, since some SPM steps modify their input image). The level of gzip and the number of
+threads compressing the images (`clinica --gzip_level L --gzip_threads N ...`) let users choose between speed and
+size. With several threads, the image is compressed by independent blocks written as consecutive gzip members,
+which any gzip reader decompresses as a single stream.
+"""
+
+from contextlib import contextmanager
+
+# Environment variables giving the options to the nodes, run in the processes of the MultiProc plugin
+NIFTI_CACHE_DIR = 'CLINICA_NIFTI_CACHE_DIR'
+GZIP_LEVEL = 'CLINICA_GZIP_LEVEL'
+GZIP_THREADS = 'CLINICA_GZIP_THREADS'
+
+# Size of the blocks compressed by each thread
+GZIP_BLOCK_SIZE = 16 * 1024 * 1024
+
+_nifti_staging = {'cache': False}
+
+
+def enable_nifti_cache():
+    """Make Pipeline.run decompress the compressed NIfTI inputs of the SPM nodes once (see nifti_cache)."""
+    _nifti_staging['cache'] = True
+
+
+def is_nifti_cache_enabled():
+    return _nifti_staging['cache']
+
+
+def set_gzip_options(level=9, n_threads=1):
+    """Set the level of gzip and the number of threads used by zip_nii.
+
+    Args:
+        level (int): Compression level, from 1 (fastest) to 9 (smallest, default).
+        n_threads (int): Number of threads compressing each image (default: 1).
+    """
+    import os
+
+    if level not in range(1, 10):
+        raise ValueError('The gzip level must be between 1 and 9 (given value: %s).' % level)
+    if n_threads < 1:
+        raise ValueError('The number of gzip threads must be positive (given value: %s).' % n_threads)
+    os.environ[GZIP_LEVEL] = str(level)
+    os.environ[GZIP_THREADS] = str(n_threads)
+
+
+def get_gzip_options():
+    """Return the level of gzip and the number of threads used by zip_nii (see set_gzip_options)."""
+    import os
+
+    return int(os.environ.get(GZIP_LEVEL, 9)), int(os.environ.get(GZIP_THREADS, 1))
+
+
+@contextmanager
+def nifti_cache(working_directory, remove=False):
+    """Context manager giving a NIfTI cache in working_directory (if enabled) to the nodes run inside it.
+
+    The cache is removed when leaving the context if remove is True (e.g. with the `clean` working directory policy
+    or a temporary working directory), otherwise it is kept to be reused when the pipeline is run again.
+    """
+    import os
+    import shutil
+
+    if not is_nifti_cache_enabled() or NIFTI_CACHE_DIR in os.environ:
+        yield None
+        return
+    cache_dir = os.path.join(os.path.abspath(working_directory), 'nifti_cache')
+    os.makedirs(cache_dir, exist_ok=True)
+    os.environ[NIFTI_CACHE_DIR] = cache_dir
+    try:
+        yield cache_dir
+    finally:
+        del os.environ[NIFTI_CACHE_DIR]
+        if remove:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def estimate_nifti_cache_size(nifti_files):
+    """Size (in bytes) of the decompressed images of the compressed NIfTI files, as kept in the NIfTI cache.
+
+    The size of each image is given by its header (only the header is decompressed).
+    """
+    import os
+    import nibabel as nib
+    import numpy as np
+
+    cache_size = 0
+    for nifti_file in set(nifti_files):
+        if not nifti_file.endswith('.nii.gz') or not os.path.isfile(nifti_file):
+            continue
+        header = nib.load(nifti_file).header
+        # The data follow the header (and its extensions) when the offset is not set
+        cache_size += (int(np.prod(header.get_data_shape())) * header.get_data_dtype().itemsize
+                       + max(int(header.get_data_offset()), header.single_vox_offset))
+    return cache_size
+
+
+def gunzip_file(in_file, out_file):
+    """Decompress in_file in out_file, written atomically (other processes never see a partial file)."""
+    import gzip
+    import os
+    import shutil
+
+    tmp_file = '%s.%d.tmp' % (out_file, os.getpid())
+    with gzip.open(in_file, 'rb') as f_in, open(tmp_file, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out, GZIP_BLOCK_SIZE)
+    os.replace(tmp_file, out_file)
+    return out_file
+
+
+def stage_uncompressed(in_file, out_file):
+    """Write the decompressed in_file in out_file, decompressing it only if it is not in the NIfTI cache.
+
+    Returns:
+        out_file, or None if there is no NIfTI cache.
+    """
+    import os
+    import shutil
+    from clinica.utils.hashing import fast_hash_file
+
+    cache_dir = os.environ.get(NIFTI_CACHE_DIR)
+    if not cache_dir:
+        return None
+    cached_file = os.path.join(cache_dir, fast_hash_file(in_file) + '.nii')
+    if not os.path.isfile(cached_file):
+        gunzip_file(in_file, cached_file)
+    shutil.copyfile(cached_file, out_file)
+    return out_file
+
+
+def gzip_file(in_file, out_file, level=9, n_threads=1):
+    """Compress in_file in out_file with the given level of gzip and number of threads."""
+    import gzip
+    import shutil
+    from multiprocessing.pool import ThreadPool
+
+    if n_threads == 1:
+        with open(in_file, 'rb') as f_in, gzip.open(out_file, 'wb', compresslevel=level) as f_out:
+            shutil.copyfileobj(f_in, f_out, GZIP_BLOCK_SIZE)
+        return out_file
+
+    def read_blocks(f):
+        block = f.read(GZIP_BLOCK_SIZE)
+        while block:
+            yield block
+            block = f.read(GZIP_BLOCK_SIZE)
+
+    # zlib releases the GIL while compressing: the blocks are compressed in parallel, and written in order
+    with open(in_file, 'rb') as f_in, open(out_file, 'wb') as f_out, ThreadPool(n_threads) as pool:
+        for member in pool.imap(lambda block: gzip.compress(block, compresslevel=level, mtime=0),
+                                read_blocks(f_in)):
+            f_out.write(member)
+    return out_file
@@ -0,0 +1,111 @@
+# coding: utf8
+
+"""This module contains utilities for the non-interactive (batch) execution of Clinica pipelines.
+
+In batch mode (`clinica --batch ...`), the checks performed before running a pipeline never wait for an answer on
+the standard input: problems are reported and the pipeline runs anyway, as it would after the timeout of the
+interactive prompts. The results of the checks (dependencies, centering of the input volumes, disk space, CPUs)
+are gathered in a single preflight file per pipeline and dataset, stored in the Clinica cache directory, so that the
+expensive checks are not done again by the next runs on the same dataset (e.g. by each task of a SLURM job array).
+"""
+
+_preflight = {'enabled': False, 'file': None, 'result': None}
+
+# Environment variables pointing to the third-party software checked by the pipelines
+SOFTWARE_ENVIRONMENT_VARIABLES = ['PATH', 'ANTSPATH', 'FSLDIR', 'FREESURFER_HOME', 'MATLABCMD', 'SPM_HOME',
+                                  'SPMSTANDALONE_HOME', 'MCR_HOME', 'PETPVC_HOME']
+
+
+def enable_batch_mode():
+    """Make the checks of the pipelines non-interactive and cache their results."""
+    _preflight['enabled'] = True
+
+
+def is_batch_mode():
+    return _preflight['enabled']
+
+
+def get_available_cpus():
+    """Return the number of CPUs the process is allowed to use (e.g. the CPUs allocated by SLURM)."""
+    import os
+    from multiprocessing import cpu_count
+
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return cpu_count()
+
+
+def get_environment_fingerprint():
+    """Return a digest of the environment variables used to locate the third-party software."""
+    import hashlib
+    import os
+
+    values = ['%s=%s' % (name, os.environ.get(name, '')) for name in SOFTWARE_ENVIRONMENT_VARIABLES]
+    return hashlib.sha1('\n'.join(values).encode()).hexdigest()
+
+
+def get_preflight_file(pipeline_name, bids_directory, caps_directory):
+    """Return the path of the preflight file of a pipeline run on a given dataset."""
+    import hashlib
+    from os.path import abspath, join
+    from clinica.utils.filemanip import get_cache_directory
+
+    dataset = '\n'.join([abspath(d) if d else '' for d in [bids_directory, caps_directory]])
+    dataset_key = hashlib.sha1(dataset.encode()).hexdigest()[:16]
+    return join(get_cache_directory(), 'preflight', '%s_%s.json' % (pipeline_name, dataset_key))
+
+
+def start_preflight(pipeline_name, bids_directory, caps_directory):
+    """Load the results of the previous checks of a pipeline on a dataset (if any).
+
+    Returns:
+        Preflight result (dict) which is updated by the checks.
+    """
+    import json
+    from os.path import abspath, isfile
+
+    preflight_file = get_preflight_file(pipeline_name, bids_directory, caps_directory)
+    result = {}
+    if isfile(preflight_file):
+        try:
+            with open(preflight_file) as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            result = {}
+    result.update({
+        'pipeline': pipeline_name,
+        'bids_directory': abspath(bids_directory) if bids_directory else None,
+        'caps_directory': abspath(caps_directory) if caps_directory else None,
+    })
+    _preflight['file'] = preflight_file
+    _preflight['result'] = result
+    return result
+
+
+def get_preflight_result():
+    """Return the preflight result of the current pipeline (None if no preflight was started)."""
+    return _preflight['result']
+
+
+def save_preflight():
+    """Write the preflight result of the current pipeline in the cache directory.
+
+    Returns:
+        Path to the preflight file.
+    """
+    import datetime
+    import json
+    import os
+    from os.path import dirname
+
+    if _preflight['result'] is None:
+        return None
+    _preflight['result']['date'] = datetime.datetime.now().isoformat(timespec='seconds')
+    os.makedirs(dirname(_preflight['file']), exist_ok=True)
+    # Tasks of a job array may write the same file at the same time
+    tmp_file = '%s.%d.tmp' % (_preflight['file'], os.getpid())
+    with open(tmp_file, 'w') as f:
+        json.dump(_preflight['result'], f, indent=4, sort_keys=True)
+    os.replace(tmp_file, _preflight['file'])
+    return _preflight['file']
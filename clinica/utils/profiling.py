@@ -0,0 +1,165 @@
+# coding: utf8
+
+"""This module contains utilities to profile the execution of Clinica pipelines.
+
+When profiling is enabled (`clinica --profiling ...`), Clinica-level steps (scanning of the inputs, disk space
+checks, hashing of the inputs by Nipype) are timed, the resource monitor of Nipype is enabled, and Pipeline.run
+writes a report (JSON and TSV) with the wall time, CPU and peak memory of each node, per subject and session.
+"""
+
+import functools
+from contextlib import contextmanager
+
+_profiling = {'enabled': False, 'timers': {}}
+
+
+def enable_profiling():
+    """Enable the profiling of Clinica pipelines and the resource monitor of Nipype."""
+    from nipype import config
+
+    _profiling['enabled'] = True
+    _profiling['timers'] = {}
+    config.enable_resource_monitor()
+    install_hashing_timer()
+
+
+def is_profiling_enabled():
+    return _profiling['enabled']
+
+
+def add_time(name, duration):
+    """Add a duration (in seconds) to the timer `name`."""
+    timer_value = _profiling['timers'].setdefault(name, {'calls': 0, 'total_time_s': 0.0})
+    timer_value['calls'] += 1
+    timer_value['total_time_s'] += duration
+
+
+@contextmanager
+def timer(name):
+    """Context manager timing a block of code when profiling is enabled."""
+    import time
+
+    if not _profiling['enabled']:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """Decorator timing each call of a function when profiling is enabled."""
+    def timed_decorator(func):
+        @functools.wraps(func)
+        def func_wrapper(*args, **kwargs):
+            with timer(name):
+                return func(*args, **kwargs)
+        return func_wrapper
+    return timed_decorator
+
+
+def get_timers():
+    """Return a copy of the Clinica-level timers."""
+    return {name: dict(value) for name, value in _profiling['timers'].items()}
+
+
+def install_hashing_timer():
+    """Time the computation of the hash of the node inputs by Nipype (in the main process)."""
+    from nipype.interfaces.base.specs import BaseTraitedSpec
+
+    if getattr(BaseTraitedSpec.get_hashval, 'clinica_timed', False):
+        return
+    timed_get_hashval = timed('nipype_input_hashing')(BaseTraitedSpec.get_hashval)
+    timed_get_hashval.clinica_timed = True
+    BaseTraitedSpec.get_hashval = timed_get_hashval
+
+
+def get_io_counters():
+    """Return the number of bytes read and written by Clinica and its child processes."""
+    import resource
+
+    usage = [resource.getrusage(who) for who in [resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN]]
+    # Block counts of getrusage are in 512-byte units
+    return {'bytes_read': 512 * sum(u.ru_inblock for u in usage),
+            'bytes_written': 512 * sum(u.ru_oublock for u in usage)}
+
+
+def get_node_profiles(exec_graph):
+    """Extract the runtime information of each node of an execution graph.
+
+    Returns:
+        DataFrame with one row per node (and per subject/session for iterated nodes) with columns node,
+        participant_id, session_id, duration_s, mem_peak_gb and cpu_percent.
+    """
+    import re
+    import pandas as pd
+
+    rows = []
+    for node in exec_graph.nodes():
+        try:
+            runtime = node.result.runtime
+        except Exception:
+            continue
+        runtimes = runtime if isinstance(runtime, list) else [runtime]
+
+        ids = re.search(r'(sub-[a-zA-Z0-9]+)_(ses-[a-zA-Z0-9]+)', ''.join(node.parameterization))
+        rows.append({
+            'node': node.fullname.split('.', 1)[-1],
+            'participant_id': ids.group(1) if ids else 'n/a',
+            'session_id': ids.group(2) if ids else 'n/a',
+            'duration_s': sum(getattr(r, 'duration', 0.0) or 0.0 for r in runtimes),
+            'mem_peak_gb': max([getattr(r, 'mem_peak_gb', None) or 0.0 for r in runtimes]),
+            'cpu_percent': max([getattr(r, 'cpu_percent', None) or 0.0 for r in runtimes]),
+        })
+    return pd.DataFrame(rows, columns=['node', 'participant_id', 'session_id',
+                                       'duration_s', 'mem_peak_gb', 'cpu_percent'])
+
+
+def write_profiling_report(pipeline_name, exec_graph, wall_time, io_start, output_dir):
+    """Write the profiling report of a pipeline run.
+
+    Two files are written in `output_dir`:
+    - <pipeline_name>_<date>_profiling.tsv: runtime of each node (see get_node_profiles)
+    - <pipeline_name>_<date>_profiling.json: wall time, Clinica-level timers, bytes read and written,
+        and the time spent in each node summed per node and per subject/session.
+
+    Args:
+        pipeline_name: Name of the pipeline.
+        exec_graph: Execution graph returned by Workflow.run.
+        wall_time: Duration of Pipeline.run (in seconds).
+        io_start: Values of get_io_counters() at the beginning of the run.
+        output_dir: Folder where the report is written.
+
+    Returns:
+        Path to the JSON report, path to the TSV report.
+    """
+    import datetime
+    import json
+    import os
+    from os.path import join
+
+    os.makedirs(output_dir, exist_ok=True)
+    prefix = join(output_dir, '%s_%s_profiling' % (pipeline_name, datetime.datetime.now().strftime('%Y%m%d-%H%M%S')))
+
+    node_profiles = get_node_profiles(exec_graph)
+    node_profiles.to_csv(prefix + '.tsv', sep='\t', index=False, encoding='utf-8')
+
+    io_end = get_io_counters()
+    report = {
+        'pipeline': pipeline_name,
+        'wall_time_s': wall_time,
+        'clinica_timers': get_timers(),
+        'io': {key: io_end[key] - io_start[key] for key in io_end},
+        'nodes': node_profiles.groupby('node').agg(
+            {'duration_s': 'sum', 'mem_peak_gb': 'max', 'cpu_percent': 'max'}).to_dict(orient='index'),
+        'subjects': {
+            '%s_%s' % ids: values for ids, values in node_profiles.groupby(['participant_id', 'session_id']).agg(
+                {'duration_s': 'sum', 'mem_peak_gb': 'max'}).to_dict(orient='index').items()
+        },
+    }
+    with open(prefix + '.json', 'w') as f:
+        json.dump(report, f, indent=4)
+
+    return prefix + '.json', prefix + '.tsv'
@@ -99,6 +99,7 @@ def use_spm_standalone():
     from colorama import Fore
     import platform
     from clinica.utils.stream import cprint
+    from clinica.utils.check_dependency import get_cached_version
     from nipype.interfaces import spm
     # This section of code determines whether to use SPM standalone or not
     if all(elem in os.environ.keys() for elem in ['SPMSTANDALONE_HOME', 'MCR_HOME']):
@@ -115,6 +116,9 @@ def use_spm_standalone():
             else:
                 raise SystemError('Clinica only support macOS and Linux')
             spm.SPMCommand.set_mlab_paths(matlab_cmd=matlab_cmd, use_mcr=True)
-            cprint("Using SPM standalone version %s" % spm.SPMCommand().version)
+            # Probing the version launches the MATLAB Common Runtime: it is only done when SPM standalone changes
+            spm_version = get_cached_version(os.path.join(spm_standalone_home, 'run_spm12.sh'),
+                                             lambda: spm.SPMCommand().version)
+            cprint("Using SPM standalone version %s" % spm_version)
         else:
             raise FileNotFoundError('$SPMSTANDALONE_HOME and $MCR_HOME are defined, but linked to non existent folder ')
@@ -3,7 +3,8 @@
 """
 This module contains utilities for statistics.
 
-Currently, it contains one function to generate TSV file containing mean map based on a parcellation.
+Currently, it contains functions to generate TSV file containing mean map based on a parcellation, for one image, for
+a group of images or for a group of images on several atlases.
 """
 
 def statistics_on_atlas(in_normalized_map, in_atlas, out_file=None):
@@ -24,7 +25,7 @@ def statistics_on_atlas(in_normalized_map, in_atlas, out_file=None):
         out_file (str): TSV file containing the statistics (content of the
             columns: label, mean scalar, std of the scalar', number of voxels).
     """
-    from clinica.utils.atlas import AtlasAbstract
+    from clinica.utils.atlas import AtlasAbstract, get_atlas_geometry
     import nibabel as nib
     import numpy as np
     import pandas
@@ -42,22 +43,12 @@ def statistics_on_atlas(in_normalized_map, in_atlas, out_file=None):
         out_file = op.abspath("%s_statistics_%s.tsv"
                               % (fname, in_atlas.get_name_atlas()))
 
-    atlas_labels = nib.load(in_atlas.get_atlas_labels())
-    atlas_labels_data = atlas_labels.get_data()
+    # Labels of the atlas, loaded once per process
+    atlas_geometry = get_atlas_geometry(in_atlas)
+    label_name = atlas_geometry.roi_name
 
     img = nib.load(in_normalized_map)
-    img_data = img.get_data()
-
-    atlas_correspondence = pandas.io.parsers.read_csv(in_atlas.get_tsv_roi(), sep='\t')
-    label_name = list(atlas_correspondence.roi_name)
-    label_value = list(atlas_correspondence.roi_value)  # TODO create roi_value column in lut_*.txt and remove irrelevant RGB information
-
-    mean_signal_value = []
-    for label in label_value:
-        current_mask_label = atlas_labels_data == label
-        masked_data = np.array(img_data, copy=True)
-        masked_data[np.invert(current_mask_label)] = 0
-        mean_signal_value.append(np.sum(masked_data) / np.sum(current_mask_label))
+    mean_signal_value = list(atlas_geometry.roi_means(np.asanyarray(img.dataobj)))
 
     try:
         data = pandas.DataFrame({'label_name': label_name,
@@ -69,3 +60,96 @@ def statistics_on_atlas(in_normalized_map, in_atlas, out_file=None):
         raise e
 
     return out_file
+
+
+def statistics_on_atlas_group(in_normalized_maps, in_atlas, chunk_size=32):
+    """
+    Compute statistics of a set of maps on an atlas.
+
+    This function gives the same mean values as `statistics_on_atlas` but for
+    a whole group of images: the voxels of the ROIs are gathered with the
+    index of the atlas (see `get_atlas_geometry`) and the images are
+    processed by chunks of `chunk_size` memory-mapped volumes.
+
+    Args:
+        in_normalized_maps (List[str]): Files containing scalar images
+            registered on the atlas.
+        in_atlas (:obj: AbstractClass): An atlas with a set of ROI. These ROI
+            are used to compute statistics.
+        chunk_size (Optional[int]): Number of images loaded at the same time.
+
+    Returns:
+        mean_signal_value (np.ndarray): Matrix of shape (n_images, n_roi)
+            containing the mean scalar value of each image in each ROI.
+        label_name (List[str]): Names of the ROI (columns of the matrix).
+    """
+    from clinica.utils.atlas import AtlasAbstract, get_atlas_geometry
+    import nibabel as nib
+    import numpy as np
+
+    if not isinstance(in_atlas, AtlasAbstract):
+        raise Exception("Atlas element must be an AtlasAbstract type")
+
+    # Labels of the atlas, loaded once per process: each image only costs a gather of the voxels of the ROIs
+    atlas_geometry = get_atlas_geometry(in_atlas)
+    label_name = atlas_geometry.roi_name
+    n_image_voxels = int(np.prod(atlas_geometry.shape))
+
+    mean_signal_value = np.empty((len(in_normalized_maps), len(label_name)))
+    for start in range(0, len(in_normalized_maps), chunk_size):
+        chunk = in_normalized_maps[start:start + chunk_size]
+        img_data = np.empty((len(chunk), n_image_voxels), dtype=np.float32)
+        for i, image in enumerate(chunk):
+            img_data[i] = np.asanyarray(nib.load(image).dataobj).ravel()
+        mean_signal_value[start:start + len(chunk)] = atlas_geometry.roi_means(img_data)
+
+    return mean_signal_value, label_name
+
+
+def statistics_on_atlases_group(in_normalized_maps, in_atlas_list):
+    """
+    Compute statistics of a set of maps on several atlases.
+
+    The maps (e.g. the FA, MD, AD and RD maps of a subject) are loaded once,
+    and the mean values, standard deviations and number of voxels of all the
+    maps in the ROIs of each atlas are computed together (see
+    `AtlasGeometry.roi_statistics`).
+
+    Args:
+        in_normalized_maps (List[str]): Files containing scalar images
+            registered on the atlases.
+        in_atlas_list (List[:obj: AbstractClass]): Atlases sharing the space
+            (and the spatial resolution) of the maps.
+
+    Returns:
+        List of (mean_signal_value, std_signal_value, n_voxels, label_name)
+        tuples (one per atlas) where mean_signal_value and std_signal_value
+        are matrices of shape (n_maps, n_roi) and n_voxels is the number of
+        voxels of each ROI.
+    """
+    from clinica.utils.atlas import AtlasAbstract, get_atlas_geometry
+    import nibabel as nib
+    import numpy as np
+
+    for atlas in in_atlas_list:
+        if not isinstance(atlas, AtlasAbstract):
+            raise Exception("Atlas element must be an AtlasAbstract type")
+
+    maps = [np.asanyarray(nib.load(in_map).dataobj) for in_map in in_normalized_maps]
+    map_shape = maps[0].shape[:3]
+    img_data = np.empty((len(maps), int(np.prod(map_shape))), dtype=np.float32)
+    for i, map_data in enumerate(maps):
+        img_data[i] = map_data.ravel()
+    del maps
+
+    atlases_statistics = []
+    for atlas in in_atlas_list:
+        atlas_geometry = get_atlas_geometry(atlas)
+        if tuple(atlas_geometry.shape) != tuple(map_shape):
+            raise ValueError("The maps (shape %s) are not in the space of the atlas %s (shape %s)"
+                             % (map_shape, atlas_geometry.name, atlas_geometry.shape))
+        mean_signal_value, std_signal_value, n_voxels = atlas_geometry.roi_statistics(img_data)
+        atlases_statistics.append((np.atleast_2d(mean_signal_value), np.atleast_2d(std_signal_value), n_voxels,
+                                   atlas_geometry.roi_name))
+
+    return atlases_statistics
@@ -0,0 +1,124 @@
+# coding: utf8
+
+"""This module contains the lifecycle policy of the intermediate files of the pipelines in the working directory.
+
+By default (policy 'keep'), the working directory keeps the outputs of all the nodes until the end of the pipeline
+(and after it when the working directory was given by the user), so that its size grows with the number of images.
+
+With the policy 'clean' (`clinica --working_directory_policy clean ...`), the intermediate files of an image (i.e.
+of the nodes run for a value of the iterables of the pipeline) are removed as soon as all its nodes, including the
+DataSink writing its outputs in CAPS, and the group-level nodes using them have finished. Only the result files of
+the nodes are kept (for the profiling report). The working directory then holds the intermediate files of the
+images being processed only, and its peak size scales with the number of parallel processes.
+
+Images whose processing failed are kept untouched: running the pipeline again with the same working directory
+resumes them from the last node which succeeded. Cleaned images are run again from scratch.
+"""
+
+from nipype.pipeline.plugins import MultiProcPlugin
+
+WORKING_DIRECTORY_POLICIES = ['keep', 'clean']
+
+_working_directory = {'policy': 'keep'}
+
+
+def set_working_directory_policy(policy):
+    """Set the lifecycle policy of the intermediate files (see WORKING_DIRECTORY_POLICIES)."""
+    if policy not in WORKING_DIRECTORY_POLICIES:
+        raise ValueError('Unknown working directory policy %s (available: %s).'
+                         % (policy, ', '.join(WORKING_DIRECTORY_POLICIES)))
+    _working_directory['policy'] = policy
+
+
+def get_working_directory_policy():
+    return _working_directory['policy']
+
+
+def get_image_key(node):
+    """Return the value of the outermost iterables of a node of the execution graph (None for group-level nodes)."""
+    if not node.parameterization:
+        return None
+    return node.parameterization[0]
+
+
+def clean_node_directory(node):
+    """Remove the files of a node, except its result file.
+
+    The hash file of the node is removed, so that Nipype runs the node again if needed.
+
+    Returns:
+        Number of bytes removed.
+    """
+    import os
+    import shutil
+
+    output_dir = node.output_dir()
+    if not os.path.isdir(output_dir):
+        return 0
+    result_file = 'result_%s.pklz' % node.name
+    removed_bytes = 0
+    for entry in os.scandir(output_dir):
+        if entry.name == result_file:
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            for root, _, files in os.walk(entry.path):
+                removed_bytes += sum(os.lstat(os.path.join(root, f)).st_size for f in files)
+            shutil.rmtree(entry.path, ignore_errors=True)
+        else:
+            removed_bytes += entry.stat(follow_symlinks=False).st_size
+            os.remove(entry.path)
+    return removed_bytes
+
+
+class CleaningMultiProcPlugin(MultiProcPlugin):
+    """MultiProc plugin removing the intermediate files of each image once they are no longer needed."""
+
+    def _generate_dependency_list(self, graph):
+        super(CleaningMultiProcPlugin, self)._generate_dependency_list(graph)
+        self._image_of_job = {}
+        self._jobs_of_image = {}
+        for jobid, node in enumerate(self.procs):
+            image = get_image_key(node)
+            if image is not None:
+                self._image_of_job[jobid] = image
+                self._jobs_of_image.setdefault(image, []).append(jobid)
+        self._failed_images = set()
+        self._cleaned_images = set()
+
+    def _clean_queue(self, jobid, graph, result=None):
+        # A failed subnode of a MapNode makes the image of the MapNode fail
+        failed_jobid = self.mapnodesubids.get(jobid, jobid)
+        if failed_jobid in self._image_of_job:
+            self._failed_images.add(self._image_of_job[failed_jobid])
+        return super(CleaningMultiProcPlugin, self)._clean_queue(jobid, graph, result=result)
+
+    def _task_finished_cb(self, jobid, cached=False):
+        # The images of the parents of the job may no longer be needed once the job is finished (e.g. JoinNode)
+        parents = list(self.refidx[:, jobid].nonzero()[0]) if jobid < self.refidx.shape[1] else []
+        super(CleaningMultiProcPlugin, self)._task_finished_cb(jobid, cached=cached)
+        images = {self._image_of_job[j] for j in parents + [jobid] if j in self._image_of_job}
+        for image in images:
+            if self._is_image_finished(image):
+                self._clean_image(image)
+
+    def _is_image_finished(self, image):
+        if image in self._failed_images or image in self._cleaned_images:
+            return False
+        for jobid in self._jobs_of_image[image]:
+            if not self.proc_done[jobid] or self.proc_pending[jobid]:
+                return False
+            # Jobs (possibly of other images or group-level) still needing the outputs of this job
+            if self.refidx[jobid, :].sum() > 0:
+                return False
+        return True
+
+    def _clean_image(self, image):
+        from nipype import logging
+
+        removed_bytes = 0
+        for jobid in self._jobs_of_image[image]:
+            removed_bytes += clean_node_directory(self.procs[jobid])
+        self._cleaned_images.add(image)
+        logging.getLogger('nipype.workflow').info(
+            '[Working directory] %s finished: %.1f MB of intermediate files removed.'
+            % (image.lstrip('_'), removed_bytes / 1024 ** 2))
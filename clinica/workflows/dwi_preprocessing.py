@@ -34,9 +34,8 @@ def prepare_b0(num_b0s, low_bval=5, name='prepare_b0'):
     import nipype.interfaces.fsl as fsl
     import nipype.interfaces.utility as niu
     import nipype.pipeline.engine as pe
-    from nipype.workflows.dmri.fsl.utils import b0_average
 
-    from clinica.utils.dwi import b0_dwi_split, insert_b0_into_dwi
+    from clinica.utils.dwi import b0_average, b0_dwi_split, insert_b0_into_dwi
 
     inputnode = pe.Node(interface=niu.IdentityInterface(
         fields=["in_dwi", "in_bvec", "in_bval"]),
@@ -142,7 +141,7 @@ def b0_flirt_pipeline(num_b0s, name='b0_coregistration'):
     from nipype.interfaces import fsl
     import nipype.interfaces.utility as niu
 
-    from clinica.utils.dwi import merge_volumes_tdim
+    from clinica.utils.dwi import concatenate_volumes, merge_volumes_tdim
 
     inputnode = pe.Node(niu.IdentityInterface(fields=['in_file']),
                         name='inputnode')
@@ -168,7 +167,9 @@ def b0_flirt_pipeline(num_b0s, name='b0_coregistration'):
         fine_search=1, coarse_search=10),
         name='b0_co_registration', iterfield=['in_file'])
 
-    merge = pe.Node(fsl.Merge(dimension='t'), name='merge_registered_b0s')
+    merge = pe.Node(niu.Function(input_names=['in_files'],
+                                 output_names=['merged_file'],
+                                 function=concatenate_volumes), name='merge_registered_b0s')
     thres = pe.MapNode(fsl.Threshold(thresh=0.0), iterfield=['in_file'],
                        name='remove_negative')
     insert_ref = pe.Node(niu.Function(input_names=['in_file1', 'in_file2'],
@@ -228,6 +229,8 @@ def dwi_flirt(name='DWICoregistration', excl_nodiff=False, flirt_param={}):
 
     from nipype.workflows.dmri.fsl.utils import enhance
 
+    from clinica.utils.dwi import concatenate_volumes
+
     inputnode = pe.Node(
             niu.IdentityInterface(
                 fields=['reference',
@@ -257,7 +260,9 @@ def dwi_flirt(name='DWICoregistration', excl_nodiff=False, flirt_param={}):
                        iterfield=['in_file', 'in_matrix_file'])
     thres = pe.MapNode(fsl.Threshold(thresh=0.0), iterfield=['in_file'],
                        name='RemoveNegative')
-    merge = pe.Node(fsl.Merge(dimension='t'), name='MergeDWIs')
+    merge = pe.Node(niu.Function(input_names=['in_files'],
+                                 output_names=['merged_file'],
+                                 function=concatenate_volumes), name='MergeDWIs')
     outputnode = pe.Node(
             niu.IdentityInterface(
                 fields=['out_file',
@@ -571,6 +576,8 @@ def remove_bias(name='bias_correct'):
     import nipype.interfaces.fsl as fsl
     import nipype.interfaces.ants as ants
 
+    from clinica.utils.dwi import concatenate_volumes
+
     inputnode = pe.Node(niu.IdentityInterface(
         fields=['in_file']), name='inputnode')
 
@@ -590,7 +597,9 @@ def remove_bias(name='bias_correct'):
                       iterfield=['in_file'], name='RemoveBiasOfDWIs')
     thres = pe.MapNode(fsl.Threshold(thresh=0.0), iterfield=['in_file'],
                        name='RemoveNegative')
-    merge = pe.Node(fsl.utils.Merge(dimension='t'), name='MergeDWIs')
+    merge = pe.Node(niu.Function(input_names=['in_files'],
+                                 output_names=['merged_file'],
+                                 function=concatenate_volumes), name='MergeDWIs')
 
     wf = pe.Workflow(name=name)
     wf.connect([
@@ -704,6 +713,7 @@ def epi_pipeline(name='susceptibility_distortion_correction_using_t1'):
     import nipype.interfaces.utility as niu
     import nipype.interfaces.fsl as fsl
     import nipype.interfaces.c3 as c3
+    from clinica.utils.dwi import concatenate_volumes
 
     inputnode = pe.Node(niu.IdentityInterface(fields=['T1', 'DWI', 'bvec']), name='inputnode')
 
@@ -778,7 +788,9 @@ def epi_pipeline(name='susceptibility_distortion_correction_using_t1'):
     thres = pe.MapNode(fsl.Threshold(thresh=0.0), iterfield=['in_file'],
                        name='RemoveNegative')
 
-    merge = pe.Node(fsl.Merge(dimension='t'), name='MergeDWIs')
+    merge = pe.Node(niu.Function(input_names=['in_files'],
+                                 output_names=['merged_file'],
+                                 function=concatenate_volumes), name='MergeDWIs')
 
     outputnode = pe.Node(niu.IdentityInterface(fields=['DWI_2_T1_Coregistration_matrix',
                                                        'epi_correction_deformation_field',
@@ -0,0 +1,115 @@
+# coding: utf8
+
+import warnings
+# Benchmark of the preparation of phase difference fieldmaps
+##
+# in-process NumPy functions of clinica.utils.fmap against the equivalent
+# chain of fslmaths commands, on synthetic phase images (skipped without FSL)
+#
+# Run with: pytest -s test/benchmarks/test_benchmark_fmap.py
+# or: python test/benchmarks/test_benchmark_fmap.py [n_repeats]
+
+import shutil
+
+import pytest
+
+warnings.filterwarnings("ignore")
+
+DELTA_TE = 0.00246
+SMOOTH3D = 2.0
+
+
+def make_synthetic_phase(out_dir, shape=(96, 96, 60), zooms=(2.3, 2.3, 2.5)):
+    """Write a wrapped SIEMENS-like phase image ([0, 4095]) and a brain mask."""
+    from os.path import join
+    import nibabel as nb
+    import numpy as np
+
+    rng = np.random.RandomState(0)
+    affine = np.diag(list(zooms) + [1])
+    grid = np.stack(np.meshgrid(*[np.linspace(-1, 1, n) for n in shape], indexing='ij'))
+    field = 6 * np.pi * np.exp(-4 * (grid ** 2).sum(axis=0)) + 0.1 * rng.randn(*shape)
+    phase = np.round((np.angle(np.exp(1j * field)) + np.pi) / (2 * np.pi) * 4095).astype(np.int16)
+    mask = ((grid ** 2).sum(axis=0) < 0.7).astype(np.uint8)
+
+    phase_file, mask_file = join(out_dir, 'phasediff.nii.gz'), join(out_dir, 'mask.nii.gz')
+    nb.Nifti1Image(phase, affine).to_filename(phase_file)
+    nb.Nifti1Image(mask, affine).to_filename(mask_file)
+    return phase_file, mask_file
+
+
+def run_shell_pipeline(phase_file, mask_file, out_dir):
+    """Scaling in radians, conversion in rad/s, masking and smoothing with one fslmaths call per step."""
+    import math
+    import subprocess
+    from os.path import join
+    import nibabel as nb
+    import numpy as np
+
+    imax = np.asanyarray(nb.load(phase_file).dataobj).max()
+    steps = [
+        (phase_file, ['-mul', str(2.0 * math.pi), '-div', str(imax)], 'phase_in_rad.nii.gz'),
+        ('phase_in_rad.nii.gz', ['-div', str(DELTA_TE)], 'fmap_radsec.nii.gz'),
+        ('fmap_radsec.nii.gz', ['-mas', mask_file], 'fmap_masked.nii.gz'),
+        ('fmap_masked.nii.gz', ['-s', str(SMOOTH3D)], 'fmap_smoothed.nii.gz'),
+    ]
+    for in_file, args, out_file in steps:
+        subprocess.check_call(['fslmaths', join(out_dir, in_file)] + args + [join(out_dir, out_file), '-odt', 'float'])
+    return join(out_dir, 'fmap_masked.nii.gz'), join(out_dir, 'fmap_smoothed.nii.gz')
+
+
+def run_in_process(phase_file, mask_file, out_dir):
+    """Same steps with clinica.utils.fmap: only the scaled phase and the final fieldmap are written."""
+    from os.path import join
+    from clinica.utils.fmap import convert_phase_in_radians, prepare_fmap
+
+    phase_in_rad = convert_phase_in_radians(phase_file, join(out_dir, 'phase_in_rad.nii.gz'))
+    masked = prepare_fmap(phase_in_rad, DELTA_TE, in_mask=mask_file, out_file=join(out_dir, 'fmap_masked.nii.gz'))
+    smoothed = prepare_fmap(phase_in_rad, DELTA_TE, in_mask=mask_file, smooth3d=SMOOTH3D,
+                            out_file=join(out_dir, 'fmap_smoothed.nii.gz'))
+    return masked, smoothed
+
+
+def benchmark(n_repeats=3):
+    """Return the best run time (in seconds) of both implementations and check that their outputs agree."""
+    import os
+    import tempfile
+    import time
+    import nibabel as nb
+    import numpy as np
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        phase_file, mask_file = make_synthetic_phase(tmp_dir)
+        timings = {}
+        outputs = {}
+        for name, function in [('fslmaths', run_shell_pipeline), ('clinica.utils.fmap', run_in_process)]:
+            out_dir = os.path.join(tmp_dir, name)
+            os.makedirs(out_dir)
+            timings[name] = []
+            for _ in range(n_repeats):
+                start = time.perf_counter()
+                outputs[name] = function(phase_file, mask_file, out_dir)
+                timings[name].append(time.perf_counter() - start)
+
+        # Scaling, conversion and masking give the same fieldmap (the smoothing of fslmaths is not normalized
+        # inside the mask, only its time is compared)
+        shell_masked = nb.load(outputs['fslmaths'][0]).get_fdata()
+        clinica_masked = nb.load(outputs['clinica.utils.fmap'][0]).get_fdata()
+        assert np.allclose(shell_masked, clinica_masked, rtol=1e-4, atol=1e-2)
+    return {name: min(times) for name, times in timings.items()}
+
+
+@pytest.mark.skipif(shutil.which('fslmaths') is None, reason='FSL (fslmaths) is not installed')
+def test_benchmark_fmap_preparation():
+    timings = benchmark()
+    for name, seconds in timings.items():
+        print('%s: %.3f s' % (name, seconds))
+
+
+if __name__ == '__main__':
+    import sys
+
+    if shutil.which('fslmaths') is None:
+        sys.exit('FSL (fslmaths) is not installed.')
+    for implementation, best_time in benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 3).items():
+        print('%s: %.3f s' % (implementation, best_time))
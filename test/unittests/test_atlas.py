@@ -0,0 +1,52 @@
+# coding: utf8
+
+import warnings
+# Unit tests of the regional statistics computed with the voxel index of an atlas
+##
+# run on a synthetic atlas (no dataset needed)
+
+warnings.filterwarnings("ignore")
+
+
+def make_atlas_geometry(tmp_path, shape=(6, 5, 4), seed=0):
+    import nibabel as nib
+    import numpy as np
+    from clinica.utils.atlas import AtlasGeometry
+
+    labels = np.random.RandomState(seed).randint(0, 4, shape).astype(np.int16)
+    labels_file = str(tmp_path / 'labels.nii.gz')
+    nib.Nifti1Image(labels, np.eye(4)).to_filename(labels_file)
+
+    # ROI 5 has no voxel, label 0 is not a ROI
+    atlas_geometry = AtlasGeometry.__new__(AtlasGeometry)
+    atlas_geometry.labels_file = labels_file
+    atlas_geometry.shape = shape
+    atlas_geometry.roi_name = ['roi-3', 'roi-1', 'roi-5', 'roi-2']
+    atlas_geometry.roi_value = [3, 1, 5, 2]
+    atlas_geometry._cache_dir = None
+    atlas_geometry._index = None
+    return atlas_geometry, labels
+
+
+def test_roi_statistics_match_numpy(tmp_path):
+    import numpy as np
+
+    atlas_geometry, labels = make_atlas_geometry(tmp_path)
+    maps = np.random.RandomState(1).rand(3, labels.size).astype(np.float32) + 1000
+
+    means, stds, n_voxels = atlas_geometry.roi_statistics(maps)
+    assert means.shape == stds.shape == (3, 4)
+    for j, roi_value in enumerate(atlas_geometry.roi_value):
+        in_roi = labels.ravel() == roi_value
+        assert n_voxels[j] == in_roi.sum()
+        if roi_value == 5:
+            assert np.isnan(means[:, j]).all() and np.isnan(stds[:, j]).all()
+            continue
+        np.testing.assert_allclose(means[:, j], maps[:, in_roi].astype(np.float64).mean(axis=1), rtol=1e-10)
+        np.testing.assert_allclose(stds[:, j], maps[:, in_roi].astype(np.float64).std(axis=1), rtol=1e-6)
+    np.testing.assert_allclose(atlas_geometry.roi_means(maps), means, rtol=1e-6)
+
+    # Single image
+    mean, std, _ = atlas_geometry.roi_statistics(maps[0].reshape(labels.shape))
+    np.testing.assert_allclose(mean, means[0])
+    np.testing.assert_allclose(std, stds[0])
@@ -0,0 +1,97 @@
+# coding: utf8
+
+import warnings
+# Unit tests of the cached hashing of the input files (clinica --hash_method)
+##
+# run on temporary files (no dataset needed)
+
+warnings.filterwarnings("ignore")
+
+
+def use_digest_cache(monkeypatch, tmp_path):
+    import clinica.utils.hashing as hashing
+
+    monkeypatch.setitem(hashing._state, 'cache_file', str(tmp_path / 'file_digests.sqlite'))
+    monkeypatch.setitem(hashing._state, 'connection', None)
+    monkeypatch.setitem(hashing._state, 'pid', None)
+    return hashing
+
+
+def test_cached_hash_file_reads_unchanged_files_once(monkeypatch, tmp_path):
+    import os
+    hashing = use_digest_cache(monkeypatch, tmp_path)
+
+    image = tmp_path / 'image.nii'
+    image.write_bytes(os.urandom(100000))
+    digest = hashing.cached_hash_file(str(image))
+    assert digest == hashing.fast_hash_file(str(image))
+
+    # Unchanged file: the digest comes from the SQLite cache
+    computed = []
+    original_fast_hash_file = hashing.fast_hash_file
+    monkeypatch.setattr(hashing, 'fast_hash_file',
+                        lambda *args, **kwargs: computed.append(args) or original_fast_hash_file(*args, **kwargs))
+    assert hashing.cached_hash_file(str(image)) == digest
+    assert computed == []
+
+    # Modified file: the digest is computed again
+    image.write_bytes(os.urandom(100000))
+    os.utime(str(image), ns=(1, 1))
+    new_digest = hashing.cached_hash_file(str(image))
+    assert len(computed) == 1
+    assert new_digest != digest
+    assert hashing.cached_hash_file(str(image)) == new_digest
+    assert len(computed) == 1
+
+    # The sampled digests are stored separately
+    assert hashing.cached_hash_file(str(image), sampled=True) == original_fast_hash_file(str(image), sampled=True)
+
+
+def test_sampled_hash_reads_evenly_spaced_blocks():
+    import os
+    import tempfile
+    from clinica.utils.hashing import fast_hash_file, SAMPLED_BLOCKS
+
+    chunk_len = 16
+    data = bytearray(os.urandom(SAMPLED_BLOCKS * chunk_len * 4))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        image = os.path.join(tmp_dir, 'image.nii')
+        with open(image, 'wb') as f:
+            f.write(data)
+        sampled_digest = fast_hash_file(image, sampled=True, chunk_len=chunk_len)
+        full_digest = fast_hash_file(image, chunk_len=chunk_len)
+
+        # Byte outside of the sampled blocks: only the full digest changes
+        data[chunk_len + 1] ^= 0xFF
+        with open(image, 'wb') as f:
+            f.write(data)
+        assert fast_hash_file(image, sampled=True, chunk_len=chunk_len) == sampled_digest
+        assert fast_hash_file(image, chunk_len=chunk_len) != full_digest
+
+        # Byte of the last block (always sampled) and size of the file are hashed
+        data[-1] ^= 0xFF
+        with open(image, 'wb') as f:
+            f.write(data)
+        assert fast_hash_file(image, sampled=True, chunk_len=chunk_len) != sampled_digest
+        with open(image, 'ab') as f:
+            f.write(b'\0')
+        assert fast_hash_file(image, sampled=True, chunk_len=chunk_len) != sampled_digest
+
+        # Small files are fully hashed
+        with open(image, 'wb') as f:
+            f.write(data[:SAMPLED_BLOCKS * chunk_len])
+        assert fast_hash_file(image, sampled=True, chunk_len=chunk_len) == fast_hash_file(image, chunk_len=chunk_len)
+
+
+def test_hash_method_needs_forked_workers(monkeypatch):
+    import pytest
+    import clinica.utils.hashing as hashing
+    from clinica.utils.exceptions import ClinicaException
+
+    hashing.check_hash_method_context('MultiProc', {'mp_context': 'spawn'})
+
+    monkeypatch.setitem(hashing._state, 'original_hash_infile', lambda *args, **kwargs: None)
+    with pytest.raises(ClinicaException):
+        hashing.check_hash_method_context('MultiProc', {'mp_context': 'spawn'})
+    hashing.check_hash_method_context('MultiProc', {'mp_context': 'fork'})
+    hashing.check_hash_method_context('Linear', {'mp_context': 'spawn'})
@@ -0,0 +1,128 @@
+# coding: utf8
+
+import warnings
+# Unit tests of the machine learning framework
+##
+# run on synthetic data (no dataset needed)
+
+warnings.filterwarnings("ignore")
+
+
+def make_linear_problem(n_samples=200, n_features=30, seed=0):
+    import numpy as np
+
+    rng = np.random.RandomState(seed)
+    x = rng.randn(n_samples, n_features)
+    y = (x[:, :3].sum(axis=1) + rng.randn(n_samples) > 0).astype(int)
+    return x, y
+
+
+def test_incremental_learning_curve_matches_full_grid():
+    import pytest
+    pytest.importorskip('xgboost')
+    import numpy as np
+    from clinica.pipelines.machine_learning.algorithm import DualSVMAlgorithm
+
+    x, y = make_linear_problem()
+    kernel = np.dot(x, x.transpose())
+    params = DualSVMAlgorithm.get_default_parameters()
+    params['n_threads'] = 1
+    params['grid_search_folds'] = 5
+
+    rng = np.random.RandomState(1)
+    permutation = rng.permutation(len(y))
+    train_index, test_index = np.sort(permutation[:150]), np.sort(permutation[150:])
+    learning_folds = np.array_split(rng.permutation(len(train_index)), 10)
+
+    np.random.seed(0)
+    algorithm = DualSVMAlgorithm(kernel, y, params)
+    incremental = algorithm.evaluate_learning_curve(train_index, test_index, learning_folds)
+    full_grid = super(DualSVMAlgorithm, algorithm).evaluate_learning_curve(train_index, test_index, learning_folds)
+
+    assert len(incremental) == len(full_grid) == len(learning_folds)
+    incremental_accuracy = [result['evaluation']['balanced_accuracy'] for result in incremental]
+    full_grid_accuracy = [result['evaluation']['balanced_accuracy'] for result in full_grid]
+    # The C search of the incremental path does not get stuck at chance level
+    assert np.mean(incremental_accuracy[3:]) > 0.7
+    assert np.mean(incremental_accuracy[3:]) >= np.mean(full_grid_accuracy[3:]) - 0.05
+
+
+def test_oob_search_counts_subjects_without_oob_score_as_misses(monkeypatch):
+    import pytest
+    pytest.importorskip('xgboost')
+    import numpy as np
+    from clinica.pipelines.machine_learning import algorithm, ml_utils
+
+    # Separable problem: the out-of-bag predictions are almost always right
+    rng = np.random.RandomState(0)
+    x = rng.randn(200, 5)
+    y = (x[:, 0] > 0).astype(int)
+    params = algorithm.RandomForest.get_default_parameters()
+    params['n_threads'] = 1
+    params['n_estimators_range'] = [1, 50]
+    random_forest = algorithm.RandomForest(x, y, params)
+
+    scored_subjects = []
+    evaluate_prediction = ml_utils.evaluate_prediction
+    monkeypatch.setattr(algorithm.utils, 'evaluate_prediction',
+                        lambda y_true, y_hat: scored_subjects.append(len(y_true)) or evaluate_prediction(y_true, y_hat))
+    np.random.seed(0)
+    accuracies = random_forest._oob_search(x, y, None, 2, 'sqrt')
+
+    assert [n_estimators for n_estimators, _ in accuracies] == [1, 50]
+    assert scored_subjects == [len(y)] * 2
+    # With a single tree, about a third of the subjects are out-of-bag: the others are misses
+    assert accuracies[0][1] < 0.5
+    assert accuracies[1][1] > 0.9
+
+
+def test_resumed_validation_does_not_evaluate_checkpointed_folds(tmp_path):
+    import os
+    import pytest
+    pytest.importorskip('xgboost')
+    import numpy as np
+    from clinica.pipelines.machine_learning import algorithm, validation
+    from clinica.pipelines.machine_learning.checkpoint import get_fingerprint
+
+    x, y = make_linear_problem(n_samples=90, n_features=10)
+    kernel = np.dot(x, x.transpose())
+    algorithm_params = {'n_threads': 1, 'grid_search_folds': 3, 'c_range': np.logspace(-2, 0, 3)}
+    checkpoint_dir = str(tmp_path / 'checkpoints')
+
+    def open_validation(evaluated_folds, interrupt_after=None):
+        svm = algorithm.DualSVMAlgorithm(kernel, y, dict(algorithm_params))
+        evaluate = svm.evaluate
+
+        def counted_evaluate(train_index, test_index):
+            evaluated_folds.append(test_index)
+            if interrupt_after is not None and len(evaluated_folds) > interrupt_after:
+                raise RuntimeError('Interrupted validation')
+            return evaluate(train_index, test_index)
+
+        svm.evaluate = counted_evaluate
+        cv = validation.RepeatedKFoldCV(svm, {'n_iterations': 2, 'n_folds': 3, 'n_threads': 1,
+                                              'checkpoint_dir': checkpoint_dir})
+        fingerprint = get_fingerprint(kernel, y, algorithm.DualSVMAlgorithm, algorithm_params,
+                                      validation.RepeatedKFoldCV, cv._validation_params)
+        cv.open_checkpoint(checkpoint_dir, fingerprint, y)
+        return cv
+
+    # Interrupted run: only the first 3 folds are in the checkpoints
+    evaluated_folds = []
+    with pytest.raises(RuntimeError):
+        open_validation(evaluated_folds, interrupt_after=3).validate(y)
+    assert len([f for f in os.listdir(os.path.join(checkpoint_dir, 'folds')) if f.endswith('.pkl')]) == 3
+
+    # Resumed run: only the missing folds are evaluated
+    evaluated_folds = []
+    _, _, results = open_validation(evaluated_folds).validate(y)
+    assert len(evaluated_folds) == 3
+    assert [len(iteration_results) for iteration_results in results] == [3, 3]
+
+    # Complete checkpoints: no fold is evaluated again, and the results are the same
+    evaluated_folds = []
+    _, _, resumed_results = open_validation(evaluated_folds).validate(y)
+    assert evaluated_folds == []
+    for iteration_results, resumed_iteration_results in zip(results, resumed_results):
+        for fold_result, resumed_fold_result in zip(iteration_results, resumed_iteration_results):
+            np.testing.assert_array_equal(fold_result['y_hat'], resumed_fold_result['y_hat'])
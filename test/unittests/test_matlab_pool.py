@@ -0,0 +1,88 @@
+# coding: utf8
+
+import warnings
+# Unit tests of the pool of MATLAB processes (clinica --matlab_pool)
+##
+# run with the stub backend (no MATLAB or SPM needed)
+
+warnings.filterwarnings("ignore")
+
+
+def use_stub_pool(monkeypatch, n_workers=2):
+    import clinica.utils.matlab_pool as matlab_pool
+    from nipype.interfaces.spm.base import SPMCommand
+
+    monkeypatch.setenv('CLINICA_MATLAB_BACKEND', 'stub')
+    monkeypatch.delenv(matlab_pool.MATLAB_POOL_SOCKET, raising=False)
+    monkeypatch.setitem(matlab_pool._matlab_pool, 'n_workers', 0)
+    monkeypatch.setitem(matlab_pool._matlab_pool, 'backend', None)
+    # Restored after the test, enable_matlab_pool patches the SPM interfaces of Nipype
+    monkeypatch.setattr(SPMCommand, '_run_interface', SPMCommand._run_interface)
+    matlab_pool.enable_matlab_pool(n_workers)
+    return matlab_pool
+
+
+def test_matlab_pool_runs_scripts_with_the_stub_backend(monkeypatch, tmp_path):
+    import os
+    from multiprocessing.pool import ThreadPool
+    from nipype.interfaces.spm.base import SPMCommand
+
+    matlab_pool = use_stub_pool(monkeypatch)
+    assert matlab_pool.is_matlab_pool_enabled()
+    assert SPMCommand._run_interface.clinica_dispatch
+
+    scripts = []
+    for i in range(6):
+        script_file = tmp_path / ('script_%d.m' % i)
+        script_file.write_text("disp('%d');\n" % i)
+        scripts.append(str(script_file))
+
+    with matlab_pool.matlab_pool() as pool:
+        socket_file = os.environ[matlab_pool.MATLAB_POOL_SOCKET]
+        assert pool.backend == 'stub'
+        returncode, output = matlab_pool.submit_matlab_script(scripts[0])
+        assert returncode == 0
+        assert 'script_0.m was not run' in output
+
+        # Concurrent scripts are dispatched to at most n_workers processes
+        with ThreadPool(4) as threads:
+            results = threads.map(matlab_pool.submit_matlab_script, scripts[1:])
+        assert [returncode for returncode, _ in results] == [0] * 5
+        assert 1 <= len(pool._workers) <= 2
+        jobs = sorted(job for worker in pool._workers for job in worker.jobs)
+        assert jobs == [(script_file, str(tmp_path)) for script_file in scripts]
+
+    assert matlab_pool.MATLAB_POOL_SOCKET not in os.environ
+    assert not os.path.exists(socket_file)
+
+
+def test_run_m_script_goes_through_the_matlab_pool(monkeypatch, tmp_path):
+    import pytest
+    from clinica.pipelines.statistics_volume.statistics_volume_utils import run_m_script
+
+    matlab_pool = use_stub_pool(monkeypatch)
+    m_file = tmp_path / 'scripts' / 'run_model.m'
+    m_file.parent.mkdir()
+    m_file.write_text("spm_jobman('run', matlabbatch);\n")
+    spm_mat = tmp_path / '2_sample_t_test' / 'SPM.mat'
+    spm_mat.parent.mkdir()
+    spm_mat.write_bytes(b'')
+    monkeypatch.chdir(str(tmp_path))
+
+    with matlab_pool.matlab_pool() as pool:
+        assert run_m_script(str(m_file)) == str(spm_mat)
+        assert [job for worker in pool._workers for job in worker.jobs] == [(str(m_file), str(tmp_path))]
+    # The spm_jobman line is kept (it is only removed for SPM standalone run outside of the pool)
+    assert 'spm_jobman' in m_file.read_text()
+    assert 'run_model.m was not run' in (tmp_path / 'matlab_output.log').read_text()
+
+    # Scripts failing in the pool raise an error
+    class FailingBackend(matlab_pool.StubBackend):
+        def run_script(self, script_file, cwd):
+            return 1, 'Error using spm_jobman\n'
+
+    monkeypatch.setitem(matlab_pool.MATLAB_BACKENDS, 'failing', FailingBackend)
+    monkeypatch.setenv('CLINICA_MATLAB_BACKEND', 'failing')
+    with matlab_pool.matlab_pool():
+        with pytest.raises(RuntimeError, match='Error using spm_jobman'):
+            run_m_script(str(m_file))
@@ -0,0 +1,47 @@
+# coding: utf8
+
+import warnings
+# Unit tests of the staging of the compressed NIfTI images (clinica --nifti_cache)
+##
+# run on temporary files (no dataset needed)
+
+warnings.filterwarnings("ignore")
+
+
+def test_nifti_cache_is_removed_on_request(monkeypatch, tmp_path):
+    import gzip
+    import os
+    import clinica.utils.nifti_staging as nifti_staging
+
+    monkeypatch.setitem(nifti_staging._nifti_staging, 'cache', True)
+    monkeypatch.delenv(nifti_staging.NIFTI_CACHE_DIR, raising=False)
+    image = tmp_path / 'image.nii.gz'
+    with gzip.open(str(image), 'wb') as f:
+        f.write(os.urandom(1000))
+
+    for remove in [False, True]:
+        with nifti_staging.nifti_cache(str(tmp_path), remove=remove) as cache_dir:
+            assert os.environ[nifti_staging.NIFTI_CACHE_DIR] == cache_dir
+            nifti_staging.stage_uncompressed(str(image), str(tmp_path / 'image.nii'))
+            assert len(os.listdir(cache_dir)) == 1
+        assert nifti_staging.NIFTI_CACHE_DIR not in os.environ
+        assert os.path.isdir(cache_dir) is not remove
+
+
+def test_nifti_cache_size_is_the_size_of_the_decompressed_images(tmp_path):
+    import gzip
+    import nibabel as nib
+    import numpy as np
+    from clinica.utils.nifti_staging import estimate_nifti_cache_size
+
+    images = []
+    for i, (shape, dtype) in enumerate([((20, 30, 40), np.float32), ((10, 10, 10, 3), np.int16)]):
+        image = str(tmp_path / ('image_%d.nii.gz' % i))
+        nib.Nifti1Image(np.zeros(shape, dtype), np.eye(4)).to_filename(image)
+        images.append(image)
+    uncompressed_image = str(tmp_path / 'image.nii')
+    nib.Nifti1Image(np.zeros((5, 5, 5), np.float32), np.eye(4)).to_filename(uncompressed_image)
+
+    decompressed_size = sum(len(gzip.open(image).read()) for image in images)
+    # Uncompressed images are not cached, each image is counted once
+    assert estimate_nifti_cache_size(images + images[:1] + [uncompressed_image]) == decompressed_size